@@ -1,3 +1,4 @@
+import atexit
 import os
 from flask import Flask
 from flask_wtf.csrf import CSRFProtect
@@ -8,10 +9,10 @@ from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 
 csrf = CSRFProtect()
+# Counter storage comes from RATELIMIT_STORAGE_URI, see create_app()
 limiter = Limiter(
     key_func=get_remote_address,
-    default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    default_limits=["200 per day", "50 per hour"]
 )
 
 
@@ -63,7 +64,105 @@ def create_app(test_config=None):
     app.config.from_mapping(
         SECRET_KEY=os.environ.get('SECRET_KEY', 'dev'),
         GITHUB_TOKEN=os.environ.get('GITHUB_TOKEN'),
+        # Additional comma-separated tokens to spread GitHub search quota across
+        GITHUB_TOKENS=os.environ.get('GITHUB_TOKENS', ''),
+        GITHUB_RATE_LIMIT_MAX_WAIT=float(os.environ.get('GITHUB_RATE_LIMIT_MAX_WAIT', 5.0)),
         EXA_API_KEY=os.environ.get('EXA_API_KEY'),
+        # Upstream HTTP transport
+        GITHUB_API_URL=os.environ.get('GITHUB_API_URL', 'https://api.github.com'),
+        EXA_API_URL=os.environ.get('EXA_API_URL', 'https://api.exa.ai'),
+        HTTP_POOL_SIZE=int(os.environ.get('HTTP_POOL_SIZE', 10)),
+        HTTP_POOL_BLOCK=os.environ.get('HTTP_POOL_BLOCK', 'false').lower() == 'true',
+        HTTP_CONNECT_TIMEOUT=float(os.environ.get('HTTP_CONNECT_TIMEOUT', 3.05)),
+        HTTP_READ_TIMEOUT=float(os.environ.get('HTTP_READ_TIMEOUT', 10.0)),
+        HTTP_MAX_RETRIES=int(os.environ.get('HTTP_MAX_RETRIES', 2)),
+        HTTP_RETRY_BACKOFF=float(os.environ.get('HTTP_RETRY_BACKOFF', 0.5)),
+        # Connections per upstream for the async serving path (asgi.py)
+        ASYNC_MAX_CONNECTIONS=int(os.environ.get('ASYNC_MAX_CONNECTIONS', 100)),
+        # Threads serving the remaining (sync) routes on the async serving path
+        ASGI_WSGI_THREADS=int(os.environ.get('ASGI_WSGI_THREADS', 8)),
+        # Concurrent GitHub/Exa lookups in combined searches
+        SEARCH_CONCURRENT=os.environ.get('SEARCH_CONCURRENT', 'true').lower() == 'true',
+        SEARCH_MAX_WORKERS=int(os.environ.get('SEARCH_MAX_WORKERS', 8)),
+        GITHUB_DEADLINE=float(os.environ.get('GITHUB_DEADLINE', 15.0)),
+        EXA_DEADLINE=float(os.environ.get('EXA_DEADLINE', 10.0)),
+        # GitHub response cache ('memory', 'sqlite' or 'none')
+        GITHUB_CACHE_BACKEND=os.environ.get('GITHUB_CACHE_BACKEND', 'memory'),
+        GITHUB_CACHE_TTL=float(os.environ.get('GITHUB_CACHE_TTL', 300)),
+        GITHUB_CACHE_MAX_ENTRIES=int(os.environ.get('GITHUB_CACHE_MAX_ENTRIES', 512)),
+        GITHUB_CACHE_PATH=os.environ.get('GITHUB_CACHE_PATH'),
+        # Exa search result cache of combined searches ('memory', 'sqlite' or 'none')
+        EXA_CACHE_BACKEND=os.environ.get('EXA_CACHE_BACKEND', 'memory'),
+        EXA_CACHE_TTL=float(os.environ.get('EXA_CACHE_TTL', 600)),
+        EXA_CACHE_MAX_ENTRIES=int(os.environ.get('EXA_CACHE_MAX_ENTRIES', 256)),
+        EXA_CACHE_PATH=os.environ.get('EXA_CACHE_PATH'),
+        # Exa similarity result cache ('memory', 'sqlite' or 'none')
+        SIMILARITY_CACHE_BACKEND=os.environ.get('SIMILARITY_CACHE_BACKEND', 'memory'),
+        SIMILARITY_CACHE_TTL=float(os.environ.get('SIMILARITY_CACHE_TTL', 3600)),
+        SIMILARITY_CACHE_MAX_ENTRIES=int(os.environ.get('SIMILARITY_CACHE_MAX_ENTRIES', 256)),
+        SIMILARITY_CACHE_PATH=os.environ.get('SIMILARITY_CACHE_PATH'),
+        # Bulk similar-URL lookups
+        SIMILARITY_BULK_MAX_URLS=int(os.environ.get('SIMILARITY_BULK_MAX_URLS', 200)),
+        SIMILARITY_BULK_MAX_WORKERS=int(os.environ.get('SIMILARITY_BULK_MAX_WORKERS', 4)),
+        SIMILARITY_BULK_MAX_RETRIES=int(os.environ.get('SIMILARITY_BULK_MAX_RETRIES', 3)),
+        SIMILARITY_BULK_BACKOFF=float(os.environ.get('SIMILARITY_BULK_BACKOFF', 1.0)),
+        # Opt-in background prefetch of the next results page
+        PREFETCH_ENABLED=os.environ.get('PREFETCH_ENABLED', 'false').lower() == 'true',
+        PREFETCH_MAX_WORKERS=int(os.environ.get('PREFETCH_MAX_WORKERS', 2)),
+        PREFETCH_QUOTA_RESERVE=int(os.environ.get('PREFETCH_QUOTA_RESERVE', 5)),
+        # Opt-in parsing of GitHub items into slotted, lazily hydrated models;
+        # they drop the nested fields the app does not use from API payloads
+        COMPACT_RESULTS=os.environ.get('COMPACT_RESULTS', 'false').lower() == 'true',
+        # Coalescing of identical in-flight searches
+        SINGLE_FLIGHT=os.environ.get('SINGLE_FLIGHT', 'true').lower() == 'true',
+        SINGLE_FLIGHT_LOCK_DIR=os.environ.get('SINGLE_FLIGHT_LOCK_DIR'),
+        # Batch search endpoint limits
+        BATCH_MAX_WORKERS=int(os.environ.get('BATCH_MAX_WORKERS', 4)),
+        BATCH_MAX_SEARCHES=int(os.environ.get('BATCH_MAX_SEARCHES', 50)),
+        BATCH_DEADLINE=float(os.environ.get('BATCH_DEADLINE', 30)),
+        # Local index of fetched GitHub results; with LOCAL_INDEX_ANSWER, searches
+        # that only narrow the filters of a fully indexed one skip GitHub
+        LOCAL_INDEX_ENABLED=os.environ.get('LOCAL_INDEX_ENABLED', 'false').lower() == 'true',
+        LOCAL_INDEX_ANSWER=os.environ.get('LOCAL_INDEX_ANSWER', 'false').lower() == 'true',
+        LOCAL_INDEX_MAX_AGE=float(os.environ.get('LOCAL_INDEX_MAX_AGE', 600)),
+        LOCAL_INDEX_PATH=os.environ.get('LOCAL_INDEX_PATH'),
+        # Local vector index scoring results when Exa returns nothing; built from
+        # the collected corpus by 'flask vector-index build' (requires NumPy)
+        VECTOR_INDEX_ENABLED=os.environ.get('VECTOR_INDEX_ENABLED', 'false').lower() == 'true',
+        VECTOR_INDEX_PATH=os.environ.get('VECTOR_INDEX_PATH'),
+        VECTOR_CORPUS_PATH=os.environ.get('VECTOR_CORPUS_PATH'),
+        VECTOR_INDEX_TOP_K=int(os.environ.get('VECTOR_INDEX_TOP_K', 50)),
+        VECTOR_INDEX_NPROBE=int(os.environ.get('VECTOR_INDEX_NPROBE', 8)),
+        VECTOR_INDEX_DIMENSIONS=int(os.environ.get('VECTOR_INDEX_DIMENSIONS', 256)),
+        VECTOR_INDEX_BRUTE_FORCE_LIMIT=int(os.environ.get('VECTOR_INDEX_BRUTE_FORCE_LIMIT', 20000)),
+        # Re-rank combined results by weighted signals (requires NumPy), e.g.
+        # RANKING_WEIGHTS='relevance=2,stars=0.5'; unlisted signals keep their defaults
+        RANKING_ENABLED=os.environ.get('RANKING_ENABLED', 'false').lower() == 'true',
+        RANKING_WEIGHTS=os.environ.get('RANKING_WEIGHTS', ''),
+        RANKING_RECENCY_HALF_LIFE=float(os.environ.get('RANKING_RECENCY_HALF_LIFE', 180)),
+        # Serve UI pages from pools of results fetched 100 at a time, up to
+        # CANDIDATE_POOL_SIZE results per search
+        CANDIDATE_POOL_ENABLED=os.environ.get('CANDIDATE_POOL_ENABLED', 'false').lower() == 'true',
+        CANDIDATE_POOL_SIZE=int(os.environ.get('CANDIDATE_POOL_SIZE', 300)),
+        CANDIDATE_POOL_BACKEND=os.environ.get('CANDIDATE_POOL_BACKEND', 'memory'),
+        CANDIDATE_POOL_TTL=float(os.environ.get('CANDIDATE_POOL_TTL', 300)),
+        CANDIDATE_POOL_MAX_ENTRIES=int(os.environ.get('CANDIDATE_POOL_MAX_ENTRIES', 128)),
+        CANDIDATE_POOL_PATH=os.environ.get('CANDIDATE_POOL_PATH'),
+        # Results page rendering: cached result cards, optional cached whole
+        # pages, and compiled templates kept across restarts and workers
+        RENDER_CACHE_MAX_ENTRIES=int(os.environ.get('RENDER_CACHE_MAX_ENTRIES', 2048)),
+        PAGE_CACHE_ENABLED=os.environ.get('PAGE_CACHE_ENABLED', 'false').lower() == 'true',
+        PAGE_CACHE_MAX_ENTRIES=int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 128)),
+        TEMPLATE_CACHE_DIR=os.environ.get('TEMPLATE_CACHE_DIR'),
+        TEMPLATE_WARMUP=os.environ.get('TEMPLATE_WARMUP', 'true').lower() == 'true',
+        # Per-stage latency histograms and counters served on /metrics
+        METRICS_ENABLED=os.environ.get('METRICS_ENABLED', 'false').lower() == 'true',
+        # Rate-limit counters ('memory' per process, or 'sqlite' shared by the
+        # workers on one host); RATELIMIT_STORAGE_URI overrides both
+        RATELIMIT_BACKEND=os.environ.get('RATELIMIT_BACKEND', 'memory'),
+        RATELIMIT_PATH=os.environ.get('RATELIMIT_PATH'),
+        RATELIMIT_STORAGE_URI=os.environ.get('RATELIMIT_STORAGE_URI'),
+        RATELIMIT_STRATEGY=os.environ.get('RATELIMIT_STRATEGY', 'fixed-window'),
     )
 
     # Ensure the instance folder exists
@@ -84,21 +183,170 @@ def create_app(test_config=None):
 
     # Log configuration status
     app.logger.info(
-        f"Starting with GitHub token: {'configured' if app.config.get('GITHUB_TOKEN') else 'missing'}")
+        f"Starting with GitHub token: {'configured' if app.config.get('GITHUB_TOKEN') or app.config.get('GITHUB_TOKENS') else 'missing'}")
     app.logger.info(
         f"Starting with Exa API key: {'configured' if app.config.get('EXA_API_KEY') else 'missing'}")
 
+    # Importing the module registers the sqlite:// limiter storage
+    from app.services.limiter_storage import storage_uri_from_config
+    if not app.config.get('RATELIMIT_STORAGE_URI'):
+        app.config['RATELIMIT_STORAGE_URI'] = storage_uri_from_config(
+            app.config, os.path.join(app.instance_path, 'ratelimit.sqlite3'))
+
     # Initialize extensions
     csrf.init_app(app)
     limiter.init_app(app)
 
+    # Create the pooled upstream HTTP sessions shared by all services
+    from app.services.http_client import UpstreamSessions
+    app.extensions['upstream_sessions'] = UpstreamSessions.from_config(
+        app.config)
+
+    # Metrics registry; services get a no-op sink when metrics are disabled
+    from app.services.metrics import Metrics, NULL_METRICS
+    metrics = Metrics() if app.config.get('METRICS_ENABLED') else NULL_METRICS
+    app.extensions['metrics'] = metrics
+
+    # Similarity service shared by all requests so the Exa client is reused
+    from app.services.cache import cache_from_config
+    from app.services.similarity_service import SimilarityService
+    app.extensions['similarity_service'] = SimilarityService(
+        exa_api_key=app.config.get('EXA_API_KEY'),
+        sessions=app.extensions['upstream_sessions'],
+        cache=cache_from_config(
+            app.config, 'SIMILARITY_CACHE',
+            os.path.join(app.instance_path, 'similarity_cache.sqlite3')),
+        bulk_max_workers=app.config['SIMILARITY_BULK_MAX_WORKERS'],
+        bulk_max_retries=app.config['SIMILARITY_BULK_MAX_RETRIES'],
+        bulk_backoff=app.config['SIMILARITY_BULK_BACKOFF'],
+        metrics=metrics)
+
+    # Bounded worker pool for running upstream calls concurrently
+    if app.config.get('SEARCH_CONCURRENT'):
+        from concurrent.futures import ThreadPoolExecutor
+        app.extensions['search_executor'] = ThreadPoolExecutor(
+            max_workers=app.config['SEARCH_MAX_WORKERS'],
+            thread_name_prefix='exahub-search'
+        )
+
+    # Response cache for parsed GitHub search results
+    app.extensions['github_cache'] = cache_from_config(
+        app.config, 'GITHUB_CACHE',
+        os.path.join(app.instance_path, 'github_cache.sqlite3'))
+
+    # Exa search results, cached apart so they neither count as GitHub
+    # traffic nor take the GitHub cache's entries
+    app.extensions['exa_cache'] = cache_from_config(
+        app.config, 'EXA_CACHE',
+        os.path.join(app.instance_path, 'exa_cache.sqlite3'))
+
+    # Pools of over-fetched results that UI pages are sliced from
+    if app.config.get('CANDIDATE_POOL_ENABLED'):
+        from app.services.candidate_pool import CandidatePools
+        app.extensions['candidate_pools'] = CandidatePools.from_config(
+            app.config, os.path.join(app.instance_path, 'candidate_pools.sqlite3'))
+
+    # Faceted index of every fetched GitHub result, shared by the workers on one host
+    if app.config.get('LOCAL_INDEX_ENABLED'):
+        from app.services.local_index import LocalIndex
+        app.extensions['local_index'] = LocalIndex.from_config(
+            app.config, os.path.join(app.instance_path, 'local_index.sqlite3'))
+
+    # Vector index of the collected corpus; None when NumPy is missing
+    if app.config.get('VECTOR_INDEX_ENABLED'):
+        from app.services.vector_index import VectorIndex
+        app.extensions['vector_index'] = VectorIndex.from_config(
+            app.config, app.instance_path)
+
+    # Multi-signal ranking of combined results; None when NumPy is missing
+    if app.config.get('RANKING_ENABLED'):
+        from app.services.ranking import Ranker
+        app.extensions['ranker'] = Ranker.from_config(app.config)
+
+    # Rate-limit-aware scheduler over the configured GitHub tokens
+    from app.services.rate_limit import GitHubTokenPool
+    app.extensions['github_token_pool'] = GitHubTokenPool.from_config(
+        app.config)
+
+    # Coalesce identical in-flight searches; the optional lock directory holds
+    # the database through which worker processes share leases and results
+    if app.config.get('SINGLE_FLIGHT'):
+        from app.services.single_flight import SingleFlight
+        app.extensions['single_flight'] = SingleFlight(
+            lock_dir=app.config.get('SINGLE_FLIGHT_LOCK_DIR'))
+
+    # Background prefetch of the next page into the response cache
+    if app.config.get('PREFETCH_ENABLED'):
+        from app.services.prefetch import Prefetcher
+        prefetcher = Prefetcher.from_config(app.config)
+        app.extensions['prefetcher'] = prefetcher
+        atexit.register(prefetcher.shutdown)
+
+    # Bounded worker pool shared by all batch search requests; its threads
+    # start on first use
+    from app.services.batch_search import BatchSearcher
+    batch_searcher = BatchSearcher.from_config(app.config)
+    app.extensions['batch_searcher'] = batch_searcher
+    atexit.register(batch_searcher.shutdown)
+
+    # Compiled templates are shared through a bytecode cache on disk
+    from jinja2 import FileSystemBytecodeCache
+    template_cache_dir = app.config.get('TEMPLATE_CACHE_DIR') or os.path.join(
+        app.instance_path, 'template_cache')
+    os.makedirs(template_cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(template_cache_dir)
+
+    # Rendered result cards and, when enabled, whole results pages
+    from app.services.render_cache import RenderCache, warm_templates
+    render_cache = RenderCache.from_config(app.jinja_env, app.config)
+    app.extensions['render_cache'] = render_cache
+
+    # Cache hit rates and GitHub rate-limit headroom are read at scrape time
+    from app.services.metrics import cache_samples, token_pool_samples
+    github_cache = app.extensions['github_cache']
+    similarity_cache = app.extensions['similarity_service'].cache
+    token_pool = app.extensions['github_token_pool']
+    exa_cache = app.extensions['exa_cache']
+    if github_cache is not None:
+        metrics.add_collector(lambda: cache_samples('github', github_cache))
+    if exa_cache is not None:
+        metrics.add_collector(lambda: cache_samples('exa', exa_cache))
+    if similarity_cache is not None:
+        metrics.add_collector(
+            lambda: cache_samples('similarity', similarity_cache))
+    if token_pool is not None:
+        metrics.add_collector(lambda: token_pool_samples(token_pool))
+    candidate_pools = app.extensions.get('candidate_pools')
+    if candidate_pools is not None:
+        metrics.add_collector(
+            lambda: cache_samples('candidate_pool', candidate_pools.cache))
+    if render_cache.cards is not None:
+        metrics.add_collector(
+            lambda: cache_samples('result_cards', render_cache.cards))
+    if render_cache.pages is not None:
+        metrics.add_collector(
+            lambda: cache_samples('result_pages', render_cache.pages))
+
     # Register blueprints
     from app.routes import main, search, api
     app.register_blueprint(main.bp)
     app.register_blueprint(search.bp)
     app.register_blueprint(api.bp)
 
+    # The metrics endpoint and its request hooks exist only when enabled
+    if app.config.get('METRICS_ENABLED'):
+        from app.routes import metrics as metrics_routes
+        app.register_blueprint(metrics_routes.bp)
+
+    # 'flask vector-index build|refresh'
+    from app.cli import vector_index_cli
+    app.cli.add_command(vector_index_cli)
+
     # Make url_for('index') work for the index page
     app.add_url_rule('/', endpoint='index')
 
+    # Compile every template now rather than in the first requests
+    if app.config.get('TEMPLATE_WARMUP'):
+        warm_templates(app.jinja_env)
+
     return app
@@ -0,0 +1,339 @@
+"""
+ASGI serving path
+
+Serves /search/api, /api/similarity-search and /api/similar-urls with the
+async services, so that one process can hold hundreds of concurrent
+upstream waits, and hands every other request to the Flask app on a pool
+of ASGI_WSGI_THREADS threads, so sync routes run concurrently as they do
+under a threaded WSGI server. Each async request runs inside a Flask
+request context built from the ASGI scope, so the rate limiter, CSRF
+protection, error handlers and after-request hooks apply exactly as on the
+WSGI path.
+
+The optional dependencies are httpx and an ASGI server:
+    pip install httpx uvicorn
+    uvicorn asgi:app
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import io
+import logging
+import sys
+
+from flask import Flask, current_app
+
+from app import limiter
+from app.routes.api import (get_similarity_service, parse_similar_urls_form, parse_similarity_search_form,
+                            similarity_error_response, similarity_results_response)
+from app.routes.search import (api_search_response, get_search_service, parse_api_search_request,
+                               rate_limited_response)
+from app.services.async_search_service import AsyncSearchService
+from app.services.async_similarity_service import AsyncSimilarityService
+from app.services.http_client import AsyncUpstreamClients
+from app.services.rate_limit import GitHubRateLimitExceeded
+from app.services.single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+def build_environ(scope: Dict[str, Any], body: bytes) -> Dict[str, Any]:
+    """Build a WSGI environ for an ASGI HTTP scope."""
+    server = scope.get("server") or ("localhost", 80)
+    client = scope.get("client") or ("127.0.0.1", 0)
+    environ = {
+        "REQUEST_METHOD": scope["method"],
+        "SCRIPT_NAME": scope.get("root_path", "").encode("utf8").decode("latin1"),
+        "PATH_INFO": scope["path"].encode("utf8").decode("latin1"),
+        "QUERY_STRING": scope.get("query_string", b"").decode("latin1"),
+        "SERVER_NAME": server[0],
+        "SERVER_PORT": str(server[1]),
+        "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+        "REMOTE_ADDR": client[0],
+        "REMOTE_PORT": str(client[1]),
+        "CONTENT_LENGTH": str(len(body)),
+        "wsgi.version": (1, 0),
+        "wsgi.url_scheme": scope.get("scheme", "http"),
+        "wsgi.input": io.BytesIO(body),
+        "wsgi.errors": sys.stderr,
+        "wsgi.multithread": True,
+        "wsgi.multiprocess": True,
+        "wsgi.run_once": False,
+    }
+    for name, value in scope.get("headers", []):
+        name = name.decode("latin1")
+        value = value.decode("latin1")
+        if name == "content-length":
+            continue
+        if name == "content-type":
+            environ["CONTENT_TYPE"] = value
+            continue
+        key = "HTTP_" + name.upper().replace("-", "_")
+        environ[key] = f"{environ[key]},{value}" if key in environ else value
+    return environ
+
+
+async def read_body(receive) -> Optional[bytes]:
+    """Read the body of an ASGI HTTP request, or return None if the client disconnects first."""
+    body = bytearray()
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return None
+        body.extend(message.get("body", b""))
+        if not message.get("more_body", False):
+            return bytes(body)
+
+
+class ThreadPoolWsgi:
+    """
+    ASGI adapter running a WSGI app on a thread pool, one request per thread.
+
+    Each request holds a pool thread until its response is sent, including
+    streamed responses, so the pool size bounds the concurrent sync requests.
+    """
+
+    def __init__(self, wsgi_app: Callable, threads: int = 8):
+        """
+        Initialize the adapter.
+
+        Args:
+            wsgi_app: The WSGI application
+            threads: Number of requests served at once
+        """
+        self.wsgi_app = wsgi_app
+        self.executor = ThreadPoolExecutor(
+            max_workers=threads, thread_name_prefix='exahub-wsgi')
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            raise ValueError("The WSGI app received a non-HTTP scope")
+        body = await read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, self._run, scope, body, send, loop)
+
+    def _run(self, scope: Dict[str, Any], body: bytes, send, loop: asyncio.AbstractEventLoop):
+        """Run the WSGI app in a pool thread, sending its response on the event loop."""
+        def sync_send(message: Dict[str, Any]):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        start: List[Tuple[str, List[Tuple[str, str]]]] = []
+
+        def start_response(status: str, headers: List[Tuple[str, str]], exc_info=None):
+            if exc_info is not None and sent_headers:
+                raise exc_info[1].with_traceback(exc_info[2])
+            start[:] = [(status, headers)]
+
+        def send_headers():
+            status, headers = start[0]
+            sync_send({
+                "type": "http.response.start",
+                "status": int(status.split(" ", 1)[0]),
+                "headers": [(name.lower().encode("latin1"), value.encode("latin1"))
+                            for name, value in headers]
+            })
+
+        sent_headers = False
+        result = self.wsgi_app(build_environ(scope, body), start_response)
+        try:
+            for chunk in result:
+                if not sent_headers:
+                    send_headers()
+                    sent_headers = True
+                if chunk:
+                    sync_send({"type": "http.response.body", "body": chunk, "more_body": True})
+            if not sent_headers:
+                send_headers()
+            sync_send({"type": "http.response.body"})
+        finally:
+            close = getattr(result, "close", None)
+            if close is not None:
+                close()
+
+    def shutdown(self):
+        """Stop the pool threads once their requests finish."""
+        self.executor.shutdown(wait=False)
+
+
+class AsyncApp:
+    """ASGI application that serves the upstream-bound API routes with coroutines."""
+
+    def __init__(self, flask_app: Flask):
+        """
+        Initialize the ASGI application.
+
+        Args:
+            flask_app: The Flask app whose config, extensions, hooks and
+                remaining routes are used
+        """
+        self.flask_app = flask_app
+        self.wsgi = ThreadPoolWsgi(
+            flask_app, threads=flask_app.config.get('ASGI_WSGI_THREADS', 8))
+        self.single_flight = AsyncSingleFlight() if flask_app.config.get(
+            'SINGLE_FLIGHT') else None
+        self.clients: Optional[AsyncUpstreamClients] = None
+        self.similarity: Optional[AsyncSimilarityService] = None
+        self.routes: Dict[tuple, Callable[[], Awaitable[Any]]] = {
+            ("POST", "/search/api"): self.api_search,
+            ("POST", "/api/similarity-search"): self.similarity_search,
+            ("POST", "/api/similar-urls"): self.similar_urls,
+        }
+        flask_app.extensions['asgi_app'] = self
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+
+        if scope["type"] == "http":
+            handler = self.routes.get((scope["method"], scope["path"]))
+            if handler is not None:
+                await self._dispatch(handler, scope, receive, send)
+                return
+
+        await self.wsgi(scope, receive, send)
+
+    async def _lifespan(self, receive, send):
+        """Create the async clients on startup and close them on shutdown."""
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                self._start()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                if self.clients is not None:
+                    await self.clients.aclose()
+                    self.clients = None
+                self.wsgi.shutdown()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    def _start(self):
+        """Create the async clients and services if they do not exist yet."""
+        if self.clients is None:
+            self.clients = AsyncUpstreamClients.from_config(
+                self.flask_app.config)
+            self.similarity = AsyncSimilarityService(
+                self.flask_app.extensions['similarity_service'], self.clients)
+
+    async def _dispatch(self, handler: Callable[[], Awaitable[Any]], scope, receive, send):
+        """Run an async handler inside a Flask request context and send its response."""
+        body = await read_body(receive)
+        if body is None:
+            return
+
+        self._start()
+        app = self.flask_app
+        ctx = app.request_context(build_environ(scope, body))
+        error = None
+        ctx.push()
+        try:
+            try:
+                rv = app.preprocess_request()
+                if rv is None:
+                    # Route limits are checked by the view decorator on the WSGI path
+                    limiter.check()
+                    rv = await handler()
+            except Exception as e:
+                try:
+                    rv = app.handle_user_exception(e)
+                except Exception as unhandled:
+                    error = unhandled
+                    rv = app.handle_exception(unhandled)
+            response = app.process_response(app.make_response(rv))
+        finally:
+            # Popping runs app.do_teardown_request() with the unhandled error,
+            # if any, before the context is left, as Flask.wsgi_app does
+            ctx.pop(error)
+
+        await send({
+            "type": "http.response.start",
+            "status": response.status_code,
+            "headers": [(name.lower().encode("latin1"), value.encode("latin1"))
+                        for name, value in response.headers.items()]
+        })
+        await send({"type": "http.response.body", "body": response.get_data()})
+
+    def _search_service(self) -> AsyncSearchService:
+        """Create an async search service wired to the app-scoped clients and caches."""
+        config = current_app.config
+        extensions = current_app.extensions
+        return AsyncSearchService(
+            clients=self.clients,
+            single_flight=self.single_flight,
+            github_token=config.get('GITHUB_TOKEN'),
+            exa_api_key=config.get('EXA_API_KEY'),
+            sessions=extensions['upstream_sessions'],
+            github_deadline=config.get('GITHUB_DEADLINE'),
+            exa_deadline=config.get('EXA_DEADLINE'),
+            cache=extensions.get('github_cache'),
+            token_pool=extensions.get('github_token_pool'),
+            compact_results=config.get('COMPACT_RESULTS', False),
+            metrics=extensions.get('metrics'),
+            local_index=extensions.get('local_index'),
+            answer_locally=config.get('LOCAL_INDEX_ANSWER', False),
+            vector_index=extensions.get('vector_index'),
+            ranker=extensions.get('ranker'),
+            candidate_pools=extensions.get('candidate_pools'),
+            exa_cache=extensions.get('exa_cache')
+        )
+
+    async def api_search(self):
+        """Async counterpart of search.api_search."""
+        error, search = parse_api_search_request()
+        if error:
+            return error
+        search_params, page, per_page, enhance_with_exa, _ = search
+
+        try:
+            results = await self._search_service().combined_search(
+                search_params=search_params,
+                page=page,
+                per_page=per_page,
+                enhance_with_exa=enhance_with_exa
+            )
+        except GitHubRateLimitExceeded as e:
+            return rate_limited_response(e)
+
+        # Prefetching stays on its worker threads, driven by the sync service
+        return api_search_response(get_search_service(), search, results)
+
+    async def similarity_search(self):
+        """Async counterpart of api.similarity_search."""
+        error, search = parse_similarity_search_form()
+        if error:
+            return error
+        prompt, options, include_domains, include_snippets = search
+
+        # Picks up a changed Exa API key on the shared service
+        get_similarity_service()
+
+        try:
+            results = await self.similarity.search_similar_content(prompt, **options)
+            return similarity_results_response(results, include_domains, include_snippets)
+
+        except Exception as e:
+            return similarity_error_response(e)
+
+    async def similar_urls(self):
+        """Async counterpart of api.similar_urls."""
+        error, search = parse_similar_urls_form()
+        if error:
+            return error
+        url, options, include_domains, include_snippets = search
+
+        get_similarity_service()
+
+        try:
+            results = await self.similarity.find_similar_links(url, **options)
+            return similarity_results_response(results, include_domains, include_snippets)
+
+        except Exception as e:
+            return similarity_error_response(e)
+
+
+def create_asgi_app(flask_app: Flask) -> AsyncApp:
+    """Wrap a Flask app created by create_app() in the ASGI serving path."""
+    return AsyncApp(flask_app)
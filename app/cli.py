@@ -0,0 +1,48 @@
+"""
+Flask CLI commands
+
+    flask vector-index build     Rebuild the vector index from the collected corpus
+    flask vector-index refresh   Rebuild it only if the corpus changed since the last build
+"""
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+vector_index_cli = AppGroup('vector-index', help='Build the local vector index.')
+
+
+def _vector_index():
+    """Open the app's vector index file and corpus as they are now on disk."""
+    from app.services.vector_index import VectorIndex
+    index = VectorIndex.from_config(current_app.config, current_app.instance_path)
+    if index is None:
+        raise click.ClickException('The vector index requires NumPy')
+    return index
+
+
+def _build(index):
+    from app.services.vector_index import build_vector_index
+    stats = build_vector_index(
+        index.corpus, index.path,
+        dimensions=current_app.config['VECTOR_INDEX_DIMENSIONS'],
+        brute_force_limit=current_app.config['VECTOR_INDEX_BRUTE_FORCE_LIMIT'])
+    click.echo(
+        f"Indexed {stats['documents']} documents ({stats['vocabulary']} terms, "
+        f"{stats['clusters'] or 'no'} clusters) into {index.path} in {stats['seconds']}s")
+
+
+@vector_index_cli.command('build')
+def build_command():
+    """Rebuild the vector index from the collected corpus."""
+    _build(_vector_index())
+
+
+@vector_index_cli.command('refresh')
+def refresh_command():
+    """Rebuild the vector index if the corpus changed since it was built."""
+    index = _vector_index()
+    current = index.current()
+    if current is not None and index.corpus.last_updated() <= current.built_at:
+        click.echo(f"{index.path} is up to date ({len(current.keys)} documents)")
+        return
+    _build(index)
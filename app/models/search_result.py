@@ -1,5 +1,7 @@
-from dataclasses import dataclass, field
-from typing import List, Dict, Any, Optional
+import copy
+import sys
+from dataclasses import dataclass, field, replace
+from typing import List, Dict, Any, Optional, Iterable
 from datetime import datetime
 
 
@@ -199,6 +201,239 @@ class GitHubUserResult:
         )
 
 
+def _intern(value: Any) -> Any:
+    """Intern a string so that repeated values share one object across results and cached pages."""
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _prune(data: Optional[Dict[str, Any]], keys: Iterable[str]) -> Optional[Dict[str, Any]]:
+    """Keep only the given keys of a nested API object."""
+    if not data:
+        return data
+    return {key: data[key] for key in keys if key in data}
+
+
+def _prune_user(data: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Keep the commonly used keys of a nested user/owner object.
+
+    Its strings are interned since the same owners recur across results and
+    cached pages.
+    """
+    if not data:
+        return data
+    return {key: _intern(data[key]) for key in OWNER_KEYS if key in data}
+
+
+# Keys kept from nested GitHub objects; the many *_url API links are dropped
+OWNER_KEYS = ('login', 'id', 'avatar_url', 'html_url', 'type')
+LICENSE_KEYS = ('key', 'name', 'spdx_id')
+LABEL_KEYS = ('name', 'color', 'description')
+REPOSITORY_KEYS = ('id', 'name', 'full_name', 'html_url',
+                   'description', 'private', 'fork')
+
+
+class CompactResult:
+    """
+    Base class for slotted search results with lazy field hydration.
+
+    Instances hold a reference to a pruned copy of the raw API item and read
+    their fields from it on access, so no per-instance __dict__ is built and
+    nested objects keep only the keys the app uses. The Exa analysis fields
+    are regular slots so they can be set during enhancement.
+    """
+    __slots__ = ('_raw', 'relevance_score',
+                 'semantic_similarity', 'exa_content')
+
+    # Field name -> default, in the same order as the dataclass models
+    _FIELDS: Dict[str, Any] = {}
+    _EXA_FIELDS = ('relevance_score', 'semantic_similarity', 'exa_content')
+
+    def __init__(self, raw: Dict[str, Any]):
+        self._raw = raw
+        self.relevance_score = None
+        self.semantic_similarity = None
+        self.exa_content = None
+
+    def __getattr__(self, name: str) -> Any:
+        # Only called for names that are not slots, i.e. the lazily read fields
+        fields = type(self)._FIELDS
+        if name not in fields:
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'")
+        try:
+            raw = object.__getattribute__(self, '_raw')
+        except AttributeError:
+            raise AttributeError(name) from None
+        default = fields[name]
+        value = raw.get(name, default)
+        if value is default and isinstance(default, (list, dict)):
+            # Hand out a fresh container like the dataclass default factories
+            return type(default)()
+        return value
+
+    def __copy__(self):
+        clone = type(self).__new__(type(self))
+        clone._raw = self._raw
+        clone.relevance_score = self.relevance_score
+        clone.semantic_similarity = self.semantic_similarity
+        clone.exa_content = self.exa_content
+        return clone
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({self._raw!r})"
+
+    def to_dict(self, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+        """
+        Return the fields as a dictionary with the same keys as the dataclass model.
+
+        Fields are read from the raw item directly rather than through
+        __getattr__, which matters when serializing large pages.
+
+        Args:
+            fields: Optional subset of field names to include, in output order
+        """
+        raw = self._raw
+        defaults = self._FIELDS
+        data = {}
+        for name in (defaults if fields is None else fields):
+            if name in defaults:
+                default = defaults[name]
+                value = raw.get(name, default)
+                if value is default and isinstance(default, (list, dict)):
+                    value = type(default)()
+                data[name] = value
+            else:
+                data[name] = getattr(self, name)
+        if fields is None:
+            for name in self._EXA_FIELDS:
+                data[name] = getattr(self, name)
+        return data
+
+    @classmethod
+    def _compact(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        """Return the pruned raw item kept by an instance."""
+        return {name: data[name] for name in cls._FIELDS if name in data}
+
+    @classmethod
+    def from_github_api(cls, data: Dict[str, Any]):
+        """Create a compact result object from GitHub API data."""
+        return cls(cls._compact(data))
+
+
+class CompactRepository(CompactResult):
+    """Slotted, lazily hydrated counterpart of GitHubRepository."""
+    __slots__ = ()
+
+    _FIELDS = {
+        'id': 0, 'name': '', 'full_name': '', 'html_url': '', 'description': None, 'owner': {},
+        'stargazers_count': 0, 'watchers_count': 0, 'forks_count': 0, 'open_issues_count': 0,
+        'language': None, 'topics': [], 'license': None,
+        'created_at': None, 'updated_at': None, 'pushed_at': None,
+        'fork': False, 'archived': False, 'disabled': False, 'is_template': False
+    }
+
+    @classmethod
+    def _compact(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        raw = super()._compact(data)
+        if 'owner' in raw:
+            raw['owner'] = _prune_user(raw['owner'])
+        if 'license' in raw:
+            raw['license'] = _prune(raw['license'], LICENSE_KEYS)
+        if 'language' in raw:
+            raw['language'] = _intern(raw['language'])
+        if raw.get('topics'):
+            raw['topics'] = [_intern(topic) for topic in raw['topics']]
+        return raw
+
+
+class CompactCodeResult(CompactResult):
+    """Slotted, lazily hydrated counterpart of GitHubCodeResult."""
+    __slots__ = ()
+
+    _FIELDS = {
+        'name': '', 'path': '', 'sha': '', 'url': '', 'html_url': '', 'repository': {},
+        'score': 0.0, 'text_matches': []
+    }
+
+    @classmethod
+    def _compact(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        raw = super()._compact(data)
+        repository = raw.get('repository')
+        if repository:
+            pruned = _prune(repository, REPOSITORY_KEYS)
+            if repository.get('owner'):
+                pruned['owner'] = _prune_user(repository['owner'])
+            raw['repository'] = pruned
+        return raw
+
+
+class CompactIssueResult(CompactResult):
+    """Slotted, lazily hydrated counterpart of GitHubIssueResult."""
+    __slots__ = ()
+
+    _FIELDS = {
+        'id': 0, 'number': 0, 'title': '', 'html_url': '', 'state': '', 'user': {},
+        'body': None, 'created_at': None, 'updated_at': None, 'closed_at': None,
+        'repository_url': None, 'labels': [], 'comments': 0, 'pull_request': None
+    }
+
+    @classmethod
+    def _compact(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        raw = super()._compact(data)
+        if 'user' in raw:
+            raw['user'] = _prune_user(raw['user'])
+        if raw.get('labels'):
+            raw['labels'] = [_prune(label, LABEL_KEYS)
+                             for label in raw['labels']]
+        if 'state' in raw:
+            raw['state'] = _intern(raw['state'])
+        return raw
+
+
+class CompactUserResult(CompactResult):
+    """Slotted, lazily hydrated counterpart of GitHubUserResult."""
+    __slots__ = ()
+
+    _FIELDS = {
+        'id': 0, 'login': '', 'html_url': '', 'type': '', 'score': 0.0,
+        'name': None, 'company': None, 'blog': None, 'location': None, 'email': None, 'bio': None,
+        'public_repos': 0, 'public_gists': 0, 'followers': 0, 'following': 0,
+        'created_at': None, 'updated_at': None
+    }
+
+    @classmethod
+    def _compact(cls, data: Dict[str, Any]) -> Dict[str, Any]:
+        raw = super()._compact(data)
+        for name in ('login', 'type'):
+            if name in raw:
+                raw[name] = _intern(raw[name])
+        return raw
+
+
+def result_to_dict(result: Any, fields: Optional[Iterable[str]] = None) -> Dict[str, Any]:
+    """Return a shallow dictionary of a result's fields, or of the given subset, for either model family."""
+    if isinstance(result, CompactResult):
+        return result.to_dict(fields)
+    if fields is None:
+        return dict(vars(result))
+    values = vars(result)
+    return {name: values[name] for name in fields}
+
+
+def field_values(results: List[Any], name: str) -> List[Any]:
+    """
+    Return one field of every result, for either model family.
+
+    Compact results are read from their raw items directly, which is much
+    faster than attribute access when building columns over many results.
+    """
+    if results and isinstance(results[0], CompactResult) and name in type(results[0])._FIELDS:
+        default = type(results[0])._FIELDS[name]
+        return [result._raw.get(name, default) for result in results]
+    return [getattr(result, name) for result in results]
+
+
 @dataclass
 class SearchResults:
     """Container for search results of all types."""
@@ -217,6 +452,12 @@ class SearchResults:
     per_page: int = 10
     has_next_page: bool = False
 
+    # Wall time in seconds spent on each stage of the search
+    timings: Dict[str, float] = field(default_factory=dict)
+
+    # Source and fetch time of results not fetched from GitHub for this search
+    freshness: Optional[Dict[str, Any]] = None
+
     @property
     def results(self):
         """Return the appropriate results based on the search type."""
@@ -230,9 +471,38 @@ class SearchResults:
             return self.users
         return []
 
+    @results.setter
+    def results(self, items: List[Any]):
+        """Replace the results of the search type, e.g. with a reordered list."""
+        if self.search_type == "repositories":
+            self.repositories = items
+        elif self.search_type == "code":
+            self.code_results = items
+        elif self.search_type == "issues":
+            self.issues = items
+        elif self.search_type == "users":
+            self.users = items
+
+    def copy(self) -> "SearchResults":
+        """Return a copy whose result items can be enhanced without modifying this one."""
+        return replace(
+            self,
+            repositories=[copy.copy(item) for item in self.repositories],
+            code_results=[copy.copy(item) for item in self.code_results],
+            issues=[copy.copy(item) for item in self.issues],
+            users=[copy.copy(item) for item in self.users],
+            timings=dict(self.timings)
+        )
+
     @classmethod
-    def from_github_api(cls, data: Dict[str, Any], search_type: str, query: str, page: int, per_page: int):
-        """Create a search results object from GitHub API data."""
+    def from_github_api(cls, data: Dict[str, Any], search_type: str, query: str, page: int, per_page: int,
+                        compact: bool = False):
+        """
+        Create a search results object from GitHub API data.
+
+        With compact=True the items are parsed into the slotted Compact* models,
+        which use much less memory when result pages are cached.
+        """
         results = cls(
             query=query,
             search_type=search_type,
@@ -248,16 +518,20 @@ class SearchResults:
         items = data.get('items', [])
 
         if search_type == "repositories":
+            model = CompactRepository if compact else GitHubRepository
             results.repositories = [
-                GitHubRepository.from_github_api(item) for item in items]
+                model.from_github_api(item) for item in items]
         elif search_type == "code":
+            model = CompactCodeResult if compact else GitHubCodeResult
             results.code_results = [
-                GitHubCodeResult.from_github_api(item) for item in items]
+                model.from_github_api(item) for item in items]
         elif search_type == "issues":
+            model = CompactIssueResult if compact else GitHubIssueResult
             results.issues = [
-                GitHubIssueResult.from_github_api(item) for item in items]
+                model.from_github_api(item) for item in items]
         elif search_type == "users":
-            results.users = [GitHubUserResult.from_github_api(
+            model = CompactUserResult if compact else GitHubUserResult
+            results.users = [model.from_github_api(
                 item) for item in items]
 
         return results
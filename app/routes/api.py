@@ -1,19 +1,45 @@
 from app.services.similarity_service import SimilarityService
-from flask import Blueprint, request, jsonify, current_app
+from flask import Blueprint, request, jsonify, current_app, stream_with_context
 import requests
 from app import limiter
+from app.services.serializer import dumps
 
 bp = Blueprint('api', __name__, url_prefix='/api')
 
 
-@bp.route('/similarity-search', methods=['POST'])
-@limiter.limit("20 per minute")
-def similarity_search():
-    """Handle content similarity search requests."""
+def get_similarity_service() -> SimilarityService:
+    """Return the app-wide similarity service, picking up a changed Exa API key."""
+    similarity_service = current_app.extensions['similarity_service']
+    exa_api_key = current_app.config.get('EXA_API_KEY')
+    if similarity_service.exa_api_key != exa_api_key:
+        similarity_service.reload_api_key(exa_api_key)
+    return similarity_service
+
+
+def exa_result_to_dict(result, include_domains=False, include_snippets=False):
+    """Convert an Exa result object to the dictionary returned by the API."""
+    return {
+        'title': result.title,
+        'url': result.url,
+        'score': result.score,
+        'published_date': getattr(result, 'published_date', None),
+        'domain': getattr(result, 'domain', None) if include_domains else None,
+        'text': getattr(result, 'text', None) if include_snippets else None
+    }
+
+
+def parse_similarity_search_form():
+    """
+    Validate a /api/similarity-search form.
+
+    Returns:
+        A tuple of (error response, None) or (None, search) where search is
+        (prompt, search_similar_content arguments, include_domains, include_snippets)
+    """
     # Check if Exa API key is available
     exa_api_key = current_app.config.get('EXA_API_KEY')
     if not exa_api_key:
-        return jsonify({"error": "Exa API key not configured"}), 400
+        return (jsonify({"error": "Exa API key not configured"}), 400), None
 
     # Extract basic parameters from request
     prompt = request.form.get('prompt')
@@ -36,80 +62,48 @@ def similarity_search():
 
     # Validate required parameters
     if not prompt:
-        return jsonify({"error": "Search prompt is required"}), 400
+        return (jsonify({"error": "Search prompt is required"}), 400), None
 
-    # Create similarity service and perform search
-    similarity_service = SimilarityService(exa_api_key=exa_api_key)
+    # Process site restrictions
+    include_domains_list = [
+        domain.strip() for domain in site_restrict.split(',') if domain.strip()]
+    exclude_domains_list = [
+        domain.strip() for domain in excluded_sites.split(',') if domain.strip()]
 
-    try:
-        # Process site restrictions
-        include_domains_list = [
-            domain.strip() for domain in site_restrict.split(',') if domain.strip()]
-        exclude_domains_list = [
-            domain.strip() for domain in excluded_sites.split(',') if domain.strip()]
+    # Process content types
+    content_type_filter = content_types if content_types else None
 
-        # Process content types
-        content_type_filter = content_types if content_types else None
+    # Process date range
+    start_date = date_start if date_start else None
+    end_date = date_end if date_end else None
 
-        # Process date range
-        start_date = date_start if date_start else None
-        end_date = date_end if date_end else None
+    options = dict(
+        num_results=num_results,
+        search_type=search_type,
+        use_autoprompt=use_autoprompt,
+        include_domains=include_domains_list if include_domains_list else None,
+        exclude_domains=exclude_domains_list if exclude_domains_list else None,
+        content_types=content_type_filter,
+        language=language if language else None,
+        start_date=start_date,
+        end_date=end_date,
+        text=include_snippets
+    )
+    return None, (prompt, options, include_domains, include_snippets)
 
-        results = similarity_service.search_similar_content(
-            prompt=prompt,
-            num_results=num_results,
-            search_type=search_type,
-            use_autoprompt=use_autoprompt,
-            include_domains=include_domains_list if include_domains_list else None,
-            exclude_domains=exclude_domains_list if exclude_domains_list else None,
-            content_types=content_type_filter,
-            language=language if language else None,
-            start_date=start_date,
-            end_date=end_date,
-            text=include_snippets
-        )
-
-        # Convert results to serializable format
-        serializable_results = []
-        for result in results:
-            res_dict = {
-                'title': result.title,
-                'url': result.url,
-                'score': result.score,
-                'published_date': getattr(result, 'published_date', None),
-                'domain': getattr(result, 'domain', None) if include_domains else None,
-                'text': getattr(result, 'text', None) if include_snippets else None
-            }
-            serializable_results.append(res_dict)
-
-        return jsonify({"results": serializable_results})
-
-    except requests.RequestException as e:
-        current_app.logger.error(
-            f"Request error for similarity search: {str(e)}")
-        return jsonify({"error": f"External API request failed: {str(e)}"}), 503
-    except ValueError as e:
-        current_app.logger.error(
-            f"Value error for similarity search: {str(e)}")
-        return jsonify({"error": f"Invalid parameter value: {str(e)}"}), 400
-    except KeyError as e:
-        current_app.logger.error(
-            f"Missing key for similarity search: {str(e)}")
-        return jsonify({"error": f"Missing required parameter: {str(e)}"}), 400
-    except Exception as e:
-        current_app.logger.exception(
-            f"Unexpected error in similarity search: {str(e)}")
-        return jsonify({"error": "An unexpected error occurred"}), 500
 
+def parse_similar_urls_form():
+    """
+    Validate a /api/similar-urls form.
 
-@bp.route('/similar-urls', methods=['POST'])
-@limiter.limit("20 per minute")
-def similar_urls():
-    """Handle URL similarity search requests."""
+    Returns:
+        A tuple of (error response, None) or (None, search) where search is
+        (url, find_similar_links arguments, include_domains, include_snippets)
+    """
     # Check if Exa API key is available
     exa_api_key = current_app.config.get('EXA_API_KEY')
     if not exa_api_key:
-        return jsonify({"error": "Exa API key not configured"}), 400
+        return (jsonify({"error": "Exa API key not configured"}), 400), None
 
     # Extract basic parameters from request
     url = request.form.get('url')
@@ -129,62 +123,181 @@ def similar_urls():
 
     # Validate required parameters
     if not url:
-        return jsonify({"error": "URL is required"}), 400
+        return (jsonify({"error": "URL is required"}), 400), None
 
-    # Create similarity service and perform search
-    similarity_service = SimilarityService(exa_api_key=exa_api_key)
+    # Process site restrictions
+    include_domains_list = [
+        domain.strip() for domain in site_restrict.split(',') if domain.strip()]
+    exclude_domains_list = [
+        domain.strip() for domain in excluded_sites.split(',') if domain.strip()]
 
-    try:
-        # Process site restrictions
-        include_domains_list = [
-            domain.strip() for domain in site_restrict.split(',') if domain.strip()]
-        exclude_domains_list = [
-            domain.strip() for domain in excluded_sites.split(',') if domain.strip()]
-
-        # Process date range
-        start_date = date_start if date_start else None
-        end_date = date_end if date_end else None
-
-        results = similarity_service.find_similar_links(
-            url=url,
-            num_results=num_results,
-            include_domains=include_domains_list if include_domains_list else None,
-            exclude_domains=exclude_domains_list if exclude_domains_list else None,
-            language=language if language else None,
-            start_date=start_date,
-            end_date=end_date,
-            text_similarity=text_similarity,
-            text=include_snippets
-        )
-
-        # Convert results to serializable format
-        serializable_results = []
-        for result in results:
-            res_dict = {
-                'title': result.title,
-                'url': result.url,
-                'score': result.score,
-                'published_date': getattr(result, 'published_date', None),
-                'domain': getattr(result, 'domain', None) if include_domains else None,
-                'text': getattr(result, 'text', None) if include_snippets else None
-            }
-            serializable_results.append(res_dict)
-
-        return jsonify({"results": serializable_results})
-
-    except requests.RequestException as e:
+    # Process date range
+    start_date = date_start if date_start else None
+    end_date = date_end if date_end else None
+
+    options = dict(
+        num_results=num_results,
+        include_domains=include_domains_list if include_domains_list else None,
+        exclude_domains=exclude_domains_list if exclude_domains_list else None,
+        language=language if language else None,
+        start_date=start_date,
+        end_date=end_date,
+        text_similarity=text_similarity,
+        text=include_snippets
+    )
+    return None, (url, options, include_domains, include_snippets)
+
+
+def similarity_results_response(results, include_domains, include_snippets):
+    """Return the JSON response for a list of Exa results."""
+    # Convert results to serializable format
+    serializable_results = [exa_result_to_dict(result, include_domains, include_snippets)
+                            for result in results]
+
+    return jsonify({"results": serializable_results})
+
+
+def similarity_error_response(e):
+    """Return the JSON error response for an exception raised by a similarity search."""
+    if isinstance(e, requests.RequestException):
         current_app.logger.error(
             f"Request error for similarity search: {str(e)}")
         return jsonify({"error": f"External API request failed: {str(e)}"}), 503
-    except ValueError as e:
+    if isinstance(e, ValueError):
         current_app.logger.error(
             f"Value error for similarity search: {str(e)}")
         return jsonify({"error": f"Invalid parameter value: {str(e)}"}), 400
-    except KeyError as e:
+    if isinstance(e, KeyError):
         current_app.logger.error(
             f"Missing key for similarity search: {str(e)}")
         return jsonify({"error": f"Missing required parameter: {str(e)}"}), 400
+    current_app.logger.exception(
+        f"Unexpected error in similarity search: {str(e)}")
+    return jsonify({"error": "An unexpected error occurred"}), 500
+
+
+@bp.route('/similarity-search', methods=['POST'])
+@limiter.limit("20 per minute")
+def similarity_search():
+    """Handle content similarity search requests."""
+    error, search = parse_similarity_search_form()
+    if error:
+        return error
+    prompt, options, include_domains, include_snippets = search
+
+    # Get the shared similarity service and perform search
+    similarity_service = get_similarity_service()
+
+    try:
+        results = similarity_service.search_similar_content(
+            prompt=prompt, **options)
+        return similarity_results_response(results, include_domains, include_snippets)
+
     except Exception as e:
-        current_app.logger.exception(
-            f"Unexpected error in similarity search: {str(e)}")
-        return jsonify({"error": "An unexpected error occurred"}), 500
+        return similarity_error_response(e)
+
+
+@bp.route('/similar-urls', methods=['POST'])
+@limiter.limit("20 per minute")
+def similar_urls():
+    """Handle URL similarity search requests."""
+    error, search = parse_similar_urls_form()
+    if error:
+        return error
+    url, options, include_domains, include_snippets = search
+
+    # Get the shared similarity service and perform search
+    similarity_service = get_similarity_service()
+
+    try:
+        results = similarity_service.find_similar_links(url=url, **options)
+        return similarity_results_response(results, include_domains, include_snippets)
+
+    except Exception as e:
+        return similarity_error_response(e)
+
+
+@bp.route('/similar-urls/bulk', methods=['POST'])
+@limiter.limit("5 per minute")
+def similar_urls_bulk():
+    """
+    Find similar URLs for many URLs at once, streaming answers as NDJSON.
+
+    The JSON body holds "urls" plus the options of /api/similar-urls as JSON
+    fields (num_results, include_domains, exclude_domains, start_date,
+    end_date, include_snippets). Duplicate URLs are looked up once; each line
+    carries a URL with its results or its error, in the order the lookups
+    complete.
+    """
+    exa_api_key = current_app.config.get('EXA_API_KEY')
+    if not exa_api_key:
+        return jsonify({"error": "Exa API key not configured"}), 400
+
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json()
+    urls = data.get('urls')
+    max_urls = current_app.config.get('SIMILARITY_BULK_MAX_URLS', 200)
+
+    if not isinstance(urls, list) or not urls:
+        return jsonify({"error": "urls must be a non-empty list"}), 400
+    if len(urls) > max_urls:
+        return jsonify({"error": f"At most {max_urls} URLs can be looked up at once"}), 400
+
+    try:
+        num_results = int(data.get('num_results', 5))
+    except (ValueError, TypeError):
+        return jsonify({"error": "num_results must be an integer"}), 400
+
+    include_snippets = bool(data.get('include_snippets', False))
+    options = {
+        "num_results": num_results,
+        "include_domains": data.get('include_domains') or None,
+        "exclude_domains": data.get('exclude_domains') or None,
+        "start_date": data.get('start_date') or None,
+        "end_date": data.get('end_date') or None,
+        "text": include_snippets
+    }
+
+    similarity_service = get_similarity_service()
+    answers = similarity_service.find_similar_links_bulk(
+        [str(url) for url in urls], **options)
+
+    def generate():
+        for url, results, error in answers:
+            if error is not None:
+                yield dumps({"url": url, "error": error}) + b"\n"
+            else:
+                yield dumps({"url": url, "results": [
+                    exa_result_to_dict(result, include_snippets=include_snippets)
+                    for result in results]}) + b"\n"
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson'
+    )
+
+
+@bp.route('/github-quota', methods=['GET'])
+@limiter.limit("60 per minute")
+def github_quota():
+    """Report the remaining GitHub search quota of each configured token."""
+    token_pool = current_app.extensions.get('github_token_pool')
+    if token_pool is None:
+        return jsonify({"error": "GitHub token not configured"}), 400
+
+    return jsonify(token_pool.snapshot())
+
+
+@bp.route('/cache-stats', methods=['GET'])
+@limiter.limit("60 per minute")
+def cache_stats():
+    """Report hit rates of the GitHub response cache and the Exa search and similarity caches."""
+    github_cache = current_app.extensions.get('github_cache')
+    exa_cache = current_app.extensions.get('exa_cache')
+    return jsonify({
+        "github": dict(github_cache.stats.as_dict(), size=len(github_cache)) if github_cache else None,
+        "exa": dict(exa_cache.stats.as_dict(), size=len(exa_cache)) if exa_cache else None,
+        "similarity": current_app.extensions['similarity_service'].cache_metrics()
+    })
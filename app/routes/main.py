@@ -6,7 +6,8 @@ bp = Blueprint('main', __name__)
 @bp.route('/')
 def index():
     """Render the home page with search form."""
-    github_token_available = bool(current_app.config.get('GITHUB_TOKEN'))
+    github_token_available = bool(current_app.config.get('GITHUB_TOKEN') or
+                                  current_app.config.get('GITHUB_TOKENS'))
     exa_api_key_available = bool(current_app.config.get('EXA_API_KEY'))
 
     return render_template(
@@ -19,7 +20,8 @@ def index():
 @bp.route('/api-playground')
 def api_playground():
     """Render the API playground page."""
-    github_token_available = bool(current_app.config.get('GITHUB_TOKEN'))
+    github_token_available = bool(current_app.config.get('GITHUB_TOKEN') or
+                                  current_app.config.get('GITHUB_TOKENS'))
     exa_api_key_available = bool(current_app.config.get('EXA_API_KEY'))
 
     return render_template(
@@ -0,0 +1,36 @@
+import time
+from flask import Blueprint, current_app, g, request
+from app import limiter
+
+bp = Blueprint('metrics', __name__)
+
+
+@bp.before_app_request
+def start_request_timer():
+    """Remember when the request started."""
+    g.metrics_started = time.perf_counter()
+
+
+@bp.after_app_request
+def record_request(response):
+    """Record the status and latency of every request by endpoint."""
+    metrics = current_app.extensions['metrics']
+    endpoint = request.endpoint or 'unmatched'
+    started = g.pop('metrics_started', None)
+    # Requests rejected by an earlier before-request hook were never timed
+    if started is not None:
+        metrics.observe('exahub_http_request_duration_seconds',
+                        time.perf_counter() - started, endpoint=endpoint)
+    metrics.incr('exahub_http_requests_total', endpoint=endpoint,
+                 method=request.method, status=response.status_code)
+    return response
+
+
+@bp.route('/metrics', methods=['GET'])
+@limiter.exempt
+def metrics():
+    """Expose the metrics in the Prometheus text exposition format."""
+    return current_app.response_class(
+        current_app.extensions['metrics'].render(),
+        mimetype='text/plain; version=0.0.4'
+    )
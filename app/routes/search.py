@@ -1,6 +1,13 @@
-from flask import Blueprint, render_template, request, current_app, jsonify, abort
+import time
+from flask import Blueprint, render_template, request, current_app, jsonify, abort, stream_with_context
+from flask_wtf.csrf import generate_csrf
 from app.models.search_params import GitHubSearchParams
-from app.services.search_service import SearchService
+from app.services.serializer import (InvalidFieldsError, dumps, ndjson_lines, parse_fields,
+                                     search_results_payload, serialize_search_results)
+from app.services.batch_search import BatchQuery
+from app.services.search_service import SearchService, GITHUB_MAX_PER_PAGE, GITHUB_SEARCH_RESULT_LIMIT
+from app.services.rate_limit import GitHubRateLimitExceeded
+from app.services.render_cache import CSRF_PLACEHOLDER, card_key
 from app import limiter
 
 bp = Blueprint('search', __name__, url_prefix='/search')
@@ -13,6 +20,71 @@ def parse_comma_separated_list(input_str):
     return [item.strip() for item in input_str.split(',') if item.strip()]
 
 
+def get_search_service():
+    """Create a search service wired to the app-scoped transport and worker pool."""
+    return SearchService(
+        github_token=current_app.config.get('GITHUB_TOKEN'),
+        exa_api_key=current_app.config.get('EXA_API_KEY'),
+        sessions=current_app.extensions['upstream_sessions'],
+        executor=current_app.extensions.get('search_executor'),
+        github_deadline=current_app.config.get('GITHUB_DEADLINE'),
+        exa_deadline=current_app.config.get('EXA_DEADLINE'),
+        cache=current_app.extensions.get('github_cache'),
+        single_flight=current_app.extensions.get('single_flight'),
+        token_pool=current_app.extensions.get('github_token_pool'),
+        compact_results=current_app.config.get('COMPACT_RESULTS', False),
+        metrics=current_app.extensions.get('metrics'),
+        local_index=current_app.extensions.get('local_index'),
+        answer_locally=current_app.config.get('LOCAL_INDEX_ANSWER', False),
+        vector_index=current_app.extensions.get('vector_index'),
+        ranker=current_app.extensions.get('ranker'),
+        candidate_pools=current_app.extensions.get('candidate_pools'),
+        exa_cache=current_app.extensions.get('exa_cache')
+    )
+
+
+def schedule_prefetch(search_service, search_params, results, enhance_with_exa):
+    """Prefetch the next results page in the background if prefetching is enabled."""
+    prefetcher = current_app.extensions.get('prefetcher')
+    if prefetcher is not None:
+        prefetcher.schedule_next_page(
+            search_service, search_params, results, enhance_with_exa)
+
+
+def render_results(results, search_params, page, per_page, enhance_with_exa):
+    """Render results.html from cached result cards, or serve the whole page from the page cache."""
+    render_cache = current_app.extensions['render_cache']
+    items = results.results
+    keys = [card_key(results.search_type, item) for item in items]
+
+    page_key = None
+    if render_cache.pages is not None:
+        page_key = render_cache.page_key(
+            results, search_params, keys, page=page, per_page=per_page,
+            enhance_with_exa=enhance_with_exa, script_root=request.script_root)
+        html = render_cache.get_page(page_key, generate_csrf)
+        if html is not None:
+            return html
+
+    html = render_template(
+        'results.html',
+        results=results,
+        cards=render_cache.render_cards(results.search_type, items, keys),
+        search_params=search_params,
+        page=page,
+        per_page=per_page,
+        enhance_with_exa=enhance_with_exa,
+        max=max,  # Provide the max function to the template
+        min=min,  # Provide the min function to the template
+        # Pages that may be cached carry a placeholder instead of this session's token
+        **({'csrf_token': lambda: CSRF_PLACEHOLDER} if page_key is not None else {})
+    )
+    if page_key is None:
+        return html
+    render_cache.set_page(page_key, html)
+    return html.replace(CSRF_PLACEHOLDER, generate_csrf())
+
+
 @bp.route('/', methods=['GET', 'POST'])
 @limiter.limit("60 per hour")
 def search():
@@ -108,63 +180,45 @@ def search():
         enhance_with_exa = request.form.get('enhance_with_exa') == 'on'
 
         # Create search service
-        search_service = SearchService(
-            github_token=current_app.config.get('GITHUB_TOKEN'),
-            exa_api_key=current_app.config.get('EXA_API_KEY')
-        )
+        search_service = get_search_service()
 
         # Perform search
-        results = search_service.combined_search(
-            search_params=search_params,
-            page=page,
-            per_page=per_page,
-            enhance_with_exa=enhance_with_exa
-        )
+        try:
+            results = search_service.combined_search(
+                search_params=search_params,
+                page=page,
+                per_page=per_page,
+                enhance_with_exa=enhance_with_exa
+            )
+        except GitHubRateLimitExceeded as e:
+            current_app.logger.warning(f"Search shed: {e}")
+            return render_template(
+                'index.html',
+                error=f"GitHub rate limit reached. Please try again in {e.retry_after:.0f} seconds."
+            ), 429
 
         if not results:
             return render_template('index.html', error="No results found or an error occurred"), 404
 
+        schedule_prefetch(search_service, search_params,
+                          results, enhance_with_exa)
+
         # Render results template
-        return render_template(
-            'results.html',
-            results=results,
-            search_params=search_params,
-            page=page,
-            per_page=per_page,
-            enhance_with_exa=enhance_with_exa,
-            max=max,  # Provide the max function to the template
-            min=min   # Provide the min function to the template
-        )
+        with current_app.extensions['metrics'].timer('exahub_stage_duration_seconds', stage='render'):
+            return render_results(results, search_params, page, per_page, enhance_with_exa)
 
     # If GET request, redirect to home page
     return render_template('index.html')
 
 
-@bp.route('/api', methods=['POST'])
-@limiter.limit("30 per minute")
-def api_search():
-    """Handle API search requests and return JSON response."""
-    # Check for JSON in request
-    if not request.is_json:
-        return jsonify({"error": "Request must be JSON"}), 400
-
-    data = request.get_json()
-
-    # Extract search parameters
-    query = data.get('query')
-    if not query:
-        return jsonify({"error": "Search query is required"}), 400
-
+def search_params_from_json(data):
+    """Build search parameters from an API request body."""
     # Process topics, subtopics, and tags
     topics = data.get('topics', [])
     subtopics = data.get('subtopics', [])
     tags = data.get('tags', [])
     exclude_topics = data.get('exclude_topics', [])
 
-    # Get pagination parameters
-    page = int(data.get('page', 1))
-    per_page = int(data.get('per_page', 10))
-
     # Validate and convert numeric parameters
     stars_data = data.get('stars')
     forks_data = data.get('forks')
@@ -200,8 +254,8 @@ def api_search():
             current_app.logger.warning(f"Error converting forks values: {e}")
 
     # Create search parameters object
-    search_params = GitHubSearchParams(
-        query=query,
+    return GitHubSearchParams(
+        query=data.get('query'),
         type=data.get('type', 'repositories'),
         language=data.get('language'),
         stars=stars,
@@ -218,33 +272,248 @@ def api_search():
         exclude_topics=exclude_topics
     )
 
+
+def parse_api_search_request():
+    """
+    Validate an /search/api request body.
+
+    Returns:
+        A tuple of (error response, None) or (None, search) where search is
+        (search_params, page, per_page, enhance_with_exa, fields)
+    """
+    # Check for JSON in request
+    if not request.is_json:
+        return (jsonify({"error": "Request must be JSON"}), 400), None
+
+    data = request.get_json()
+
+    # Extract search parameters
+    query = data.get('query')
+    if not query:
+        return (jsonify({"error": "Search query is required"}), 400), None
+
+    # Get pagination parameters
+    page = int(data.get('page', 1))
+    per_page = int(data.get('per_page', 10))
+
+    search_params = search_params_from_json(data)
+
     # Determine if Exa enhancement is requested
     enhance_with_exa = data.get('enhance_with_exa', True)
 
-    # Create search service
-    search_service = SearchService(
-        github_token=current_app.config.get('GITHUB_TOKEN'),
-        exa_api_key=current_app.config.get('EXA_API_KEY')
-    )
+    # Validate the field projection before spending any quota
+    try:
+        fields = parse_fields(data.get('fields'), search_params.type)
+    except InvalidFieldsError as e:
+        return (jsonify({"error": str(e)}), 400), None
 
-    # Perform search
-    results = search_service.combined_search(
-        search_params=search_params,
-        page=page,
-        per_page=per_page,
-        enhance_with_exa=enhance_with_exa
-    )
+    return None, (search_params, page, per_page, enhance_with_exa, fields)
+
+
+def rate_limited_response(e):
+    """Return the 429 response for a search shed by the GitHub token pool."""
+    current_app.logger.warning(f"API search shed: {e}")
+    response = jsonify({"error": str(e), "retry_after": e.retry_after})
+    response.headers["Retry-After"] = str(int(e.retry_after) + 1)
+    return response, 429
+
+
+def api_search_response(search_service, search, results):
+    """Return the /search/api response for the results of a search."""
+    search_params, page, per_page, enhance_with_exa, fields = search
 
     if not results:
         return jsonify({"error": "No results found or an error occurred"}), 404
 
+    schedule_prefetch(search_service, search_params, results, enhance_with_exa)
+
     # Return results as JSON
-    return jsonify({
-        "query": search_params.query,
-        "search_type": search_params.type,
-        "total_count": results.total_count,
-        "page": page,
-        "per_page": per_page,
-        "has_next_page": results.has_next_page,
-        "results": [vars(result) for result in results.results]
-    })
+    return current_app.response_class(
+        serialize_search_results(results, page, per_page, fields),
+        mimetype='application/json'
+    )
+
+
+@bp.route('/api', methods=['POST'])
+@limiter.limit("30 per minute")
+def api_search():
+    """Handle API search requests and return JSON response."""
+    error, search = parse_api_search_request()
+    if error:
+        return error
+    search_params, page, per_page, enhance_with_exa, _ = search
+
+    # Create search service
+    search_service = get_search_service()
+
+    # Perform search
+    try:
+        results = search_service.combined_search(
+            search_params=search_params,
+            page=page,
+            per_page=per_page,
+            enhance_with_exa=enhance_with_exa
+        )
+    except GitHubRateLimitExceeded as e:
+        return rate_limited_response(e)
+
+    return api_search_response(search_service, search, results)
+
+
+@bp.route('/api/stream', methods=['POST'])
+@limiter.limit("10 per minute")
+def api_search_stream():
+    """
+    Stream search results as NDJSON, walking GitHub pages up to max_results.
+
+    Accepts the same JSON body as /search/api plus max_results. Each page is
+    enhanced with Exa and written out as soon as it arrives, one result per
+    line, so only a single page is held in memory at a time. If a page fails,
+    a final line with an "error" key is written and the stream ends.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json()
+
+    if not data.get('query'):
+        return jsonify({"error": "Search query is required"}), 400
+
+    try:
+        page = max(1, int(data.get('page', 1)))
+        per_page = min(max(1, int(data.get('per_page', GITHUB_MAX_PER_PAGE))),
+                       GITHUB_MAX_PER_PAGE)
+        max_results = min(max(1, int(data.get('max_results', per_page))),
+                          GITHUB_SEARCH_RESULT_LIMIT)
+    except (ValueError, TypeError):
+        return jsonify({"error": "page, per_page and max_results must be integers"}), 400
+
+    search_params = search_params_from_json(data)
+    enhance_with_exa = data.get('enhance_with_exa', True)
+
+    try:
+        fields = parse_fields(data.get('fields'), search_params.type)
+    except InvalidFieldsError as e:
+        return jsonify({"error": str(e)}), 400
+
+    search_service = get_search_service()
+
+    def generate():
+        current_page = page
+        remaining = max_results
+        while remaining > 0 and (current_page - 1) * per_page < GITHUB_SEARCH_RESULT_LIMIT:
+            try:
+                results = search_service.combined_search(
+                    search_params=search_params,
+                    page=current_page,
+                    per_page=per_page,
+                    enhance_with_exa=enhance_with_exa
+                )
+            except GitHubRateLimitExceeded as e:
+                current_app.logger.warning(f"Streaming search shed: {e}")
+                yield dumps({"error": str(e), "page": current_page,
+                             "retry_after": e.retry_after}) + b"\n"
+                return
+
+            if not results:
+                yield dumps({"error": "No results found or an error occurred",
+                             "page": current_page}) + b"\n"
+                return
+
+            items = results.results[:remaining]
+            if not items:
+                return
+            remaining -= len(items)
+            if remaining > 0:
+                schedule_prefetch(search_service, search_params,
+                                  results, enhance_with_exa)
+            yield ndjson_lines(items, fields)
+
+            if not results.has_next_page:
+                return
+            current_page += 1
+
+    return current_app.response_class(
+        stream_with_context(generate()),
+        mimetype='application/x-ndjson'
+    )
+
+
+@bp.route('/api/batch', methods=['POST'])
+@limiter.limit("5 per minute")
+def api_search_batch():
+    """
+    Run many searches in one request.
+
+    The body holds a list of /search/api bodies under "searches", an optional
+    "deadline" in seconds for the whole batch and an optional default
+    "fields" projection. Each search gets its own entry in the response, in
+    request order, with either its results or its error.
+    """
+    if not request.is_json:
+        return jsonify({"error": "Request must be JSON"}), 400
+
+    data = request.get_json()
+    searches = data.get('searches')
+    batch_searcher = current_app.extensions['batch_searcher']
+
+    if not isinstance(searches, list) or not searches:
+        return jsonify({"error": "searches must be a non-empty list"}), 400
+    if len(searches) > batch_searcher.max_searches:
+        return jsonify({"error": f"A batch may contain at most {batch_searcher.max_searches} searches"}), 400
+
+    deadline = data.get('deadline')
+    try:
+        deadline = float(deadline) if deadline is not None else None
+    except (ValueError, TypeError):
+        return jsonify({"error": "deadline must be a number of seconds"}), 400
+
+    # Validate every search up front; invalid ones are reported without running
+    entries = [None] * len(searches)
+    queries = []
+    for index, search in enumerate(searches):
+        if not isinstance(search, dict) or not search.get('query'):
+            entries[index] = {"index": index, "status": "invalid",
+                              "error": "Search query is required"}
+            continue
+        try:
+            search_params = search_params_from_json(search)
+            query = BatchQuery(
+                search_params=search_params,
+                page=int(search.get('page', 1)),
+                per_page=int(search.get('per_page', 10)),
+                enhance_with_exa=search.get('enhance_with_exa', True)
+            )
+            fields = parse_fields(search.get('fields', data.get('fields')),
+                                  search_params.type)
+        except (InvalidFieldsError, ValueError, TypeError) as e:
+            entries[index] = {"index": index,
+                              "status": "invalid", "error": str(e)}
+            continue
+        queries.append((index, query, fields))
+
+    started = time.perf_counter()
+    outcomes = batch_searcher.run(
+        get_search_service(), [query for _, query, _ in queries], deadline)
+
+    for (index, query, fields), outcome in zip(queries, outcomes):
+        entry = {"index": index, "status": outcome.status,
+                 "deduplicated": outcome.deduplicated}
+        if outcome.results is not None:
+            entry.update(search_results_payload(
+                outcome.results, query.page, query.per_page, fields))
+        else:
+            entry["error"] = outcome.error
+            if outcome.retry_after is not None:
+                entry["retry_after"] = outcome.retry_after
+        entries[index] = entry
+
+    return current_app.response_class(
+        dumps({
+            "results": entries,
+            "searches": len(searches),
+            "deduplicated": sum(1 for outcome in outcomes if outcome.deduplicated),
+            "elapsed": round(time.perf_counter() - started, 3)
+        }),
+        mimetype='application/json'
+    )
@@ -0,0 +1,252 @@
+"""
+Async variant of the search service
+
+Runs the GitHub and Exa calls of a search on pooled async HTTP clients so
+that one process can hold many upstream waits at once. Query building,
+caching, result parsing and Exa matching are shared with SearchService.
+"""
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+import asyncio
+import logging
+import time
+
+from app.models.search_params import GitHubSearchParams
+from app.models.search_result import SearchResults
+from app.services.candidate_pool import POOL_PAGE_SIZE, CandidatePool
+from app.services.http_client import AsyncUpstreamClients, httpx
+from app.services.search_service import SearchService, github_endpoint
+from app.services.single_flight import AsyncSingleFlight
+
+logger = logging.getLogger(__name__)
+
+
+class AsyncSearchService(SearchService):
+    """Search service whose upstream calls are coroutines."""
+
+    def __init__(self, clients: AsyncUpstreamClients, single_flight: Optional[AsyncSingleFlight] = None,
+                 **kwargs):
+        """
+        Initialize the async search service.
+
+        Args:
+            clients: Shared pooled async HTTP clients
+            single_flight: Coalescer shared by concurrent identical combined searches
+            **kwargs: Arguments of SearchService; sessions only provides the
+                upstream URLs, and executor is not used
+        """
+        super().__init__(**kwargs)
+        self.clients = clients
+        self.async_single_flight = single_flight
+
+    async def github_search(self, search_params: GitHubSearchParams, page: int = 1,
+                            per_page: int = 10) -> Optional[SearchResults]:
+        """Perform a search using the GitHub API; see SearchService.github_search."""
+        if self.candidate_pools is not None and self.candidate_pools.serves(page, per_page):
+            pool, missing = self._candidate_pool(search_params, page, per_page)
+            pool = await self._grown_pool(search_params, pool, missing, page, per_page)
+            return pool.page(page, per_page) if pool is not None else None
+        return await self._fetch_github_search(search_params, page, per_page)
+
+    async def _grown_pool(self, search_params: GitHubSearchParams, pool: CandidatePool, missing: range,
+                          page: int, per_page: int) -> Optional[CandidatePool]:
+        """Fetch the missing pool pages of a search; see SearchService._grown_pool."""
+        chunks = []
+        for pool_page in missing:
+            chunk = await self._fetch_github_search(search_params, pool_page, POOL_PAGE_SIZE)
+            if chunk is None:
+                break
+            chunks.append(chunk)
+            if len(chunk.results) < POOL_PAGE_SIZE:
+                break
+        return self._stored_pool(search_params, pool, chunks, page, per_page)
+
+    async def _fetch_github_search(self, search_params: GitHubSearchParams, page: int,
+                                   per_page: int) -> Optional[SearchResults]:
+        """Fetch one page of a search; see SearchService._fetch_github_search."""
+        prepared, results = self._prepare_github_search(
+            search_params, page, per_page)
+        if prepared is None:
+            return results
+
+        try:
+            response = await self._github_request(prepared.url, prepared.headers, prepared.params)
+            return self._github_search_response(prepared, response)
+
+        except httpx.HTTPError as e:
+            logger.error(f"Error during GitHub API request: {e}")
+            return None
+
+    async def _github_request(self, url: str, headers: Dict[str, str], params: Dict[str, Any]) -> "httpx.Response":
+        """Send a GitHub API request on the token with the most quota; see SearchService._github_request."""
+        if self.token_pool is None:
+            if self.github_token:
+                headers["Authorization"] = f"token {self.github_token}"
+            return await self._send_github(url, headers, params)
+
+        # After every token was rate limited, acquiring again queues for quota or sheds
+        for attempt in range(len(self.token_pool) + 1):
+            token_state = await self.token_pool.acquire_async()
+            headers["Authorization"] = f"token {token_state.token}"
+            response = None
+            try:
+                response = await self._send_github(url, headers, params)
+            finally:
+                rate_limited = self.token_pool.release(
+                    token_state,
+                    response.status_code if response is not None else None,
+                    response.headers if response is not None else None
+                )
+            if not rate_limited:
+                return response
+        raise self.token_pool.exceeded()
+
+    async def _send_github(self, url: str, headers: Dict[str, str], params: Dict[str, Any]) -> "httpx.Response":
+        """Send one GitHub API request on the async client, recording its round trip."""
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.clients.request(
+                self.clients.github, "GET", url, headers=headers, params=params)
+            return response
+        finally:
+            self.metrics.record_upstream(
+                "github", github_endpoint(url),
+                response.status_code if response is not None else None,
+                time.perf_counter() - started)
+
+    async def exa_search(self, query: str, num_results: int = 10) -> Optional[List[Dict[str, Any]]]:
+        """Perform a semantic search using the Exa API; see SearchService.exa_search."""
+        if not self.exa_api_key:
+            logger.error("Exa API key not provided")
+            return None
+
+        cache_key = self._exa_cache_key(query, num_results)
+        if cache_key is not None:
+            cached = self.exa_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        headers, payload = self._exa_request(query, num_results)
+
+        try:
+            response = await self._send_exa(headers, payload)
+            response.raise_for_status()
+
+            results = response.json().get("results", [])
+            if cache_key is not None:
+                self.exa_cache.set(cache_key, results)
+            return results
+
+        except httpx.HTTPError as e:
+            logger.error(f"Error during Exa API request: {e}")
+            return None
+
+    async def _send_exa(self, headers: Dict[str, str], payload: Dict[str, Any]) -> "httpx.Response":
+        """Send one Exa search request on the async client, recording its round trip."""
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.clients.request(
+                self.clients.exa, "POST", f"{self.sessions.exa_url}/search",
+                headers=headers, json=payload)
+            return response
+        finally:
+            self.metrics.record_upstream(
+                "exa", "search", response.status_code if response is not None else None,
+                time.perf_counter() - started)
+
+    async def combined_search(self, search_params: GitHubSearchParams, page: int = 1, per_page: int = 10,
+                              enhance_with_exa: bool = True) -> Optional[SearchResults]:
+        """
+        Perform a combined search using both GitHub and Exa APIs.
+
+        The GitHub and Exa calls always run together, bounded by the same
+        deadlines as the threaded path of SearchService.combined_search.
+        """
+        use_exa = enhance_with_exa and bool(self.exa_api_key)
+        use_vectors = enhance_with_exa and self.vector_index is not None
+
+        if self.async_single_flight is None:
+            return await self._combined_search(search_params, page, per_page, use_exa, use_vectors)
+
+        key = self.combined_search_key(
+            search_params, page, per_page, enhance_with_exa)
+        results, _ = await self.async_single_flight.do(
+            key, self._combined_search, search_params, page, per_page, use_exa, use_vectors)
+        # Every caller gets its own copy of the shared result
+        return results.copy() if results else results
+
+    async def _combined_search(self, search_params: GitHubSearchParams, page: int, per_page: int,
+                               use_exa: bool, use_vectors: bool = False) -> Optional[SearchResults]:
+        """Run the GitHub and (optionally) Exa searches together and merge their results."""
+        started = time.perf_counter()
+        if self._ranks_pool(page, per_page):
+            return await self._combined_pool_search(search_params, page, per_page, use_exa, use_vectors, started)
+
+        github_results, exa_results, timings = await self._run_together(
+            self.github_search(search_params, page, per_page),
+            self.exa_search(search_params.query, per_page) if use_exa else None, started)
+        return self._merge_results(github_results, exa_results, timings, started, use_vectors)
+
+    async def _combined_pool_search(self, search_params: GitHubSearchParams, page: int, per_page: int,
+                                    use_exa: bool, use_vectors: bool, started: float) -> Optional[SearchResults]:
+        """Serve a combined search page from its pool, ranked as a whole; see SearchService._combined_pool_search."""
+        pool, missing = self._candidate_pool(search_params, page, per_page)
+        if not missing and pool.is_ranked(self._pool_ranking(use_exa, use_vectors)):
+            return self._ranked_pool_page(pool, page, per_page, started)
+
+        pool, exa_results, timings = await self._run_together(
+            self._grown_pool(search_params, pool, missing, page, per_page),
+            self.exa_search(search_params.query, POOL_PAGE_SIZE) if use_exa else None, started)
+        if pool is None:
+            return None
+        return self._rank_pool(search_params, pool, exa_results, timings, started,
+                               page, per_page, use_exa, use_vectors)
+
+    async def _run_together(self, github_leg: Awaitable, exa_leg: Optional[Awaitable],
+                            started: float) -> Tuple[Any, Optional[List[Dict[str, Any]]], Dict[str, float]]:
+        """
+        Await the GitHub and (optionally) Exa calls together under their deadlines.
+
+        Returns the GitHub leg's result, None on failure or a missed deadline,
+        the Exa results, None unless they arrived in time, and the leg timings.
+        """
+        timings: Dict[str, float] = {}
+        github_task = asyncio.ensure_future(self._timed_async(github_leg))
+        exa_task = None
+        if exa_leg is not None:
+            exa_task = asyncio.ensure_future(self._timed_async(exa_leg))
+
+        try:
+            try:
+                github_results, timings["github"] = await asyncio.wait_for(
+                    github_task, timeout=self.github_deadline)
+            except asyncio.TimeoutError:
+                logger.error(
+                    f"GitHub search exceeded its {self.github_deadline}s deadline")
+                return None, None, timings
+
+            exa_results = None
+            if exa_task is not None and github_results:
+                remaining = None
+                if self.exa_deadline is not None:
+                    remaining = max(0.0, self.exa_deadline -
+                                    (time.perf_counter() - started))
+                try:
+                    exa_results, timings["exa"] = await asyncio.wait_for(exa_task, timeout=remaining)
+                except asyncio.TimeoutError:
+                    logger.warning(
+                        f"Exa search exceeded its {self.exa_deadline}s deadline; returning unenhanced results")
+        finally:
+            # No point finishing the Exa leg when GitHub failed or was shed
+            if exa_task is not None and not exa_task.done():
+                exa_task.cancel()
+
+        return github_results, exa_results, timings
+
+    @staticmethod
+    async def _timed_async(awaitable: Awaitable) -> Tuple[Any, float]:
+        """Await a coroutine and return its result with the elapsed wall time in seconds."""
+        started = time.perf_counter()
+        result = await awaitable
+        return result, time.perf_counter() - started
@@ -0,0 +1,151 @@
+"""
+Async variant of the similarity service
+
+Sends Exa similarity searches on a pooled async HTTP client. The /search
+and /findSimilar payloads are built from the parameters of the wrapped
+SimilarityService, and the responses are parsed into SimilarityResult
+objects. Results share the cache and cache counters of the wrapped
+service, so both serving paths answer and cache identically.
+"""
+from typing import Any, Awaitable, Callable, Dict, List
+import logging
+import time
+
+from app.services.http_client import AsyncUpstreamClients
+from app.services.similarity_service import ExaRequestError, SimilarityResult, SimilarityService
+
+logger = logging.getLogger(__name__)
+
+# Exa API names of the parameters built by SimilarityService
+API_FIELDS = {
+    "type": "type",
+    "use_autoprompt": "useAutoprompt",
+    "num_results": "numResults",
+    "include_domains": "includeDomains",
+    "exclude_domains": "excludeDomains",
+    "start_published_date": "startPublishedDate",
+    "end_published_date": "endPublishedDate",
+}
+
+# Parameters selecting page contents, sent nested under "contents"
+CONTENTS_FIELDS = ("text", "highlights")
+
+
+def exa_payload(params: Dict[str, Any], **subject: Any) -> Dict[str, Any]:
+    """
+    Build the JSON payload of an Exa /search or /findSimilar request.
+
+    Args:
+        params: Parameters from SimilarityService.search_params or find_similar_params
+        **subject: The query or URL field of the request, e.g. query="..." or url="..."
+
+    Raises:
+        ValueError: If a parameter has no Exa API counterpart
+    """
+    payload = dict(subject)
+    contents = {}
+    for name, value in params.items():
+        if value is None:
+            continue
+        if name in CONTENTS_FIELDS:
+            contents[name] = value
+        elif name in API_FIELDS:
+            payload[API_FIELDS[name]] = value
+        else:
+            raise ValueError(f"Invalid option: '{name}'")
+    # Exa returns no contents unless asked; default to the text like the SDK
+    payload["contents"] = contents or {"text": True}
+    return payload
+
+
+class AsyncSimilarityService:
+    """Coroutine front-end for a SimilarityService."""
+
+    def __init__(self, similarity_service: SimilarityService, clients: AsyncUpstreamClients):
+        """
+        Initialize the async similarity service.
+
+        Args:
+            similarity_service: The app-wide service whose key, parameters and cache are shared
+            clients: Shared pooled async HTTP clients
+        """
+        self.service = similarity_service
+        self.clients = clients
+
+    def _headers(self) -> Dict[str, str]:
+        """Return the Exa request headers for the service's current API key."""
+        exa_api_key = self.service.exa_api_key
+        if not exa_api_key:
+            raise ValueError("Exa API key is required for similarity search")
+        return {
+            "x-api-key": exa_api_key,
+            "Content-Type": "application/json"
+        }
+
+    async def _send(self, endpoint: str, payload: Dict[str, Any]) -> List[SimilarityResult]:
+        """Send an Exa request and parse the results of its response."""
+        headers = self._headers()
+        started = time.perf_counter()
+        response = None
+        try:
+            response = await self.clients.request(
+                self.clients.exa, "POST", f"{self.service.sessions.exa_url}/{endpoint}",
+                json=payload, headers=headers)
+        finally:
+            self.service.metrics.record_upstream(
+                "exa", endpoint, response.status_code if response is not None else None,
+                time.perf_counter() - started)
+        if response.status_code != 200:
+            raise ExaRequestError(response.status_code, response.text)
+        return [SimilarityResult.from_api(result) for result in response.json().get("results", [])]
+
+    async def _cached(self, endpoint: str, subject: str, params: Dict[str, Any],
+                      fetch: Callable[[], Awaitable[List[Any]]]) -> List[Any]:
+        """Return cached results for an upstream call; see SimilarityService._cached."""
+        service = self.service
+        if service.cache is None:
+            return await fetch()
+
+        key = service.cache_key(endpoint, subject, params)
+        results = service.cache.get(key)
+        if results is not None:
+            service.cache_stats[endpoint].incr("hits")
+            return results
+
+        service.cache_stats[endpoint].incr("misses")
+        results = await fetch()
+        service.cache.set(key, results)
+        return results
+
+    async def search_similar_content(self, prompt: str, **kwargs) -> List[Any]:
+        """
+        Search for content similar to the user prompt using the Exa API.
+
+        Takes the same arguments as SimilarityService.search_similar_content.
+        """
+        if not self.service.validate_api_key():
+            raise ValueError("Exa API key is required for similarity search")
+
+        try:
+            params = self.service.search_params(**kwargs)
+            payload = exa_payload(params, query=prompt)
+            return await self._cached(
+                "search", prompt, params, lambda: self._send("search", payload))
+        except Exception as e:
+            logger.error(f"Error occurred during search: {e}")
+            raise
+
+    async def find_similar_links(self, url: str, **kwargs) -> List[Any]:
+        """
+        Find links similar to the provided URL using the Exa API.
+
+        Takes the same arguments as SimilarityService.find_similar_links.
+        """
+        try:
+            params = self.service.find_similar_params(**kwargs)
+            payload = exa_payload(params, url=url)
+            return await self._cached(
+                "find_similar", url, params, lambda: self._send("findSimilar", payload))
+        except Exception as e:
+            logger.error(f"Error occurred while finding similar links: {e}")
+            raise
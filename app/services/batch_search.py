@@ -0,0 +1,182 @@
+"""
+Batch execution of many searches in one request
+
+Runs a list of searches on a small bounded worker pool shared by all batch
+requests. Identical searches within a batch run once, queries that have not
+started when the batch deadline passes are cancelled, and once GitHub sheds
+a query for lack of quota the queries that have not started yet fail fast
+instead of each queueing for quota in turn.
+"""
+from concurrent.futures import ThreadPoolExecutor, wait
+from dataclasses import dataclass
+from typing import Any, Dict, List, Mapping, Optional
+import logging
+import threading
+import time
+
+from app.models.search_params import GitHubSearchParams
+from app.models.search_result import SearchResults
+from app.services.rate_limit import GitHubRateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class BatchQuery:
+    """A single search of a batch."""
+    search_params: GitHubSearchParams
+    page: int = 1
+    per_page: int = 10
+    enhance_with_exa: bool = True
+
+
+@dataclass
+class BatchOutcome:
+    """The result of a single search of a batch."""
+    results: Optional[SearchResults] = None
+    status: str = "ok"
+    error: Optional[str] = None
+    retry_after: Optional[float] = None
+    deduplicated: bool = False
+
+
+class _Shed:
+    """Rate-limit state shared by the queries of one batch."""
+
+    def __init__(self):
+        self.error: Optional[GitHubRateLimitExceeded] = None
+        self.until = 0.0
+
+
+class BatchSearcher:
+    """Run batches of searches with bounded concurrency and an overall deadline."""
+
+    def __init__(self, max_workers: int = 4, max_searches: int = 50, deadline: float = 30.0):
+        """
+        Initialize the batch searcher.
+
+        Args:
+            max_workers: Number of searches run at once across all batches
+            max_searches: Maximum number of searches accepted in one batch
+            deadline: Default and maximum number of seconds a batch may take
+        """
+        self.max_searches = max_searches
+        self.deadline = deadline
+        self.batches = 0
+        self.executed = 0
+        self.deduplicated = 0
+        self.timed_out = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='exahub-batch')
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "BatchSearcher":
+        """Create a batch searcher from BATCH_* config keys."""
+        return cls(
+            max_workers=int(config.get('BATCH_MAX_WORKERS', 4)),
+            max_searches=int(config.get('BATCH_MAX_SEARCHES', 50)),
+            deadline=float(config.get('BATCH_DEADLINE', 30.0))
+        )
+
+    def run(self, search_service, queries: List[BatchQuery],
+            deadline: Optional[float] = None) -> List[BatchOutcome]:
+        """
+        Run a batch of searches.
+
+        Args:
+            search_service: The SearchService to run the searches with
+            queries: The searches, in request order
+            deadline: Seconds the whole batch may take, capped at the configured deadline
+
+        Returns:
+            One outcome per query, in the same order as the queries
+        """
+        deadline = self.deadline if deadline is None else min(
+            max(0.0, deadline), self.deadline)
+        expires = time.monotonic() + deadline
+        shed = _Shed()
+
+        # Identical searches run once and share their outcome
+        positions: Dict[str, List[int]] = {}
+        unique: Dict[str, BatchQuery] = {}
+        for position, query in enumerate(queries):
+            key = search_service.combined_search_key(
+                query.search_params, query.page, query.per_page, query.enhance_with_exa)
+            positions.setdefault(key, []).append(position)
+            unique.setdefault(key, query)
+
+        futures = {
+            key: self._executor.submit(
+                self._search, search_service, query, expires, shed)
+            for key, query in unique.items()
+        }
+        wait(futures.values(), timeout=max(0.0, expires - time.monotonic()))
+
+        outcomes: List[Optional[BatchOutcome]] = [None] * len(queries)
+        timed_out = 0
+        for key, future in futures.items():
+            if future.done() and not future.cancelled():
+                outcome = future.result()
+            else:
+                # Searches that have not started are dropped; running ones finish
+                # in the background and still land in the cache
+                future.cancel()
+                timed_out += 1
+                outcome = BatchOutcome(status="timeout",
+                                       error="Batch deadline exceeded")
+
+            for n, position in enumerate(positions[key]):
+                outcomes[position] = outcome if n == 0 else BatchOutcome(
+                    results=outcome.results, status=outcome.status, error=outcome.error,
+                    retry_after=outcome.retry_after, deduplicated=True)
+
+        with self._lock:
+            self.batches += 1
+            self.executed += len(futures)
+            self.deduplicated += len(queries) - len(futures)
+            self.timed_out += timed_out
+
+        return outcomes
+
+    @staticmethod
+    def _search(search_service, query: BatchQuery, expires: float, shed: _Shed) -> BatchOutcome:
+        """Run one search of a batch, turning failures into an outcome."""
+        if time.monotonic() >= expires:
+            return BatchOutcome(status="timeout", error="Batch deadline exceeded")
+        if shed.error is not None and time.time() < shed.until:
+            return BatchOutcome(status="rate_limited", error=str(shed.error),
+                                retry_after=max(0.0, shed.until - time.time()))
+
+        try:
+            results = search_service.combined_search(
+                search_params=query.search_params,
+                page=query.page,
+                per_page=query.per_page,
+                enhance_with_exa=query.enhance_with_exa
+            )
+        except GitHubRateLimitExceeded as e:
+            shed.error = e
+            shed.until = time.time() + e.retry_after
+            return BatchOutcome(status="rate_limited", error=str(e), retry_after=e.retry_after)
+        except Exception as e:
+            logger.warning(
+                f"Batch search for '{query.search_params.query}' failed: {e}")
+            return BatchOutcome(status="error", error=str(e))
+
+        if not results:
+            return BatchOutcome(status="error", error="No results found or an error occurred")
+        return BatchOutcome(results=results)
+
+    def shutdown(self):
+        """Stop the worker pool without waiting for running searches."""
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+    def stats(self) -> Dict[str, int]:
+        """Return batch counters."""
+        return {
+            "batches": self.batches,
+            "executed": self.executed,
+            "deduplicated": self.deduplicated,
+            "timed_out": self.timed_out
+        }
@@ -0,0 +1,321 @@
+"""
+Response cache for upstream API results
+
+This module implements a bounded LRU cache with per-entry TTL and two
+interchangeable backends: an in-process store and a SQLite store that can
+be shared by several workers on the same host.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CacheStats:
+    """Thread-safe hit/miss/eviction counters for a cache."""
+
+    def __init__(self):
+        """Initialize all counters to zero."""
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.revalidations = 0
+
+    def incr(self, counter: str, amount: int = 1):
+        """Increment one of the counters."""
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + amount)
+
+    @property
+    def hit_rate(self) -> float:
+        """Return the fraction of lookups that were hits."""
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Return the counters as a dictionary."""
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "revalidations": self.revalidations,
+            "hit_rate": self.hit_rate
+        }
+
+
+class MemoryCache:
+    """In-process LRU cache with per-entry TTL."""
+
+    def __init__(self, max_entries: int = 512, default_ttl: float = 300):
+        """
+        Initialize the cache.
+
+        Args:
+            max_entries: Maximum number of entries kept before the least recently used is evicted
+            default_ttl: Default time-to-live of an entry in seconds
+        """
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._entries: "OrderedDict[str, Tuple[Any, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None if it is missing or expired."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.incr("misses")
+                return None
+
+            value, expires_at = entry
+            if expires_at <= time.time():
+                del self._entries[key]
+                self.stats.incr("expirations")
+                self.stats.incr("misses")
+                return None
+
+            self._entries.move_to_end(key)
+            self.stats.incr("hits")
+            return value
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Return the cached value for a key together with whether it is still fresh.
+
+        Unlike get(), expired entries are returned (and kept) so that callers can
+        revalidate them upstream. Expired entries count as misses.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats.incr("misses")
+                return None, False
+
+            self._entries.move_to_end(key)
+            value, expires_at = entry
+            if expires_at <= time.time():
+                self.stats.incr("expirations")
+                self.stats.incr("misses")
+                return value, False
+
+            self.stats.incr("hits")
+            return value, True
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value under a key, evicting the least recently used entries if full."""
+        expires_at = time.time() + (self.default_ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.stats.incr("evictions")
+
+    def delete(self, key: str):
+        """Remove a key from the cache."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class SQLiteCache:
+    """
+    SQLite-backed LRU cache with per-entry TTL.
+
+    The database file can be shared by several worker processes on one host.
+    Values are pickled; hit/miss/eviction counters are kept per process.
+    """
+
+    def __init__(self, path: str, max_entries: int = 512, default_ttl: float = 300):
+        """
+        Initialize the cache.
+
+        Args:
+            path: Path of the SQLite database file
+            max_entries: Maximum number of entries kept before the least recently used is evicted
+            default_ttl: Default time-to-live of an entry in seconds
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.default_ttl = default_ttl
+        self.stats = CacheStats()
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache_entries ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " expires_at REAL NOT NULL,"
+                " accessed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_entries_accessed_at"
+                " ON cache_entries (accessed_at)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None if it is missing or expired."""
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.stats.incr("misses")
+                    return None
+
+                value, expires_at = row
+                if expires_at <= now:
+                    conn.execute(
+                        "DELETE FROM cache_entries WHERE key = ?", (key,))
+                    self.stats.incr("expirations")
+                    self.stats.incr("misses")
+                    return None
+
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            self.stats.incr("hits")
+            return pickle.loads(value)
+        except (sqlite3.Error, pickle.PickleError) as e:
+            logger.error(f"Error reading from SQLite cache: {e}")
+            self.stats.incr("misses")
+            return None
+
+    def lookup(self, key: str) -> Tuple[Optional[Any], bool]:
+        """
+        Return the cached value for a key together with whether it is still fresh.
+
+        Unlike get(), expired entries are returned (and kept) so that callers can
+        revalidate them upstream. Expired entries count as misses.
+        """
+        now = time.time()
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT value, expires_at FROM cache_entries WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self.stats.incr("misses")
+                    return None, False
+
+                conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE key = ?", (now, key))
+            value, expires_at = row
+            fresh = expires_at > now
+            if fresh:
+                self.stats.incr("hits")
+            else:
+                self.stats.incr("expirations")
+                self.stats.incr("misses")
+            return pickle.loads(value), fresh
+        except (sqlite3.Error, pickle.PickleError) as e:
+            logger.error(f"Error reading from SQLite cache: {e}")
+            self.stats.incr("misses")
+            return None, False
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None):
+        """Store a value under a key, evicting the least recently used entries if full."""
+        now = time.time()
+        expires_at = now + (self.default_ttl if ttl is None else ttl)
+        try:
+            blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+            with self._connection() as conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO cache_entries (key, value, expires_at, accessed_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    (key, sqlite3.Binary(blob), expires_at, now)
+                )
+                count = conn.execute(
+                    "SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+                overflow = count - self.max_entries
+                if overflow > 0:
+                    conn.execute(
+                        "DELETE FROM cache_entries WHERE key IN ("
+                        " SELECT key FROM cache_entries ORDER BY accessed_at LIMIT ?)",
+                        (overflow,)
+                    )
+                    self.stats.incr("evictions", overflow)
+        except (sqlite3.Error, pickle.PickleError) as e:
+            logger.error(f"Error writing to SQLite cache: {e}")
+
+    def delete(self, key: str):
+        """Remove a key from the cache."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache_entries WHERE key = ?", (key,))
+
+    def clear(self):
+        """Remove all entries from the cache."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM cache_entries")
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM cache_entries").fetchone()[0]
+
+
+def create_cache(backend: Optional[str], max_entries: int = 512, default_ttl: float = 300,
+                 path: Optional[str] = None):
+    """
+    Create a cache for the configured backend.
+
+    Args:
+        backend: 'memory', 'sqlite', or None/'none' to disable caching
+        max_entries: Maximum number of entries
+        default_ttl: Default time-to-live of an entry in seconds
+        path: Database path for the SQLite backend
+
+    Returns:
+        A cache instance or None if caching is disabled
+    """
+    if not backend or backend == "none":
+        return None
+    if backend == "memory":
+        return MemoryCache(max_entries=max_entries, default_ttl=default_ttl)
+    if backend == "sqlite":
+        if not path:
+            raise ValueError("A database path is required for the SQLite cache")
+        return SQLiteCache(path, max_entries=max_entries, default_ttl=default_ttl)
+    raise ValueError(f"Unknown cache backend: {backend}")
+
+
+def cache_from_config(config: Mapping[str, Any], prefix: str, default_path: str):
+    """Create a cache from '<prefix>_BACKEND', '_MAX_ENTRIES', '_TTL' and '_PATH' config keys."""
+    return create_cache(
+        config.get(f'{prefix}_BACKEND'),
+        max_entries=int(config.get(f'{prefix}_MAX_ENTRIES', 512)),
+        default_ttl=float(config.get(f'{prefix}_TTL', 300)),
+        path=config.get(f'{prefix}_PATH') or default_path
+    )
@@ -0,0 +1,145 @@
+"""
+Candidate pools for local pagination
+
+A pool holds the results of one search fetched from GitHub in pages of
+POOL_PAGE_SIZE, the most GitHub returns per call. UI pages of any size are
+then sliced from the pool, so browsing the first few pages of a search at
+10 results per page costs one GitHub call per 100 results instead of one
+per page. A pool grows a chunk at a time as pages past its end are asked
+for, up to the configured size; pages beyond it are fetched directly.
+
+When results are re-ranked, a combined search enhances and ranks the whole
+pool once and stores it in ranked order beside GitHub's, so its pages are
+slices of one ranking rather than pages of GitHub's order ranked one at a
+time. Growing the pool drops the ranking until it is ranked again.
+
+Pools are immutable; growing or ranking one stores a new pool under the
+same key.
+"""
+import copy
+from dataclasses import dataclass, replace
+from typing import Any, Mapping, Optional, Sequence, Tuple
+
+from app.models.search_params import GitHubSearchParams
+from app.models.search_result import SearchResults
+from app.services.cache import cache_from_config
+
+# GitHub's largest page, and its cap on the results of one search
+POOL_PAGE_SIZE = 100
+GITHUB_SEARCH_RESULT_LIMIT = 1000
+
+
+@dataclass(frozen=True)
+class CandidatePool:
+    """The first results of a search, in GitHub's order."""
+    search_type: str
+    query: str
+    total_count: int = 0
+    items: Tuple[Any, ...] = ()
+    # GitHub has no results past the pool
+    complete: bool = False
+    # Enhanced copies of the items, best first, and the enhancement they were ranked with
+    ranked: Tuple[Any, ...] = ()
+    ranked_by: Optional[str] = None
+
+    def available(self) -> int:
+        """Return how many results GitHub can return for the search, at most."""
+        return min(self.total_count, GITHUB_SEARCH_RESULT_LIMIT)
+
+    def covers(self, page: int, per_page: int) -> bool:
+        """Return whether every result of a UI page is in the pool."""
+        return self.complete or len(self.items) >= page * per_page
+
+    def missing_pages(self, page: int, per_page: int) -> range:
+        """Return the POOL_PAGE_SIZE pages to fetch before the pool covers a UI page."""
+        if self.covers(page, per_page):
+            return range(0)
+        fetched = len(self.items) // POOL_PAGE_SIZE
+        return range(fetched + 1, -(-page * per_page // POOL_PAGE_SIZE) + 1)
+
+    def extended(self, chunks: Sequence[SearchResults]) -> "CandidatePool":
+        """Return the pool grown by consecutive POOL_PAGE_SIZE pages of results."""
+        items = list(self.items)
+        total_count = self.total_count
+        complete = self.complete
+        for chunk in chunks:
+            items.extend(chunk.results)
+            total_count = chunk.total_count
+            complete = len(chunk.results) < POOL_PAGE_SIZE
+        complete = complete or len(items) >= min(total_count, GITHUB_SEARCH_RESULT_LIMIT)
+        return CandidatePool(self.search_type, self.query, total_count, tuple(items), complete)
+
+    def is_ranked(self, ranking: str) -> bool:
+        """Return whether every item of the pool is ranked with an enhancement."""
+        return self.ranked_by == ranking and len(self.ranked) == len(self.items)
+
+    def ranked_as(self, items: Sequence[Any], ranking: str) -> "CandidatePool":
+        """Return the pool with its items, enhanced and ranked with an enhancement, stored."""
+        return replace(self, ranked=tuple(items), ranked_by=ranking)
+
+    def candidates(self) -> SearchResults:
+        """Return every item of the pool as one page in GitHub's order, to be enhanced and ranked."""
+        return self.page(1, max(len(self.items), 1))
+
+    def page(self, page: int, per_page: int, ranked: bool = False) -> SearchResults:
+        """
+        Return a UI page of results; its items are copies that can be enhanced freely.
+
+        With ranked, the page is sliced from the ranked items instead of GitHub's order.
+        """
+        start = (page - 1) * per_page
+        results = SearchResults(
+            query=self.query,
+            search_type=self.search_type,
+            total_count=self.total_count,
+            page=page,
+            per_page=per_page,
+            has_next_page=self.available() > start + per_page
+        )
+        items = self.ranked if ranked else self.items
+        results.results = [copy.copy(item) for item in items[start:start + per_page]]
+        return results
+
+
+class CandidatePools:
+    """Cache of candidate pools keyed by search."""
+
+    def __init__(self, cache: Any, size: int = 300):
+        """
+        Initialize the pools.
+
+        Args:
+            cache: Cache the pools are stored in (see app.services.cache)
+            size: Largest number of results a pool grows to
+        """
+        self.cache = cache
+        self.size = min(size, GITHUB_SEARCH_RESULT_LIMIT)
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any], default_path: str) -> Optional["CandidatePools"]:
+        """Create the pools from the 'CANDIDATE_POOL_*' config keys, or None if their cache is disabled."""
+        cache = cache_from_config(config, 'CANDIDATE_POOL', default_path)
+        if cache is None:
+            return None
+        return cls(cache, size=int(config.get('CANDIDATE_POOL_SIZE', 300)))
+
+    @staticmethod
+    def key(search_params: GitHubSearchParams) -> str:
+        """Build the cache key of a search's pool from its normalized query."""
+        query = " ".join(search_params.build_github_query().lower().split())
+        return f"pool:{search_params.type or 'repositories'}:{query}"
+
+    def serves(self, page: int, per_page: int) -> bool:
+        """Return whether a UI page lies within the pool size."""
+        return page * per_page <= self.size
+
+    def get(self, search_params: GitHubSearchParams) -> CandidatePool:
+        """Return the cached pool of a search, or an empty one."""
+        pool = self.cache.get(self.key(search_params))
+        if pool is None:
+            pool = CandidatePool(search_params.type or "repositories", search_params.query)
+        return pool
+
+    def set(self, search_params: GitHubSearchParams, pool: CandidatePool):
+        """Store a search's pool."""
+        self.cache.set(self.key(search_params), pool)
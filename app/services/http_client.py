@@ -0,0 +1,181 @@
+"""
+HTTP transport for upstream APIs
+
+This module provides pooled, keep-alive HTTP sessions shared by the
+GitHub and Exa services so that repeated searches reuse TCP/TLS connections.
+"""
+from typing import Any, Mapping, Tuple
+import asyncio
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+try:
+    import httpx
+except ImportError:
+    # Only needed by the async serving path (see app.asgi)
+    httpx = None
+
+logger = logging.getLogger(__name__)
+
+GITHUB_API_URL = "https://api.github.com"
+EXA_API_URL = "https://api.exa.ai"
+
+# Upstream status codes that are worth retrying with backoff
+RETRY_STATUS_CODES = (500, 502, 503, 504)
+
+
+def build_session(pool_size: int = 10, pool_block: bool = False, max_retries: int = 2,
+                  backoff_factor: float = 0.5) -> requests.Session:
+    """
+    Build a pooled, keep-alive session with retry-with-backoff on 5xx responses.
+
+    Args:
+        pool_size: Maximum number of connections kept alive per host
+        pool_block: Whether to block when the pool is exhausted instead of opening extra connections
+        max_retries: Number of retries for connection errors and 5xx responses
+        backoff_factor: Backoff factor between retries (0.5 -> 0.5s, 1s, 2s, ...)
+
+    Returns:
+        A configured requests.Session
+    """
+    retry = Retry(
+        total=max_retries,
+        connect=max_retries,
+        read=max_retries,
+        status=max_retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUS_CODES,
+        allowed_methods=frozenset(["GET", "POST"]),
+        respect_retry_after_header=True,
+        # Hand the final 5xx back to the caller so raise_for_status() reports it
+        raise_on_status=False
+    )
+
+    adapter = HTTPAdapter(
+        pool_connections=1,
+        pool_maxsize=pool_size,
+        pool_block=pool_block,
+        max_retries=retry
+    )
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers["Connection"] = "keep-alive"
+    return session
+
+
+class UpstreamSessions:
+    """App-scoped pooled sessions, one per upstream API."""
+
+    def __init__(self, pool_size: int = 10, pool_block: bool = False,
+                 connect_timeout: float = 3.05, read_timeout: float = 10.0,
+                 max_retries: int = 2, backoff_factor: float = 0.5,
+                 github_url: str = GITHUB_API_URL, exa_url: str = EXA_API_URL):
+        """
+        Initialize the upstream sessions.
+
+        Args:
+            pool_size: Maximum number of keep-alive connections per upstream
+            pool_block: Whether to block when the pool is exhausted
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the upstream to send a response
+            max_retries: Number of retries for connection errors and 5xx responses
+            backoff_factor: Backoff factor between retries
+            github_url: Base URL of the GitHub API
+            exa_url: Base URL of the Exa API
+        """
+        self.github_url = github_url.rstrip('/')
+        self.exa_url = exa_url.rstrip('/')
+        self.timeout: Tuple[float, float] = (connect_timeout, read_timeout)
+        self.github = build_session(
+            pool_size, pool_block, max_retries, backoff_factor)
+        self.exa = build_session(
+            pool_size, pool_block, max_retries, backoff_factor)
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "UpstreamSessions":
+        """Create the sessions from a Flask config mapping."""
+        return cls(
+            pool_size=int(config.get('HTTP_POOL_SIZE', 10)),
+            pool_block=bool(config.get('HTTP_POOL_BLOCK', False)),
+            connect_timeout=float(config.get('HTTP_CONNECT_TIMEOUT', 3.05)),
+            read_timeout=float(config.get('HTTP_READ_TIMEOUT', 10.0)),
+            max_retries=int(config.get('HTTP_MAX_RETRIES', 2)),
+            backoff_factor=float(config.get('HTTP_RETRY_BACKOFF', 0.5)),
+            github_url=config.get('GITHUB_API_URL') or GITHUB_API_URL,
+            exa_url=config.get('EXA_API_URL') or EXA_API_URL
+        )
+
+    def close(self):
+        """Close all pooled connections."""
+        self.github.close()
+        self.exa.close()
+
+
+class AsyncUpstreamClients:
+    """
+    App-scoped pooled async clients, one per upstream API, for the ASGI path.
+
+    Mirrors UpstreamSessions: the same timeouts apply, and connection errors
+    and 5xx responses are retried with exponential backoff.
+    """
+
+    def __init__(self, max_connections: int = 100, connect_timeout: float = 3.05,
+                 read_timeout: float = 10.0, max_retries: int = 2, backoff_factor: float = 0.5):
+        """
+        Initialize the async clients.
+
+        Args:
+            max_connections: Maximum number of concurrent connections per upstream
+            connect_timeout: Seconds to wait for a connection to be established
+            read_timeout: Seconds to wait for the upstream to send a response
+            max_retries: Number of retries for connection errors and 5xx responses
+            backoff_factor: Backoff factor between retries
+        """
+        if httpx is None:
+            raise ImportError(
+                "The async serving path requires httpx. Please install it using: pip install httpx")
+
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        limits = httpx.Limits(max_connections=max_connections,
+                              max_keepalive_connections=max_connections)
+        timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        # The transport retries failed connections; 5xx responses are retried in request()
+        self.github = httpx.AsyncClient(timeout=timeout, transport=httpx.AsyncHTTPTransport(
+            limits=limits, retries=max_retries))
+        self.exa = httpx.AsyncClient(timeout=timeout, transport=httpx.AsyncHTTPTransport(
+            limits=limits, retries=max_retries))
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "AsyncUpstreamClients":
+        """Create the clients from a Flask config mapping."""
+        return cls(
+            max_connections=int(config.get('ASYNC_MAX_CONNECTIONS', 100)),
+            connect_timeout=float(config.get('HTTP_CONNECT_TIMEOUT', 3.05)),
+            read_timeout=float(config.get('HTTP_READ_TIMEOUT', 10.0)),
+            max_retries=int(config.get('HTTP_MAX_RETRIES', 2)),
+            backoff_factor=float(config.get('HTTP_RETRY_BACKOFF', 0.5))
+        )
+
+    async def request(self, client: "httpx.AsyncClient", method: str, url: str, **kwargs) -> "httpx.Response":
+        """Send a request, retrying 5xx responses with backoff like the sync sessions do."""
+        attempt = 0
+        while True:
+            response = await client.request(method, url, **kwargs)
+            if response.status_code not in RETRY_STATUS_CODES or attempt >= self.max_retries:
+                return response
+            delay = self.backoff_factor * (2 ** attempt)
+            logger.info(
+                f"Retrying {method} {url} in {delay:.1f}s after status {response.status_code}")
+            await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def aclose(self):
+        """Close all pooled connections."""
+        await self.github.aclose()
+        await self.exa.aclose()
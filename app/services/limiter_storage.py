@@ -0,0 +1,250 @@
+"""
+SQLite storage for Flask-Limiter
+
+Registers an 'sqlite' storage scheme with the limits library so that the
+rate-limit counters of every worker process on one host live in a single
+SQLite database. Limits then hold across gunicorn workers and survive
+restarts. Both the fixed-window and the moving-window strategies are
+supported.
+
+    RATELIMIT_STORAGE_URI=sqlite:////var/lib/exahub/ratelimit.sqlite3
+    RATELIMIT_STRATEGY=moving-window
+"""
+from contextlib import contextmanager
+from typing import Any, Iterator, Mapping, Optional, Tuple
+import logging
+import os
+import sqlite3
+import threading
+import time
+
+from limits.storage import MovingWindowSupport, Storage
+
+logger = logging.getLogger(__name__)
+
+# Expired counters and window entries are deleted after this many writes
+PRUNE_INTERVAL = 1000
+
+
+class SQLiteStorage(Storage, MovingWindowSupport):
+    """
+    Rate-limit storage in a SQLite database shared by the processes on one host.
+
+    URIs follow the SQLAlchemy convention: sqlite:///relative/path or
+    sqlite:////absolute/path. Every check is a short IMMEDIATE transaction,
+    so concurrent workers never both take the last slot of a window.
+    """
+
+    STORAGE_SCHEME = ["sqlite"]
+
+    def __init__(self, uri: str, wrap_exceptions: bool = False, timeout: float = 5.0, **options: Any):
+        """
+        Initialize the storage.
+
+        Args:
+            uri: sqlite:///<path> of the database file
+            wrap_exceptions: Whether to wrap SQLite errors in limits.errors.StorageError
+            timeout: Seconds to wait for another process's write lock
+        """
+        path = uri.split("://", 1)[1]
+        if path.startswith("/"):
+            path = path[1:]
+        if not path:
+            raise ValueError(f"A database path is required in the rate-limit storage URI: {uri}")
+
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+        self.path = path
+        self.timeout = float(timeout)
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self._transaction() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit_counters ("
+                " key TEXT PRIMARY KEY,"
+                " value INTEGER NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS ratelimit_window_entries ("
+                " key TEXT NOT NULL,"
+                " acquired_at REAL NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS ratelimit_window_entries_key"
+                " ON ratelimit_window_entries (key, acquired_at)"
+            )
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, reopening it in a forked worker."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            # Transactions are managed explicitly
+            conn = sqlite3.connect(
+                self.path, timeout=self.timeout, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run a block in a write transaction that holds the database lock from its start."""
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """Delete expired counters and window entries every PRUNE_INTERVAL writes."""
+        self._writes += 1
+        if self._writes % PRUNE_INTERVAL == 0:
+            conn.execute(
+                "DELETE FROM ratelimit_counters WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "DELETE FROM ratelimit_window_entries WHERE expires_at <= ?", (now,))
+
+    def incr(self, key: str, expiry: float, elastic_expiry: bool = False, amount: int = 1) -> int:
+        """
+        Increment the fixed-window counter of a key, starting a new window if it expired.
+
+        Args:
+            key: The rate-limit key
+            expiry: Length of the window in seconds
+            elastic_expiry: Restart the window on every hit (accepted for older limits releases)
+            amount: The number to increment by
+
+        Returns:
+            The counter value after the increment
+        """
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute(
+                "INSERT INTO ratelimit_counters (key, value, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET"
+                " value = CASE WHEN expires_at <= ? THEN excluded.value ELSE value + excluded.value END,"
+                " expires_at = CASE WHEN expires_at <= ? OR ? THEN excluded.expires_at ELSE expires_at END",
+                (key, amount, now + expiry, now, now, bool(elastic_expiry))
+            )
+            value = conn.execute(
+                "SELECT value FROM ratelimit_counters WHERE key = ?", (key,)).fetchone()[0]
+            self._prune(conn, now)
+        return value
+
+    def get(self, key: str) -> int:
+        """Return the current fixed-window counter of a key."""
+        row = self._connection().execute(
+            "SELECT value FROM ratelimit_counters WHERE key = ? AND expires_at > ?",
+            (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key: str) -> float:
+        """Return when the fixed window of a key ends, or now if it has none."""
+        now = time.time()
+        row = self._connection().execute(
+            "SELECT expires_at FROM ratelimit_counters WHERE key = ? AND expires_at > ?",
+            (key, now)
+        ).fetchone()
+        return row[0] if row else now
+
+    def acquire_entry(self, key: str, limit: int, expiry: int, amount: int = 1) -> bool:
+        """
+        Take amount entries in the moving window of a key if the limit allows.
+
+        Returns:
+            True if the entries were acquired
+        """
+        if amount > limit:
+            return False
+
+        now = time.time()
+        with self._transaction() as conn:
+            acquired = conn.execute(
+                "SELECT COUNT(*) FROM ratelimit_window_entries WHERE key = ? AND acquired_at > ?",
+                (key, now - expiry)
+            ).fetchone()[0]
+            if acquired + amount > limit:
+                return False
+
+            conn.executemany(
+                "INSERT INTO ratelimit_window_entries (key, acquired_at, expires_at) VALUES (?, ?, ?)",
+                [(key, now, now + expiry)] * amount
+            )
+            conn.execute(
+                "DELETE FROM ratelimit_window_entries WHERE key = ? AND acquired_at <= ?",
+                (key, now - expiry)
+            )
+            self._prune(conn, now)
+        return True
+
+    def get_moving_window(self, key: str, limit: int, expiry: int) -> Tuple[float, int]:
+        """Return the time of the oldest entry in the moving window of a key and the number of entries."""
+        now = time.time()
+        oldest, acquired = self._connection().execute(
+            "SELECT MIN(acquired_at), COUNT(*) FROM ratelimit_window_entries"
+            " WHERE key = ? AND acquired_at > ?",
+            (key, now - expiry)
+        ).fetchone()
+        return (oldest, acquired) if acquired else (now, 0)
+
+    def check(self) -> bool:
+        """Return True if the database can be queried."""
+        try:
+            self._connection().execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self) -> Optional[int]:
+        """Remove every counter and window entry, returning the number of keys removed."""
+        with self._transaction() as conn:
+            keys = conn.execute(
+                "SELECT COUNT(*) FROM (SELECT key FROM ratelimit_counters"
+                " UNION SELECT key FROM ratelimit_window_entries)"
+            ).fetchone()[0]
+            conn.execute("DELETE FROM ratelimit_counters")
+            conn.execute("DELETE FROM ratelimit_window_entries")
+        return keys
+
+    def clear(self, key: str):
+        """Remove the counter and window entries of a key."""
+        with self._transaction() as conn:
+            conn.execute(
+                "DELETE FROM ratelimit_counters WHERE key = ?", (key,))
+            conn.execute(
+                "DELETE FROM ratelimit_window_entries WHERE key = ?", (key,))
+
+
+def storage_uri_from_config(config: Mapping[str, Any], default_path: str) -> str:
+    """
+    Return the Flask-Limiter storage URI for the 'RATELIMIT_BACKEND' and 'RATELIMIT_PATH' config keys.
+
+    Args:
+        config: The app config
+        default_path: Database path for the SQLite backend when RATELIMIT_PATH is not set
+
+    Returns:
+        'memory://' for the per-process 'memory' backend, or an sqlite:// URI
+    """
+    backend = config.get('RATELIMIT_BACKEND') or 'memory'
+    if backend == 'memory':
+        return 'memory://'
+    if backend == 'sqlite':
+        path = os.path.abspath(config.get('RATELIMIT_PATH') or default_path)
+        return f"sqlite:///{path}"
+    raise ValueError(f"Unknown rate-limit backend: {backend}")
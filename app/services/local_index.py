@@ -0,0 +1,497 @@
+"""
+Local faceted index of GitHub search results
+
+Every item of every GitHub search response is written to a SQLite index,
+with columns for the qualifiers that GitHubSearchParams.build_github_query
+supports, and every search is recorded with the positions of the items it
+returned. Once all pages of a search are indexed, searches with the same
+query text and narrower filters (a language, a tighter star range, an extra
+topic, an excluded topic, ...) can be answered from the index: the earlier
+results are filtered in SQL and keep GitHub's order.
+
+Only narrowing is answered locally. Changing the query text, or widening or
+replacing a filter, needs results the index may never have seen and goes
+to GitHub.
+"""
+from datetime import date, timedelta
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from app.models.search_params import GitHubSearchParams
+
+logger = logging.getLogger(__name__)
+
+# Unused searches and items are deleted after this many recorded responses
+PRUNE_INTERVAL = 200
+
+# Qualifiers, as normalized by index_filters(), that can be evaluated on the
+# indexed items of each search type
+LOCAL_QUALIFIERS = {
+    "repositories": {"language", "stars", "forks", "created", "pushed", "user", "org",
+                     "is_public", "include_forks", "topics", "exclude_topics"},
+    "issues": {"created"},
+    "code": set(),
+    "users": set(),
+}
+
+# GitHub's language qualifier takes aliases, but items carry the display
+# name; both sides are compared lowercased. Covers the search form's choices
+# and their common aliases. A language outside this map is not answered
+# locally, since its display name is unknown.
+LANGUAGE_ALIASES = {
+    "javascript": "javascript", "js": "javascript", "node": "javascript",
+    "typescript": "typescript", "ts": "typescript",
+    "python": "python", "py": "python",
+    "java": "java",
+    "go": "go", "golang": "go",
+    "ruby": "ruby", "rb": "ruby",
+    "php": "php",
+    "c": "c",
+    "cpp": "c++", "c++": "c++",
+    "csharp": "c#", "c#": "c#", "cs": "c#",
+    "rust": "rust", "rs": "rust",
+    "swift": "swift",
+    "kotlin": "kotlin", "kt": "kotlin",
+}
+
+Range = Optional[Tuple[Optional[Any], Optional[Any]]]
+
+_DAY = r"\d{4}-\d{2}-\d{2}"
+
+
+def _count_range(value: Optional[Sequence[Optional[int]]]) -> Range:
+    """Normalize a (min, max) count filter, None when it adds no qualifier."""
+    if not value or (value[0] is None and value[1] is None):
+        return None
+    return (value[0], value[1])
+
+
+def day_range(expression: Optional[str]) -> Range:
+    """
+    Parse a GitHub date qualifier value into an inclusive (first day, last day) range.
+
+    Supports YYYY-MM-DD with an optional >, >=, < or <= prefix, and
+    YYYY-MM-DD..YYYY-MM-DD with * for an open end. Returns None for other
+    values, such as dates with a time of day.
+    """
+    expression = (expression or "").strip()
+    match = re.fullmatch(rf"(>=|<=|>|<)?({_DAY})", expression)
+    if match:
+        operator, day = match.group(1), date.fromisoformat(match.group(2))
+        return {
+            None: (day, day),
+            ">": (day + timedelta(days=1), None),
+            ">=": (day, None),
+            "<": (None, day - timedelta(days=1)),
+            "<=": (None, day),
+        }[operator]
+    match = re.fullmatch(rf"(\*|{_DAY})\.\.(\*|{_DAY})", expression)
+    if match:
+        first, last = (None if part == "*" else date.fromisoformat(part)
+                       for part in match.groups())
+        return (first, last)
+    return None
+
+
+def _range_contains(outer: Range, inner: Range) -> bool:
+    """Return True if every value in the inner range is in the outer one; None is unbounded."""
+    if outer is None:
+        return True
+    if inner is None:
+        return False
+    low, high = outer
+    inner_low, inner_high = inner
+    if low is not None and (inner_low is None or inner_low < low):
+        return False
+    if high is not None and (inner_high is None or inner_high > high):
+        return False
+    return True
+
+
+def language_name(language: Optional[str]) -> Optional[str]:
+    """Return the lowercased GitHub display name of a language qualifier, or the qualifier if unknown."""
+    if not language:
+        return None
+    language = language.strip().lower()
+    return LANGUAGE_ALIASES.get(language, language)
+
+
+def index_filters(search_params: GitHubSearchParams) -> Dict[str, Any]:
+    """
+    Return the qualifiers of a search in a normalized, JSON-serializable form.
+
+    Subtopics and tags are folded into topics the way build_github_query()
+    turns them into topic: qualifiers.
+    """
+    topics = set(search_params.topics)
+    topics.update(f"subtopic-{subtopic}" for subtopic in search_params.subtopics)
+    topics.update(f"tag-{tag}" for tag in search_params.tags)
+    return {
+        "language": language_name(search_params.language),
+        "stars": _count_range(search_params.stars),
+        "forks": _count_range(search_params.forks),
+        "created": search_params.created.strip() if search_params.created else None,
+        "pushed": search_params.pushed.strip() if search_params.pushed else None,
+        "user": search_params.user.lower() if search_params.user else None,
+        "org": search_params.org.lower() if search_params.org else None,
+        "is_public": bool(search_params.is_public),
+        "include_forks": bool(search_params.include_forks),
+        "topics": sorted(topic.lower() for topic in topics),
+        "exclude_topics": sorted(topic.lower() for topic in search_params.exclude_topics),
+    }
+
+
+def _narrows(name: str, base: Any, requested: Any) -> bool:
+    """Return True if a requested qualifier only removes results from those of the base one."""
+    if name == "language":
+        return base is None and requested in LANGUAGE_ALIASES.values()
+    if name in ("user", "org"):
+        return base is None
+    if name in ("stars", "forks"):
+        return _range_contains(base, requested)
+    if name in ("created", "pushed"):
+        requested_days = day_range(requested)
+        if requested_days is None:
+            return False
+        return base is None or _range_contains(day_range(base), requested_days)
+    if name == "is_public":
+        return requested and not base
+    if name == "include_forks":
+        return base and not requested
+    if name in ("topics", "exclude_topics"):
+        return set(base) <= set(requested)
+    return False
+
+
+def refinement(base: Dict[str, Any], requested: Dict[str, Any], search_type: str) -> Optional[List[str]]:
+    """
+    Return the qualifiers a requested search narrows relative to an indexed one.
+
+    Args:
+        base: index_filters() of the indexed search
+        requested: index_filters() of the requested search
+        search_type: The type of both searches
+
+    Returns:
+        The names of the qualifiers to apply to the indexed results, which is
+        empty for the same filters, or None if the requested search is not a
+        refinement that can be evaluated locally
+    """
+    changed = [name for name in requested if base.get(name) != requested[name]]
+    for name in changed:
+        if name not in LOCAL_QUALIFIERS.get(search_type, ()) or not _narrows(name, base.get(name), requested[name]):
+            return None
+    return changed
+
+
+def _predicates(changed: Sequence[str], base: Dict[str, Any],
+                requested: Dict[str, Any]) -> Tuple[List[str], List[Any]]:
+    """Return SQL conditions on index_items (aliased i) for the changed qualifiers, and their parameters."""
+    conditions, params = [], []
+    for name in changed:
+        value = requested[name]
+        if name == "language":
+            conditions.append("i.language = ?")
+            params.append(value)
+        elif name in ("user", "org"):
+            conditions.append("i.owner = ?")
+            params.append(value)
+        elif name in ("stars", "forks"):
+            low, high = value
+            if low is not None:
+                conditions.append(f"i.{name} >= ?")
+                params.append(low)
+            if high is not None:
+                conditions.append(f"i.{name} <= ?")
+                params.append(high)
+        elif name in ("created", "pushed"):
+            first, last = day_range(value)
+            column = f"substr(i.{name}_at, 1, 10)"
+            if first is not None:
+                conditions.append(f"{column} >= ?")
+                params.append(first.isoformat())
+            if last is not None:
+                conditions.append(f"{column} <= ?")
+                params.append(last.isoformat())
+        elif name == "is_public":
+            conditions.append("i.private = 0")
+        elif name == "include_forks":
+            conditions.append("i.fork = 0")
+        elif name == "topics":
+            for topic in set(value) - set(base[name]):
+                conditions.append(
+                    "EXISTS (SELECT 1 FROM index_item_topics t WHERE t.key = i.key AND t.topic = ?)")
+                params.append(topic)
+        elif name == "exclude_topics":
+            for topic in set(value) - set(base[name]):
+                conditions.append(
+                    "NOT EXISTS (SELECT 1 FROM index_item_topics t WHERE t.key = i.key AND t.topic = ?)")
+                params.append(topic)
+    return conditions, params
+
+
+def _item_key(search_type: str, item: Dict[str, Any]) -> str:
+    """Return the identity of an item; code hits are files, which share no URL with other types."""
+    return item.get("html_url") or f"{search_type}:{item.get('id')}"
+
+
+def _item_row(search_type: str, key: str, item: Dict[str, Any], now: float) -> Tuple[Any, ...]:
+    """Return the index_items row of a GitHub search item."""
+    owner = item.get("owner") or {}
+    language = item.get("language")
+    return (
+        key, search_type, json.dumps(item, separators=(",", ":")),
+        language.lower() if language else None,
+        item.get("stargazers_count"), item.get("forks_count"),
+        item.get("created_at"), item.get("pushed_at"),
+        owner.get("login", "").lower() or None,
+        int(bool(item.get("fork"))), int(bool(item.get("private"))),
+        now,
+    )
+
+
+class LocalIndex:
+    """
+    SQLite index of the GitHub search results seen by the app, answering refinements.
+
+    The database file can be shared by several worker processes on one host.
+    Every operation logs and swallows SQLite errors, so the index can never
+    fail a search.
+    """
+
+    def __init__(self, path: str, max_age: float = 600):
+        """
+        Initialize the index.
+
+        Args:
+            path: Path of the SQLite database file
+            max_age: Seconds an indexed search may be used to answer others;
+                older searches are deleted
+        """
+        self.path = path
+        self.max_age = max_age
+        self._local = threading.local()
+        self._writes = 0
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS index_items ("
+                " key TEXT PRIMARY KEY,"
+                " search_type TEXT NOT NULL,"
+                " item TEXT NOT NULL,"
+                " language TEXT,"
+                " stars INTEGER,"
+                " forks INTEGER,"
+                " created_at TEXT,"
+                " pushed_at TEXT,"
+                " owner TEXT,"
+                " fork INTEGER NOT NULL,"
+                " private INTEGER NOT NULL,"
+                " indexed_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS index_item_topics ("
+                " key TEXT NOT NULL,"
+                " topic TEXT NOT NULL,"
+                " PRIMARY KEY (key, topic))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS index_searches ("
+                " id INTEGER PRIMARY KEY,"
+                " search_type TEXT NOT NULL,"
+                " query TEXT NOT NULL,"
+                " filters TEXT NOT NULL,"
+                " total_count INTEGER NOT NULL,"
+                " UNIQUE (search_type, query, filters))"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS index_search_items ("
+                " search_id INTEGER NOT NULL,"
+                " position INTEGER NOT NULL,"
+                " key TEXT NOT NULL,"
+                " fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (search_id, position))"
+            )
+
+    @classmethod
+    def from_config(cls, config: Any, default_path: str) -> "LocalIndex":
+        """Create the index from the 'LOCAL_INDEX_PATH' and 'LOCAL_INDEX_MAX_AGE' config keys."""
+        return cls(
+            config.get('LOCAL_INDEX_PATH') or default_path,
+            max_age=float(config.get('LOCAL_INDEX_MAX_AGE', 600))
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _query_text(search_params: GitHubSearchParams) -> str:
+        return " ".join((search_params.query or "").lower().split())
+
+    def record(self, search_params: GitHubSearchParams, page: int, per_page: int, data: Dict[str, Any]):
+        """
+        Index one page of a GitHub search response.
+
+        Args:
+            search_params: The parameters the page was fetched with
+            page: Page number of the response
+            per_page: Page size of the response
+            data: The decoded GitHub response
+        """
+        search_type = search_params.type or "repositories"
+        filters = json.dumps(index_filters(search_params), sort_keys=True)
+        total_count = data.get("total_count", 0)
+        if data.get("incomplete_results"):
+            # GitHub timed out; the page may be missing matches
+            total_count = -1
+        items = data.get("items", [])
+        now = time.time()
+
+        try:
+            with self._connection() as conn:
+                row = conn.execute(
+                    "SELECT id, total_count FROM index_searches"
+                    " WHERE search_type = ? AND query = ? AND filters = ?",
+                    (search_type, self._query_text(search_params), filters)
+                ).fetchone()
+                if row is None:
+                    search_id = conn.execute(
+                        "INSERT INTO index_searches (search_type, query, filters, total_count)"
+                        " VALUES (?, ?, ?, ?)",
+                        (search_type, self._query_text(search_params), filters, total_count)
+                    ).lastrowid
+                else:
+                    search_id = row[0]
+                    if row[1] != total_count:
+                        # The result set changed; positions from other pages no longer line up
+                        conn.execute(
+                            "DELETE FROM index_search_items WHERE search_id = ?", (search_id,))
+                        conn.execute(
+                            "UPDATE index_searches SET total_count = ? WHERE id = ?",
+                            (total_count, search_id))
+
+                keys = [_item_key(search_type, item) for item in items]
+                conn.executemany(
+                    "INSERT OR REPLACE INTO index_items (key, search_type, item, language, stars, forks,"
+                    " created_at, pushed_at, owner, fork, private, indexed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [_item_row(search_type, key, item, now) for key, item in zip(keys, items)]
+                )
+                if search_type == "repositories":
+                    conn.executemany(
+                        "DELETE FROM index_item_topics WHERE key = ?", [(key,) for key in keys])
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO index_item_topics (key, topic) VALUES (?, ?)",
+                        [(key, topic.lower()) for key, item in zip(keys, items)
+                         for topic in item.get("topics") or ()]
+                    )
+                offset = (page - 1) * per_page
+                conn.executemany(
+                    "INSERT OR REPLACE INTO index_search_items (search_id, position, key, fetched_at)"
+                    " VALUES (?, ?, ?, ?)",
+                    [(search_id, offset + i, key, now) for i, key in enumerate(keys)]
+                )
+                self._prune(conn, now)
+        except sqlite3.Error as e:
+            logger.error(f"Error writing to the local index: {e}")
+
+    def answer(self, search_params: GitHubSearchParams, page: int,
+               per_page: int) -> Optional[Tuple[Dict[str, Any], float]]:
+        """
+        Answer a search from a complete, fresh indexed search it refines.
+
+        Args:
+            search_params: The requested search
+            page: Page number requested
+            per_page: Page size requested
+
+        Returns:
+            A tuple of the response in GitHub's format and the time the
+            oldest page it was answered from was fetched, or None if the
+            index cannot answer the search
+        """
+        search_type = search_params.type or "repositories"
+        requested = index_filters(search_params)
+        oldest_allowed = time.time() - self.max_age
+
+        try:
+            conn = self._connection()
+            # Searches whose every result is indexed, most recently fetched first
+            candidates = conn.execute(
+                "SELECT s.id, s.filters, s.total_count, MIN(p.fetched_at)"
+                " FROM index_searches s JOIN index_search_items p ON p.search_id = s.id"
+                " WHERE s.search_type = ? AND s.query = ? AND s.total_count >= 0"
+                " GROUP BY s.id"
+                " HAVING COUNT(*) >= s.total_count AND MIN(p.fetched_at) >= ?"
+                " ORDER BY MIN(p.fetched_at) DESC",
+                (search_type, self._query_text(search_params), oldest_allowed)
+            ).fetchall()
+
+            for search_id, filters, total_count, fetched_at in candidates:
+                base = json.loads(filters)
+                # JSON turns the ranges into lists
+                for name in ("stars", "forks"):
+                    if base[name] is not None:
+                        base[name] = tuple(base[name])
+                changed = refinement(base, requested, search_type)
+                if changed is None:
+                    continue
+
+                conditions, params = _predicates(changed, base, requested)
+                where = "".join(f" AND {condition}" for condition in conditions)
+                matches = conn.execute(
+                    "SELECT COUNT(*) FROM index_search_items p JOIN index_items i ON i.key = p.key"
+                    f" WHERE p.search_id = ?{where}",
+                    [search_id] + params
+                ).fetchone()[0]
+                rows = conn.execute(
+                    "SELECT i.item FROM index_search_items p JOIN index_items i ON i.key = p.key"
+                    f" WHERE p.search_id = ?{where} ORDER BY p.position LIMIT ? OFFSET ?",
+                    [search_id] + params + [per_page, (page - 1) * per_page]
+                ).fetchall()
+                logger.debug(
+                    f"Answered {search_type} search '{search_params.query}' from the local index, "
+                    f"narrowing {changed or 'nothing'}: {matches} of {total_count} results")
+                return {
+                    "total_count": matches,
+                    "incomplete_results": False,
+                    "items": [json.loads(row[0]) for row in rows],
+                }, fetched_at
+        except sqlite3.Error as e:
+            logger.error(f"Error reading from the local index: {e}")
+        return None
+
+    def _prune(self, conn: sqlite3.Connection, now: float):
+        """Every PRUNE_INTERVAL writes, delete pages older than max_age and items no search uses."""
+        self._writes += 1
+        if self._writes % PRUNE_INTERVAL:
+            return
+        conn.execute(
+            "DELETE FROM index_search_items WHERE fetched_at < ?", (now - self.max_age,))
+        conn.execute(
+            "DELETE FROM index_searches WHERE id NOT IN (SELECT search_id FROM index_search_items)")
+        conn.execute(
+            "DELETE FROM index_items WHERE key NOT IN (SELECT key FROM index_search_items)")
+        conn.execute(
+            "DELETE FROM index_item_topics WHERE key NOT IN (SELECT key FROM index_items)")
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM index_items").fetchone()[0]
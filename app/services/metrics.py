@@ -0,0 +1,252 @@
+"""
+In-process metrics in the Prometheus text exposition format
+
+This module records latency histograms and status counters for the stages
+of a request: upstream round trips, parsing of GitHub responses, Exa
+enhancement and template rendering. It renders them along with values read
+at scrape time from the caches and the GitHub token pool, such as hit rates
+and rate-limit headroom. Metrics are kept per process.
+
+With metrics disabled, services hold NULL_METRICS, whose hooks do nothing.
+"""
+from bisect import bisect_left
+from contextlib import contextmanager, nullcontext
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds in seconds of the latency histogram buckets
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Type and help text of every exported metric
+METRICS = {
+    "exahub_http_requests_total": (
+        "counter", "HTTP requests served, by endpoint, method and status code"),
+    "exahub_http_request_duration_seconds": (
+        "histogram", "Time to serve an HTTP request, by endpoint"),
+    "exahub_upstream_request_duration_seconds": (
+        "histogram", "Round-trip time of GitHub and Exa API calls"),
+    "exahub_upstream_responses_total": (
+        "counter", "GitHub and Exa API responses by status code; 'error' for transport failures"),
+    "exahub_stage_duration_seconds": (
+        "histogram", "Time spent in each stage of a search"),
+    "exahub_cache_hits_total": ("counter", "Cache lookups answered from the cache"),
+    "exahub_cache_misses_total": ("counter", "Cache lookups that found no fresh entry"),
+    "exahub_cache_evictions_total": ("counter", "Entries evicted to stay within the cache size"),
+    "exahub_cache_revalidations_total": ("counter", "Stale entries revalidated with a 304 response"),
+    "exahub_cache_hit_ratio": ("gauge", "Fraction of cache lookups that were hits"),
+    "exahub_cache_entries": ("gauge", "Entries currently held by the cache"),
+    "exahub_local_index_lookups_total": (
+        "counter", "Searches answered from the local index, or left to GitHub as a gap"),
+    "exahub_github_rate_limit_limit": ("gauge", "Search requests allowed per window, by token"),
+    "exahub_github_rate_limit_remaining": ("gauge", "Search requests left in the current window, by token"),
+    "exahub_github_rate_limit_reset_seconds": ("gauge", "Seconds until the rate-limit window resets, by token"),
+    "exahub_github_rate_limit_headroom": ("gauge", "Search requests the token pool can make right now"),
+    "exahub_github_requests_queued_total": ("counter", "Requests queued waiting for GitHub quota"),
+    "exahub_github_requests_shed_total": ("counter", "Requests shed after waiting too long for GitHub quota"),
+}
+
+LabelSet = Tuple[Tuple[str, str], ...]
+Sample = Tuple[str, Dict[str, Any], float]
+
+
+class _Histogram:
+    """Bucket counts, sum and count of one labelled histogram."""
+
+    __slots__ = ("counts", "sum", "count")
+
+    def __init__(self, size: int):
+        self.counts = [0] * size
+        self.sum = 0.0
+        self.count = 0
+
+
+class Metrics:
+    """Thread-safe registry of counters and histograms, plus collectors read at scrape time."""
+
+    enabled = True
+
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        """
+        Initialize an empty registry.
+
+        Args:
+            buckets: Upper bounds of the histogram buckets; +Inf is implied
+        """
+        self.buckets = tuple(sorted(buckets))
+        self._counters: Dict[Tuple[str, LabelSet], float] = {}
+        self._histograms: Dict[Tuple[str, LabelSet], _Histogram] = {}
+        self._collectors: List[Callable[[], Iterable[Sample]]] = []
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: float = 1, **labels: Any):
+        """Increment a counter."""
+        key = (name, _label_set(labels))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def observe(self, name: str, value: float, **labels: Any):
+        """Record a value, usually a duration in seconds, in a histogram."""
+        key = (name, _label_set(labels))
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = _Histogram(
+                    len(self.buckets) + 1)
+            histogram.counts[index] += 1
+            histogram.sum += value
+            histogram.count += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        """Record the wall time of a block in a histogram."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - started, **labels)
+
+    def record_upstream(self, upstream: str, endpoint: str, status_code: Optional[int], elapsed: float):
+        """
+        Record one upstream API call.
+
+        Args:
+            upstream: 'github' or 'exa'
+            endpoint: The API endpoint called, e.g. 'search/repositories'
+            status_code: HTTP status of the response, or None if no response was received
+            elapsed: Round-trip time in seconds
+        """
+        self.observe("exahub_upstream_request_duration_seconds", elapsed,
+                     upstream=upstream, endpoint=endpoint)
+        self.incr("exahub_upstream_responses_total", upstream=upstream, endpoint=endpoint,
+                  status=str(status_code) if status_code is not None else "error")
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        """Register a callable yielding (name, labels, value) samples at scrape time."""
+        self._collectors.append(collector)
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format (version 0.0.4)."""
+        lines: Dict[str, List[str]] = {}
+
+        with self._lock:
+            counters = list(self._counters.items())
+            histograms = [(key, list(h.counts), h.sum, h.count)
+                          for key, h in self._histograms.items()]
+
+        for (name, labels), value in counters:
+            lines.setdefault(name, []).append(
+                f"{name}{_format_labels(labels)} {_format_value(value)}")
+
+        bounds = [_format_value(bound) for bound in self.buckets] + ["+Inf"]
+        for (name, labels), counts, total, count in histograms:
+            samples = lines.setdefault(name, [])
+            cumulative = 0
+            for bound, bucket_count in zip(bounds, counts):
+                cumulative += bucket_count
+                samples.append(
+                    f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+            samples.append(
+                f"{name}_sum{_format_labels(labels)} {_format_value(total)}")
+            samples.append(f"{name}_count{_format_labels(labels)} {count}")
+
+        for collector in self._collectors:
+            try:
+                for name, labels, value in collector():
+                    lines.setdefault(name, []).append(
+                        f"{name}{_format_labels(_label_set(labels))} {_format_value(value)}")
+            except Exception as e:
+                logger.error(f"Metrics collector {collector!r} failed: {e}")
+
+        output = []
+        for name in sorted(lines):
+            metric_type, help_text = METRICS.get(name, ("untyped", name))
+            output.append(f"# HELP {name} {help_text}")
+            output.append(f"# TYPE {name} {metric_type}")
+            output.extend(lines[name])
+        return "\n".join(output) + "\n"
+
+
+class NullMetrics:
+    """Metrics sink used when metrics are disabled; every hook is a no-op."""
+
+    enabled = False
+
+    _timer = nullcontext()
+
+    def incr(self, name: str, amount: float = 1, **labels: Any):
+        pass
+
+    def observe(self, name: str, value: float, **labels: Any):
+        pass
+
+    def timer(self, name: str, **labels: Any):
+        return self._timer
+
+    def record_upstream(self, upstream: str, endpoint: str, status_code: Optional[int], elapsed: float):
+        pass
+
+    def add_collector(self, collector: Callable[[], Iterable[Sample]]):
+        pass
+
+    def render(self) -> str:
+        return ""
+
+
+NULL_METRICS = NullMetrics()
+
+
+def cache_samples(cache_name: str, cache: Any) -> Iterator[Sample]:
+    """Yield the counters, hit ratio and size of a cache from app.services.cache."""
+    labels = {"cache": cache_name}
+    stats = cache.stats
+    yield "exahub_cache_hits_total", labels, stats.hits
+    yield "exahub_cache_misses_total", labels, stats.misses
+    yield "exahub_cache_evictions_total", labels, stats.evictions
+    yield "exahub_cache_revalidations_total", labels, stats.revalidations
+    yield "exahub_cache_hit_ratio", labels, stats.hit_rate
+    yield "exahub_cache_entries", labels, len(cache)
+
+
+def token_pool_samples(token_pool: Any) -> Iterator[Sample]:
+    """Yield the quota of every token of a GitHubTokenPool and the pool's headroom."""
+    snapshot = token_pool.snapshot()
+    for token in snapshot["tokens"]:
+        labels = {"token": token["token"]}
+        yield "exahub_github_rate_limit_limit", labels, token["limit"]
+        yield "exahub_github_rate_limit_remaining", labels, token["remaining"]
+        yield "exahub_github_rate_limit_reset_seconds", labels, token["reset_in"] or 0
+    yield "exahub_github_rate_limit_headroom", {}, token_pool.headroom()
+    yield "exahub_github_requests_queued_total", {}, snapshot["queued"]
+    yield "exahub_github_requests_shed_total", {}, snapshot["shed"]
+
+
+def _label_set(labels: Dict[str, Any]) -> LabelSet:
+    """Return labels as a sorted tuple usable as a dictionary key."""
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def _format_labels(labels: LabelSet) -> str:
+    """Format a label set as {name="value",...}, escaping the values."""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels) + "}"
+
+
+def _escape(value: str) -> str:
+    """Escape a label value as required by the exposition format."""
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_value(value: float) -> str:
+    """Format a sample value, using Prometheus' spelling of infinities."""
+    if isinstance(value, int):
+        return str(value)
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
@@ -0,0 +1,126 @@
+"""
+Background prefetch of the next results page
+
+After a results page is served, the following page can be fetched on a
+small bounded worker pool so that it is already in the response cache
+when the user clicks "next".
+"""
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Mapping, Optional
+import logging
+import threading
+
+from app.models.search_params import GitHubSearchParams
+from app.models.search_result import SearchResults
+from app.services.rate_limit import GitHubRateLimitExceeded
+
+logger = logging.getLogger(__name__)
+
+
+class Prefetcher:
+    """Fetch the next page of searches in the background while quota allows."""
+
+    def __init__(self, max_workers: int = 2, quota_reserve: int = 5, max_pending: Optional[int] = None):
+        """
+        Initialize the prefetcher.
+
+        Args:
+            max_workers: Number of background prefetch threads
+            quota_reserve: GitHub requests to keep in reserve for user-initiated searches
+            max_pending: Maximum number of queued or running prefetches
+        """
+        self.quota_reserve = quota_reserve
+        self.max_pending = max_pending or max_workers * 4
+        self.scheduled = 0
+        self.skipped = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='exahub-prefetch')
+        self._pending: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> "Prefetcher":
+        """Create a prefetcher from PREFETCH_* config keys."""
+        return cls(
+            max_workers=int(config.get('PREFETCH_MAX_WORKERS', 2)),
+            quota_reserve=int(config.get('PREFETCH_QUOTA_RESERVE', 5))
+        )
+
+    def schedule_next_page(self, search_service, search_params: GitHubSearchParams,
+                           results: SearchResults, enhance_with_exa: bool) -> bool:
+        """
+        Prefetch the page after the given results if it is worth it.
+
+        The page is skipped when there is no next page, the service has no cache
+        to hold it, it is already being prefetched, or fetching it would dip into
+        the GitHub quota reserve.
+
+        Returns:
+            True if a prefetch was scheduled
+        """
+        if not results.has_next_page or search_service.cache is None:
+            return False
+
+        token_pool = search_service.token_pool
+        if token_pool is None or token_pool.headroom() <= self.quota_reserve:
+            self.skipped += 1
+            return False
+
+        page = results.page + 1
+        key = search_service.github_cache_key(
+            search_params, page, results.per_page)
+
+        with self._lock:
+            if key in self._pending or len(self._pending) >= self.max_pending:
+                self.skipped += 1
+                return False
+            future = self._executor.submit(
+                self._prefetch, search_service, search_params, page, results.per_page, enhance_with_exa)
+            self._pending[key] = future
+            self.scheduled += 1
+
+        future.add_done_callback(lambda _: self._forget(key))
+        return True
+
+    @staticmethod
+    def _prefetch(search_service, search_params: GitHubSearchParams, page: int, per_page: int,
+                  enhance_with_exa: bool):
+        """Run the search for a page so that its GitHub and Exa legs land in the cache."""
+        try:
+            # Going through combined_search lets a user request for the same page
+            # join this one via single-flight instead of issuing its own
+            search_service.combined_search(
+                search_params, page=page, per_page=per_page, enhance_with_exa=enhance_with_exa)
+        except GitHubRateLimitExceeded as e:
+            logger.info(f"Prefetch of page {page} shed: {e}")
+        except Exception as e:
+            logger.warning(f"Prefetch of page {page} failed: {e}")
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._pending.pop(key, None)
+
+    def cancel(self, key: str) -> bool:
+        """Cancel a prefetch that has not started yet."""
+        with self._lock:
+            future = self._pending.get(key)
+        return future.cancel() if future else False
+
+    def cancel_all(self) -> int:
+        """Cancel every prefetch that has not started yet, returning how many were cancelled."""
+        with self._lock:
+            futures = list(self._pending.values())
+        return sum(1 for future in futures if future.cancel())
+
+    def shutdown(self):
+        """Cancel pending prefetches and stop the worker pool."""
+        self.cancel_all()
+        self._executor.shutdown(wait=False)
+
+    def stats(self) -> Dict[str, int]:
+        """Return prefetch counters."""
+        return {
+            "scheduled": self.scheduled,
+            "skipped": self.skipped,
+            "pending": len(self._pending)
+        }
@@ -0,0 +1,166 @@
+"""
+Multi-signal re-ranking of search results
+
+Results are ordered by a weighted sum of signals, each scaled to [0, 1] and
+computed as a NumPy column over all the candidates at once:
+
+    github      GitHub's own order, 1 for its first result down to 0 for its last
+    stars       log of stargazers (repositories) or followers (users),
+                relative to the most starred candidate
+    forks       log of forks (repositories), relative to the most forked candidate
+    recency     exponential decay of the age of pushed_at (repositories) or
+                updated_at (issues), halving every recency_half_life days
+    relevance   the Exa relevance score
+    similarity  the Exa semantic similarity
+
+A signal a search type does not have is 0 for all its results and so does
+not affect their order. NumPy is optional; without it results keep GitHub's
+order.
+"""
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Sequence
+import logging
+
+from app.models.search_result import field_values
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+SIGNALS = ("github", "stars", "forks", "recency", "relevance", "similarity")
+
+DEFAULT_WEIGHTS = {
+    "github": 1.0,
+    "stars": 0.5,
+    "forks": 0.2,
+    "recency": 0.3,
+    "relevance": 1.0,
+    "similarity": 1.0,
+}
+
+# Field of each search type's results read by a count or date signal
+SIGNAL_FIELDS = {
+    "repositories": {"stars": "stargazers_count", "forks": "forks_count", "recency": "pushed_at"},
+    "code": {},
+    "issues": {"recency": "updated_at"},
+    "users": {"stars": "followers"},
+}
+
+
+def parse_weights(spec: Optional[str]) -> Dict[str, float]:
+    """
+    Parse signal weights written as 'name=weight' pairs separated by commas.
+
+    Signals not listed keep their default weight.
+
+    Raises:
+        ValueError: If a signal is unknown or a weight is not a number
+    """
+    weights = dict(DEFAULT_WEIGHTS)
+    for pair in (spec or "").split(","):
+        if not pair.strip():
+            continue
+        name, _, weight = pair.partition("=")
+        name = name.strip()
+        if name not in weights:
+            raise ValueError(f"Unknown ranking signal: {name!r}")
+        weights[name] = float(weight)
+    return weights
+
+
+def _log_scaled(values: "np.ndarray") -> "np.ndarray":
+    """Return log1p of non-negative counts divided by that of the largest."""
+    scaled = np.log1p(np.maximum(values, 0))
+    top = scaled.max(initial=0.0)
+    return scaled / top if top > 0 else scaled
+
+
+def _timestamps(values: Sequence[Optional[str]]) -> "np.ndarray":
+    """Parse ISO 8601 UTC timestamps into datetime64[s], NaT where missing or invalid."""
+    try:
+        return np.array([value[:19] if value else "NaT" for value in values], dtype="datetime64[s]")
+    except ValueError:
+        parsed = []
+        for value in values:
+            try:
+                parsed.append(np.datetime64(value[:19], "s"))
+            except (TypeError, ValueError):
+                parsed.append(np.datetime64("NaT"))
+        return np.array(parsed, dtype="datetime64[s]")
+
+
+class Ranker:
+    """Orders search results by a weighted sum of vectorized signals."""
+
+    def __init__(self, weights: Optional[Dict[str, float]] = None, recency_half_life: float = 180.0):
+        """
+        Initialize the ranker.
+
+        Args:
+            weights: Weight of each signal; signals left out get their default weight
+            recency_half_life: Days over which the recency signal halves
+        """
+        self.weights = dict(DEFAULT_WEIGHTS, **(weights or {}))
+        self.recency_half_life = recency_half_life
+        self._weights = np.array([self.weights[name] for name in SIGNALS], dtype=np.float64)
+
+    @classmethod
+    def from_config(cls, config: Any) -> Optional["Ranker"]:
+        """Create the ranker from the 'RANKING_*' config keys, or None without NumPy."""
+        if np is None:
+            logger.warning("NumPy is not installed; results keep GitHub's order")
+            return None
+        return cls(
+            weights=parse_weights(config.get('RANKING_WEIGHTS')),
+            recency_half_life=float(config.get('RANKING_RECENCY_HALF_LIFE', 180.0))
+        )
+
+    def signals(self, search_type: str, items: Sequence[Any],
+                now: Optional[datetime] = None) -> "np.ndarray":
+        """
+        Return the signals of the candidates as a (len(SIGNALS), len(items)) array.
+
+        Args:
+            search_type: The type of search the results come from
+            items: The candidates, in GitHub's order
+            now: Time the recency signal is measured from; defaults to the current time
+        """
+        count = len(items)
+        fields = SIGNAL_FIELDS.get(search_type, {})
+        signals = np.zeros((len(SIGNALS), count), dtype=np.float64)
+        if count == 0:
+            return signals
+
+        signals[0] = 1.0 - np.arange(count) / max(count - 1, 1)
+        for row, name in ((1, "stars"), (2, "forks")):
+            if name in fields:
+                signals[row] = _log_scaled(np.array(
+                    [value or 0 for value in field_values(items, fields[name])], dtype=np.float64))
+        if "recency" in fields:
+            dates = _timestamps(field_values(items, fields["recency"]))
+            now = np.datetime64((now or datetime.now(timezone.utc)).replace(tzinfo=None), "s")
+            age_days = (now - dates) / np.timedelta64(1, "D")
+            decay = np.exp2(-np.maximum(age_days, 0) / self.recency_half_life)
+            signals[3] = np.nan_to_num(decay, nan=0.0)
+        signals[4] = [item.relevance_score or 0 for item in items]
+        signals[5] = [item.semantic_similarity or 0 for item in items]
+        np.clip(signals[4:], 0.0, 1.0, out=signals[4:])
+        return signals
+
+    def scores(self, search_type: str, items: Sequence[Any], now: Optional[datetime] = None) -> "np.ndarray":
+        """Return the weighted score of every candidate."""
+        return self._weights @ self.signals(search_type, items, now)
+
+    def rank(self, search_type: str, items: Sequence[Any], now: Optional[datetime] = None) -> List[Any]:
+        """Return the candidates best first; equal scores keep GitHub's order."""
+        if len(items) < 2:
+            return list(items)
+        order = np.argsort(-self.scores(search_type, items, now), kind="stable")
+        return [items[i] for i in order]
+
+    def rank_results(self, results: Any, now: Optional[datetime] = None):
+        """Reorder the results of a SearchResults in place."""
+        results.results = self.rank(results.search_type, results.results, now)
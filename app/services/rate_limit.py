@@ -0,0 +1,272 @@
+"""
+GitHub rate-limit-aware token scheduling
+
+This module tracks the remaining search quota of each configured GitHub
+token from the X-RateLimit-* and Retry-After response headers, spreads
+requests across the tokens with the most headroom, and queues requests
+until quota returns when every token is exhausted.
+"""
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# The GitHub search API allows 30 authenticated requests per minute per token
+DEFAULT_SEARCH_LIMIT = 30
+
+# How long to back off after a secondary rate limit without a Retry-After header
+SECONDARY_LIMIT_BACKOFF = 60.0
+
+# How often a coroutine queued for quota re-checks the pool
+ASYNC_POLL_INTERVAL = 0.25
+
+
+class GitHubRateLimitExceeded(Exception):
+    """Raised when every GitHub token is exhausted for longer than the caller is willing to wait."""
+
+    def __init__(self, retry_after: float):
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(
+            f"All GitHub tokens are rate limited; retry in {self.retry_after:.0f}s")
+
+
+class TokenState:
+    """Quota state of a single GitHub token."""
+
+    def __init__(self, token: str, limit: int = DEFAULT_SEARCH_LIMIT):
+        self.token = token
+        self.limit = limit
+        self.remaining = limit
+        self.reset_at = 0.0
+        self.blocked_until = 0.0
+        self.in_flight = 0
+        self.last_used = 0.0
+
+    @property
+    def label(self) -> str:
+        """Return a masked form of the token that is safe to display."""
+        return f"...{self.token[-4:]}" if len(self.token) > 8 else "****"
+
+    def available_at(self, now: float) -> float:
+        """Return the earliest time at which this token can be used again."""
+        if self.blocked_until > now:
+            return self.blocked_until
+        if self.remaining - self.in_flight <= 0 and self.reset_at > now:
+            return self.reset_at
+        return now
+
+    def headroom(self, now: float) -> int:
+        """Return the number of requests this token can still make in the current window."""
+        if self.reset_at and self.reset_at <= now:
+            # The window has rolled over since the last response
+            self.remaining = self.limit
+            self.reset_at = 0.0
+        return self.remaining - self.in_flight
+
+    def as_dict(self, now: float) -> Dict[str, Any]:
+        """Return the token state for introspection."""
+        return {
+            "token": self.label,
+            "limit": self.limit,
+            "remaining": self.remaining,
+            "in_flight": self.in_flight,
+            "reset_in": max(0.0, round(self.reset_at - now, 1)) if self.reset_at else None,
+            "blocked_for": max(0.0, round(self.blocked_until - now, 1)) if self.blocked_until > now else 0.0
+        }
+
+
+class GitHubTokenPool:
+    """Schedule GitHub requests across a pool of tokens based on their remaining quota."""
+
+    def __init__(self, tokens: List[str], max_wait: float = 5.0):
+        """
+        Initialize the pool.
+
+        Args:
+            tokens: GitHub API tokens to spread requests across
+            max_wait: Seconds a request may be queued waiting for quota before it is shed
+        """
+        if not tokens:
+            raise ValueError("At least one GitHub token is required")
+        self.max_wait = max_wait
+        self.shed = 0
+        self.queued = 0
+        self._tokens = [TokenState(token) for token in dict.fromkeys(tokens)]
+        self._condition = threading.Condition()
+
+    @classmethod
+    def from_config(cls, config: Mapping[str, Any]) -> Optional["GitHubTokenPool"]:
+        """Create a pool from GITHUB_TOKENS (comma-separated) and GITHUB_TOKEN, or None if neither is set."""
+        tokens = [token.strip() for token in (config.get('GITHUB_TOKENS') or '').split(',')
+                  if token.strip()]
+        if config.get('GITHUB_TOKEN'):
+            tokens.append(config['GITHUB_TOKEN'])
+        if not tokens:
+            return None
+        return cls(tokens, max_wait=float(config.get('GITHUB_RATE_LIMIT_MAX_WAIT', 5.0)))
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def acquire(self, max_wait: Optional[float] = None) -> TokenState:
+        """
+        Reserve the token with the most headroom, queueing until one frees up.
+
+        Args:
+            max_wait: Seconds to queue for quota; defaults to the pool's max_wait
+
+        Returns:
+            The reserved token; it must be handed back with release()
+
+        Raises:
+            GitHubRateLimitExceeded: If no token frees up within max_wait
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.time() + max_wait
+        queued = False
+
+        with self._condition:
+            while True:
+                now = time.time()
+                state, available_at = self._reserve(now, deadline, queued)
+                if state is not None:
+                    return state
+                queued = True
+                # Wake up when quota returns or another request releases a token
+                self._condition.wait(max(0.01, available_at - now))
+
+    async def acquire_async(self, max_wait: Optional[float] = None) -> TokenState:
+        """
+        Reserve a token like acquire() without blocking the event loop while queued.
+
+        Releases by other requests are not signalled to coroutines, so a queued
+        caller re-checks the pool at least every ASYNC_POLL_INTERVAL seconds.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        deadline = time.time() + max_wait
+        queued = False
+
+        while True:
+            now = time.time()
+            with self._condition:
+                state, available_at = self._reserve(now, deadline, queued)
+            if state is not None:
+                return state
+            queued = True
+            await asyncio.sleep(min(ASYNC_POLL_INTERVAL, max(0.01, available_at - now)))
+
+    def _reserve(self, now: float, deadline: float, queued: bool) -> Tuple[Optional[TokenState], float]:
+        """
+        Reserve the token with the most headroom; the caller must hold the condition.
+
+        Returns:
+            A tuple of (token, now) if one was reserved, or (None, available_at)
+            with the earliest time a token frees up
+
+        Raises:
+            GitHubRateLimitExceeded: If no token frees up before the deadline
+        """
+        candidates = [state for state in self._tokens
+                      if state.blocked_until <= now and state.headroom(now) > 0]
+        if candidates:
+            state = max(candidates, key=lambda s: (
+                s.headroom(now), -s.last_used))
+            state.in_flight += 1
+            state.last_used = now
+            return state, now
+
+        available_at = min(state.available_at(now)
+                           for state in self._tokens)
+        if available_at > deadline:
+            self.shed += 1
+            raise GitHubRateLimitExceeded(available_at - now)
+
+        if not queued:
+            self.queued += 1
+        return None, available_at
+
+    def exceeded(self) -> GitHubRateLimitExceeded:
+        """Shed a request GitHub kept rate limiting, returning the error to raise."""
+        now = time.time()
+        with self._condition:
+            self.shed += 1
+            available_at = min(state.available_at(now) for state in self._tokens)
+        return GitHubRateLimitExceeded(available_at - now)
+
+    def release(self, state: TokenState, status_code: Optional[int] = None,
+                headers: Optional[Mapping[str, str]] = None) -> bool:
+        """
+        Hand a token back and record the quota reported by GitHub.
+
+        Args:
+            state: The token returned by acquire()
+            status_code: HTTP status of the response, if one was received
+            headers: Response headers, if a response was received
+
+        Returns:
+            True if the response was rejected by a rate limit
+        """
+        headers = headers or {}
+        now = time.time()
+        rate_limited = False
+
+        with self._condition:
+            state.in_flight = max(0, state.in_flight - 1)
+
+            try:
+                if headers.get("X-RateLimit-Limit") is not None:
+                    state.limit = int(headers["X-RateLimit-Limit"])
+                if headers.get("X-RateLimit-Remaining") is not None:
+                    state.remaining = int(headers["X-RateLimit-Remaining"])
+                if headers.get("X-RateLimit-Reset") is not None:
+                    state.reset_at = float(headers["X-RateLimit-Reset"])
+            except ValueError:
+                logger.warning(
+                    f"Malformed GitHub rate-limit headers for token {state.label}")
+
+            if status_code in (403, 429):
+                retry_after = headers.get("Retry-After")
+                if retry_after is not None:
+                    # Secondary rate limit
+                    try:
+                        state.blocked_until = now + float(retry_after)
+                    except ValueError:
+                        state.blocked_until = now + SECONDARY_LIMIT_BACKOFF
+                    rate_limited = True
+                elif state.remaining == 0:
+                    # Primary rate limit exhausted until the reset time
+                    rate_limited = True
+                elif status_code == 429:
+                    state.blocked_until = now + SECONDARY_LIMIT_BACKOFF
+                    rate_limited = True
+
+                if rate_limited:
+                    logger.warning(
+                        f"GitHub token {state.label} is rate limited (status {status_code})")
+
+            self._condition.notify_all()
+
+        return rate_limited
+
+    def headroom(self) -> int:
+        """Return the total number of requests the pool can still make right now."""
+        now = time.time()
+        with self._condition:
+            return sum(max(0, state.headroom(now)) for state in self._tokens
+                       if state.blocked_until <= now)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the quota state of every token for introspection."""
+        now = time.time()
+        with self._condition:
+            for state in self._tokens:
+                state.headroom(now)
+            return {
+                "tokens": [state.as_dict(now) for state in self._tokens],
+                "queued": self.queued,
+                "shed": self.shed,
+                "max_wait": self.max_wait
+            }
@@ -0,0 +1,183 @@
+"""
+Render cache for the results page
+
+Result cards are rendered from the partials in templates/cards and cached
+in-process under a key built from the result's identity and every field
+the card displays, so an unchanged result is rendered once however many
+pages, queries or users it appears in. Optionally, whole results pages are
+cached under the search parameters and the keys of their cards; the CSRF
+token, the only per-session part of the page, is rendered as a placeholder
+and substituted on every serve.
+"""
+from typing import Any, Callable, Hashable, List, Optional, Sequence, Tuple
+import logging
+
+from jinja2 import Environment
+from markupsafe import Markup
+
+from app.services.cache import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+# Partial and template variable of each search type's result card
+CARD_TEMPLATES = {
+    "repositories": ("cards/repository.html", "repo"),
+    "code": ("cards/code.html", "code"),
+    "issues": ("cards/issue.html", "issue"),
+    "users": ("cards/user.html", "user"),
+}
+
+# Keys change whenever the content does, so entries never go stale and are
+# normally dropped by LRU eviction rather than expiry
+RENDER_CACHE_TTL = 24 * 3600
+
+# Rendered into cached pages in place of the per-session CSRF token
+CSRF_PLACEHOLDER = "__exahub_csrf_token__"
+
+
+def _first_fragment(text_matches: Sequence[Any]) -> Optional[str]:
+    return text_matches[0].get("fragment") if text_matches else None
+
+
+def card_key(search_type: str, item: Any) -> Tuple[Hashable, ...]:
+    """
+    Return the cache key of a result's card: its URL and every field the card displays.
+
+    Must list exactly the fields used by the type's partial in templates/cards.
+    """
+    if search_type == "repositories":
+        return (
+            item.html_url, item.full_name, item.description, item.language,
+            item.stargazers_count, item.forks_count, item.open_issues_count,
+            tuple(item.topics or ()), item.created_at, item.pushed_at,
+            item.relevance_score, item.exa_content,
+        )
+    if search_type == "code":
+        return (
+            item.html_url, (item.repository or {}).get("full_name"), item.path,
+            _first_fragment(item.text_matches), item.relevance_score, item.exa_content,
+        )
+    if search_type == "issues":
+        return (
+            item.html_url, item.title, item.state, item.repository_url, item.number,
+            tuple((label.get("name"), label.get("color")) for label in item.labels or ()),
+            item.body, (item.user or {}).get("login"), item.created_at, item.comments,
+            item.relevance_score, item.exa_content,
+        )
+    if search_type == "users":
+        return (
+            item.html_url, item.login, item.name, getattr(item, "avatar_url", None), item.bio,
+            item.public_repos, item.followers, item.following, item.created_at,
+            item.relevance_score, item.exa_content,
+        )
+    raise ValueError(f"Unknown search type: {search_type}")
+
+
+def search_params_key(search_params: Any) -> Tuple[Hashable, ...]:
+    """Return the search parameters as a hashable key, in attribute order."""
+    return tuple(
+        (name, tuple(value) if isinstance(value, list) else value)
+        for name, value in vars(search_params).items()
+    )
+
+
+class RenderCache:
+    """Rendered result cards, and optionally whole results pages, for the search UI."""
+
+    def __init__(self, jinja_env: Environment, max_cards: int = 2048, max_pages: int = 0):
+        """
+        Initialize the render cache.
+
+        Args:
+            jinja_env: The app's Jinja environment the card partials are loaded from
+            max_cards: Maximum number of rendered cards kept; 0 renders every card afresh
+            max_pages: Maximum number of rendered pages kept; 0 disables the page cache
+        """
+        self.jinja_env = jinja_env
+        self.cards = MemoryCache(max_cards, RENDER_CACHE_TTL) if max_cards > 0 else None
+        self.pages = MemoryCache(max_pages, RENDER_CACHE_TTL) if max_pages > 0 else None
+
+    @classmethod
+    def from_config(cls, jinja_env: Environment, config: Any) -> "RenderCache":
+        """Create the render cache from the 'RENDER_CACHE_*' and 'PAGE_CACHE_*' config keys."""
+        return cls(
+            jinja_env,
+            max_cards=config.get('RENDER_CACHE_MAX_ENTRIES', 2048),
+            max_pages=(config.get('PAGE_CACHE_MAX_ENTRIES', 128)
+                       if config.get('PAGE_CACHE_ENABLED') else 0)
+        )
+
+    def render_cards(self, search_type: str, items: Sequence[Any],
+                     keys: Optional[Sequence[Tuple[Hashable, ...]]] = None) -> List[Markup]:
+        """
+        Return the rendered card of every result, rendering only those not cached.
+
+        Args:
+            search_type: The type of search the results come from
+            items: The result objects
+            keys: The items' card_key()s, if already computed
+        """
+        if not items:
+            return []
+        template_name, variable = CARD_TEMPLATES[search_type]
+        template = self.jinja_env.get_template(template_name)
+        if self.cards is None:
+            return [Markup(template.render({variable: item})) for item in items]
+
+        if keys is None:
+            keys = [card_key(search_type, item) for item in items]
+        cards = []
+        for item, key in zip(items, keys):
+            key = (search_type, key)
+            card = self.cards.get(key)
+            if card is None:
+                card = Markup(template.render({variable: item}))
+                self.cards.set(key, card)
+            cards.append(card)
+        return cards
+
+    def page_key(self, results: Any, search_params: Any,
+                 card_keys: Sequence[Tuple[Hashable, ...]], **context: Hashable) -> Tuple[Hashable, ...]:
+        """
+        Return the cache key of a results page.
+
+        Args:
+            results: The SearchResults shown
+            search_params: The GitHubSearchParams echoed into the page's forms
+            card_keys: The card_key() of every result on the page
+            **context: The other template variables the page depends on
+        """
+        freshness = results.freshness or {}
+        return (
+            results.search_type, results.query, results.total_count, results.has_next_page,
+            freshness.get("fetched_at"), search_params_key(search_params),
+            tuple(sorted(context.items())), tuple(card_keys),
+        )
+
+    def get_page(self, key: Tuple[Hashable, ...], csrf_token: Callable[[], str]) -> Optional[str]:
+        """Return a cached page with the caller's CSRF token filled in, or None."""
+        if self.pages is None:
+            return None
+        page = self.pages.get(key)
+        if page is None:
+            return None
+        return page.replace(CSRF_PLACEHOLDER, csrf_token())
+
+    def set_page(self, key: Tuple[Hashable, ...], page: str):
+        """Cache a page rendered with CSRF_PLACEHOLDER as its CSRF token."""
+        if self.pages is not None:
+            self.pages.set(key, page)
+
+
+def warm_templates(jinja_env: Environment) -> int:
+    """
+    Compile every template of an environment so no request pays for it.
+
+    With a bytecode cache configured, templates compiled by an earlier process
+    are loaded from it instead. Returns the number of templates loaded.
+    """
+    names = jinja_env.list_templates(extensions=["html"])
+    for name in names:
+        jinja_env.get_template(name)
+    logger.info(f"Compiled {len(names)} templates")
+    return len(names)
@@ -0,0 +1,226 @@
+"""
+Batch filtering of Exa results
+
+The results are turned into columns once: publication times parsed into
+datetime64 UTC milliseconds, scores into floats, and URL hosts. Date, score
+and domain predicates are then evaluated over the whole batch as NumPy
+masks, so filtering thousands of bulk similar-URL results costs a few array
+operations rather than two date parses per result.
+
+Publication dates may be plain dates or ISO 8601 timestamps, with or
+without a 'Z' or UTC offset. A result whose date or score is missing or
+unparsable passes the predicates on that field, and so does one whose URL
+has no host. Without NumPy the same predicates are applied one result at
+a time.
+"""
+from datetime import date, datetime, timezone
+from typing import Any, List, Optional, Sequence, Tuple, Union
+from urllib.parse import urlsplit
+import warnings
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+DateBound = Union[datetime, date, str, None]
+
+
+def _field(result: Any, name: str) -> Any:
+    """Read a field of an Exa result object or of its dict form."""
+    if isinstance(result, dict):
+        return result.get(name)
+    return getattr(result, name, None)
+
+
+def _column(results: Sequence[Any], name: str) -> List[Any]:
+    """Read a field of a batch of results that are all objects or all dicts."""
+    if isinstance(results[0], dict):
+        return [result.get(name) for result in results]
+    return [getattr(result, name, None) for result in results]
+
+
+def parse_timestamp(value: DateBound) -> Optional[datetime]:
+    """
+    Parse a date or ISO 8601 timestamp into a naive UTC datetime.
+
+    Returns None for a missing or unparsable value.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+        except ValueError:
+            return None
+    elif not isinstance(value, datetime):
+        if not isinstance(value, date):
+            return None
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+
+def host(url: Optional[str]) -> str:
+    """Return the lowercase host of a URL without a leading 'www.'."""
+    if not url:
+        return ""
+    hostname = (urlsplit(url if "//" in url else f"//{url}").hostname or "")
+    return hostname[4:] if hostname.startswith("www.") else hostname
+
+
+def _netloc(url: Optional[str]) -> str:
+    """Return the part of a URL that host() reads the host from, by string splitting."""
+    if not url:
+        return ""
+    _, slashes, rest = url.partition("//")
+    return (rest if slashes else url).partition("/")[0].partition("?")[0].partition("#")[0]
+
+
+def in_domains(hostname: str, domains: Sequence[str]) -> bool:
+    """Return whether a host is one of the domains or a subdomain of one."""
+    return any(hostname == domain or hostname.endswith(f".{domain}") for domain in domains)
+
+
+def _normalize_domains(domains: Optional[Sequence[str]]) -> List[str]:
+    return [host(domain) or domain.lower() for domain in domains or () if domain]
+
+
+def _datetime64(values: Sequence[Any]) -> "np.ndarray":
+    """Parse publication dates into datetime64[ms], NaT where missing or unparsable."""
+    strings = [value[:-1] if isinstance(value, str) and value.endswith("Z") else value or "NaT"
+               for value in values]
+    try:
+        with warnings.catch_warnings():
+            # NumPy only warns about UTC offsets, which need converting
+            warnings.simplefilter("error")
+            return np.array(strings, dtype="datetime64[ms]")
+    except (ValueError, TypeError, UserWarning, DeprecationWarning):
+        parsed = [parse_timestamp(value) for value in values]
+        return np.array([value if value is not None else "NaT" for value in parsed],
+                        dtype="datetime64[ms]")
+
+
+class ResultColumns:
+    """Columns of a batch of Exa results, parsed once and filtered many times."""
+
+    def __init__(self, results: Sequence[Any]):
+        """
+        Parse the columns of a batch of results.
+
+        Args:
+            results: Exa result objects, or their dict forms, but not a mix of both
+        """
+        self.results = list(results)
+        self.published = _datetime64(_column(self.results, "published_date"))
+        self.scores = np.array(_column(self.results, "score"), dtype=np.float64)
+        self._hosts = None
+
+    def hosts(self) -> Tuple["np.ndarray", "np.ndarray"]:
+        """
+        Return the distinct hosts of the result URLs and each result's index into them.
+
+        Hosts are parsed on first use, once per distinct scheme and netloc.
+        """
+        if self._hosts is None:
+            codes = {}
+            index = np.fromiter(
+                (codes.setdefault(_netloc(url), len(codes)) for url in _column(self.results, "url")),
+                dtype=np.intp, count=len(self.results))
+            self._hosts = np.array([host(f"//{netloc}") if netloc else "" for netloc in codes],
+                                   dtype=object), index
+        return self._hosts
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def _host_mask(self, domains: List[str]) -> "np.ndarray":
+        # Domain predicates are evaluated once per distinct host
+        hosts, index = self.hosts()
+        matches = np.array([in_domains(hostname, domains) for hostname in hosts], dtype=bool)
+        return matches[index]
+
+    def mask(self, min_date: DateBound = None, max_date: DateBound = None,
+             min_score: Optional[float] = None, max_score: Optional[float] = None,
+             include_domains: Optional[Sequence[str]] = None,
+             exclude_domains: Optional[Sequence[str]] = None) -> "np.ndarray":
+        """Return a boolean mask of the results that pass every given predicate."""
+        keep = np.ones(len(self.results), dtype=bool)
+        has_date = ~np.isnat(self.published)
+        for bound, passes in ((parse_timestamp(min_date), np.greater_equal),
+                              (parse_timestamp(max_date), np.less_equal)):
+            if bound is not None:
+                keep &= ~has_date | passes(self.published, np.datetime64(bound, "ms"))
+
+        has_score = ~np.isnan(self.scores)
+        if min_score is not None:
+            keep &= ~has_score | (np.nan_to_num(self.scores) >= min_score)
+        if max_score is not None:
+            keep &= ~has_score | (np.nan_to_num(self.scores) <= max_score)
+
+        include_domains = _normalize_domains(include_domains)
+        if include_domains:
+            hosts, index = self.hosts()
+            keep &= (hosts == "")[index] | self._host_mask(include_domains)
+        exclude_domains = _normalize_domains(exclude_domains)
+        if exclude_domains:
+            keep &= ~self._host_mask(exclude_domains)
+        return keep
+
+    def select(self, mask: "np.ndarray") -> List[Any]:
+        """Return the results selected by a mask, in their original order."""
+        return [self.results[i] for i in np.flatnonzero(mask)]
+
+
+def _matches(result: Any, min_date: Optional[datetime], max_date: Optional[datetime],
+             min_score: Optional[float], max_score: Optional[float],
+             include_domains: List[str], exclude_domains: List[str]) -> bool:
+    """Apply the predicates to one result; used when NumPy is not installed."""
+    published = parse_timestamp(_field(result, "published_date"))
+    if published is not None:
+        if min_date is not None and published < min_date:
+            return False
+        if max_date is not None and published > max_date:
+            return False
+    score = _field(result, "score")
+    if score is not None:
+        if min_score is not None and score < min_score:
+            return False
+        if max_score is not None and score > max_score:
+            return False
+    hostname = host(_field(result, "url"))
+    if hostname:
+        if include_domains and not in_domains(hostname, include_domains):
+            return False
+        if exclude_domains and in_domains(hostname, exclude_domains):
+            return False
+    return True
+
+
+def filter_results(results: Sequence[Any], min_date: DateBound = None, max_date: DateBound = None,
+                   min_score: Optional[float] = None, max_score: Optional[float] = None,
+                   include_domains: Optional[Sequence[str]] = None,
+                   exclude_domains: Optional[Sequence[str]] = None) -> List[Any]:
+    """
+    Return the results that pass every given predicate, in their original order.
+
+    Args:
+        results: Exa result objects, or their dict forms
+        min_date: Earliest publication date or time (inclusive)
+        max_date: Latest publication date or time (inclusive)
+        min_score: Lowest relevance score (inclusive)
+        max_score: Highest relevance score (inclusive)
+        include_domains: Domains the result URLs must be on, subdomains included
+        exclude_domains: Domains the result URLs must not be on, subdomains included
+    """
+    if not results:
+        return []
+    if np is not None:
+        columns = ResultColumns(results)
+        return columns.select(columns.mask(
+            min_date, max_date, min_score, max_score, include_domains, exclude_domains))
+
+    bounds = (parse_timestamp(min_date), parse_timestamp(max_date), min_score, max_score,
+              _normalize_domains(include_domains), _normalize_domains(exclude_domains))
+    return [result for result in results if _matches(result, *bounds)]
@@ -0,0 +1,124 @@
+"""
+Exa to GitHub result matching
+
+This module builds hash indexes over Exa search results once so that each
+GitHub result can be matched to its Exa counterpart in constant time.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+GITHUB_HOST = "github.com"
+
+
+def _split_url(url: str) -> Tuple[str, str]:
+    """
+    Split a URL into a lowercased host and a path without query, fragment or trailing slash.
+
+    Plain string slicing is used instead of urllib.parse because this runs for
+    every GitHub and Exa result on every search.
+    """
+    url = url.strip()
+    scheme_end = url.find("://")
+    if scheme_end != -1:
+        url = url[scheme_end + 3:]
+    for separator in ("#", "?"):
+        cut = url.find(separator)
+        if cut != -1:
+            url = url[:cut]
+
+    path_start = url.find("/")
+    if path_start == -1:
+        host, path = url, ""
+    else:
+        host, path = url[:path_start], url[path_start:].rstrip("/")
+
+    host = host.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    return host, path
+
+
+def normalize_url(url: Optional[str]) -> str:
+    """
+    Normalize a URL for matching.
+
+    The scheme is dropped, the host is lowercased without a leading 'www.', and
+    the query string, fragment and trailing slash are removed. The path keeps
+    its case since file paths in GitHub URLs are case-sensitive.
+    """
+    if not url:
+        return ""
+    host, path = _split_url(url)
+    return host + path
+
+
+def _repository_key(host: str, path: str) -> Optional[str]:
+    """Return the lowercased 'owner/name' of a split GitHub URL, including sub-paths like /tree/main/..."""
+    if host != GITHUB_HOST:
+        return None
+    segments = path.split("/", 3)
+    if len(segments) < 3 or not segments[1] or not segments[2]:
+        return None
+    return f"{segments[1]}/{segments[2]}".lower()
+
+
+class ExaResultIndex:
+    """Normalized-URL and owner/name indexes over a list of Exa results."""
+
+    def __init__(self, exa_results: List[Dict[str, Any]]):
+        """
+        Build the indexes.
+
+        When several Exa results share a key, the first one wins, matching the
+        order in which Exa ranked them.
+
+        Args:
+            exa_results: Exa search results as returned by the Exa API
+        """
+        self._by_url: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        self._by_repository: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+
+        for position, exa_result in enumerate(exa_results):
+            url = exa_result.get("url")
+            if not url:
+                continue
+            host, path = _split_url(url)
+            self._by_url.setdefault(host + path, (position, exa_result))
+
+            repo_key = _repository_key(host, path)
+            if repo_key:
+                self._by_repository.setdefault(
+                    repo_key, (position, exa_result))
+
+    def match_url(self, html_url: Optional[str]) -> Optional[Dict[str, Any]]:
+        """Return the Exa result with the same normalized URL, if any."""
+        if not html_url:
+            return None
+        entry = self._by_url.get(normalize_url(html_url))
+        return entry[1] if entry else None
+
+    def match_repository(self, html_url: Optional[str], full_name: Optional[str]) -> Optional[Dict[str, Any]]:
+        """
+        Return the best-ranked Exa result for a repository.
+
+        An Exa result matches if its URL equals the repository URL or points
+        anywhere inside the repository (e.g. a file under /tree/main/...).
+        """
+        candidates = []
+        if html_url:
+            by_url = self._by_url.get(normalize_url(html_url))
+            if by_url:
+                candidates.append(by_url)
+        if full_name:
+            by_repository = self._by_repository.get(full_name.lower())
+            if by_repository:
+                candidates.append(by_repository)
+        if not candidates:
+            return None
+        return min(candidates, key=lambda entry: entry[0])[1]
+
+
+def apply_exa_result(item: Any, exa_result: Dict[str, Any]):
+    """Copy the Exa analysis fields onto a GitHub result object."""
+    item.relevance_score = exa_result.get("score")
+    item.semantic_similarity = exa_result.get("similarity", 0)
+    item.exa_content = exa_result.get("text")
@@ -1,22 +1,118 @@
 import os
+import time
 import requests
-from typing import Dict, Any, Optional, List, Union
+from functools import partial
+from datetime import datetime, timezone
+from concurrent.futures import Executor, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Optional, List, Union, Callable, Tuple
 import logging
+from dataclasses import dataclass
 from app.models.search_params import GitHubSearchParams
 from app.models.search_result import SearchResults, GitHubRepository, GitHubCodeResult, GitHubIssueResult, GitHubUserResult
+from app.services.http_client import UpstreamSessions
+from app.services.metrics import NULL_METRICS, Metrics
+from app.services.result_matcher import ExaResultIndex, apply_exa_result
+from app.services.single_flight import SingleFlight
+from app.services.rate_limit import GitHubTokenPool
+from app.services.local_index import LocalIndex
+from app.services.vector_index import VectorIndex
+from app.services.ranking import Ranker
+from app.services.candidate_pool import POOL_PAGE_SIZE, CandidatePool, CandidatePools
 
 logger = logging.getLogger(__name__)
 
+# GitHub search returns at most 1,000 results per query, at most 100 per page
+GITHUB_SEARCH_RESULT_LIMIT = 1000
+GITHUB_MAX_PER_PAGE = 100
+
+
+def github_endpoint(url: str) -> str:
+    """Return the GitHub API endpoint of a search URL, e.g. 'search/repositories'."""
+    return "/".join(url.rstrip("/").rsplit("/", 2)[-2:])
+
+
+@dataclass
+class CachedGitHubResponse:
+    """Parsed GitHub search results stored with the validators needed to revalidate them."""
+    results: SearchResults
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+
+
+@dataclass
+class GitHubSearchRequest:
+    """A prepared GitHub search call along with what is needed to handle its response."""
+    url: str
+    headers: Dict[str, str]
+    params: Dict[str, Any]
+    search_type: str
+    query: str
+    page: int
+    per_page: int
+    cache_key: Optional[str] = None
+    cached: Optional[CachedGitHubResponse] = None
+    search_params: Optional[GitHubSearchParams] = None
+
 
 class SearchService:
     """Service for handling search operations with GitHub and Exa APIs."""
 
-    def __init__(self, github_token: Optional[str] = None, exa_api_key: Optional[str] = None):
-        """Initialize the search service with API credentials."""
+    def __init__(self, github_token: Optional[str] = None, exa_api_key: Optional[str] = None,
+                 sessions: Optional[UpstreamSessions] = None, executor: Optional[Executor] = None,
+                 github_deadline: Optional[float] = None, exa_deadline: Optional[float] = None,
+                 cache: Optional[Any] = None, single_flight: Optional[SingleFlight] = None,
+                 token_pool: Optional[GitHubTokenPool] = None, compact_results: bool = False,
+                 metrics: Optional[Metrics] = None, local_index: Optional[LocalIndex] = None,
+                 answer_locally: bool = False, vector_index: Optional[VectorIndex] = None,
+                 ranker: Optional[Ranker] = None, candidate_pools: Optional[CandidatePools] = None,
+                 exa_cache: Optional[Any] = None):
+        """
+        Initialize the search service with API credentials.
+
+        Args:
+            github_token: GitHub API token
+            exa_api_key: Exa API key
+            sessions: Shared pooled HTTP sessions; a private set is created if omitted
+            executor: Bounded executor used to run the GitHub and Exa calls concurrently;
+                the calls run sequentially if omitted
+            github_deadline: Seconds to wait for the GitHub leg in concurrent mode
+            exa_deadline: Seconds to wait for the Exa leg in concurrent mode
+            cache: Response cache for parsed GitHub results (see app.services.cache)
+            single_flight: Coalescer shared by concurrent identical combined searches
+            token_pool: Rate-limit-aware pool of GitHub tokens; github_token is used alone if omitted
+            compact_results: Parse items into the slotted, lazily hydrated Compact* models
+            metrics: Registry receiving upstream and stage timings; nothing is recorded if omitted
+            local_index: Index every GitHub response is recorded in
+            answer_locally: Answer refinements of fully indexed searches from local_index
+                instead of GitHub
+            vector_index: Local vector index results are collected into and that scores
+                results when Exa enhancement is requested but Exa returns nothing
+            ranker: Re-ranks combined results by GitHub order, popularity, recency
+                and Exa scores; results keep GitHub's order if omitted
+            candidate_pools: Pools of results fetched 100 at a time that pages
+                within the pool size are served from
+            exa_cache: Cache of Exa search results, kept apart from the GitHub
+                response cache (see app.services.cache)
+        """
         self.github_token = github_token or os.environ.get('GITHUB_TOKEN')
         self.exa_api_key = exa_api_key or os.environ.get('EXA_API_KEY')
-
-        if not self.github_token:
+        self.sessions = sessions or UpstreamSessions()
+        self.executor = executor
+        self.github_deadline = github_deadline
+        self.exa_deadline = exa_deadline
+        self.cache = cache
+        self.single_flight = single_flight
+        self.token_pool = token_pool
+        self.compact_results = compact_results
+        self.metrics = metrics or NULL_METRICS
+        self.local_index = local_index
+        self.answer_locally = answer_locally
+        self.vector_index = vector_index
+        self.ranker = ranker
+        self.candidate_pools = candidate_pools
+        self.exa_cache = exa_cache
+
+        if not self.github_token and not self.token_pool:
             logger.warning(
                 "GitHub token not provided. GitHub API functionality will be limited.")
 
@@ -24,6 +120,19 @@ class SearchService:
             logger.warning(
                 "Exa API key not provided. Exa search capabilities will be disabled.")
 
+    @staticmethod
+    def github_cache_key(search_params: GitHubSearchParams, page: int, per_page: int) -> str:
+        """Build the cache key for a GitHub search from the normalized query and pagination."""
+        query = " ".join(search_params.build_github_query().lower().split())
+        search_type = search_params.type or "repositories"
+        return f"github:{search_type}:{page}:{per_page}:{query}"
+
+    def combined_search_key(self, search_params: GitHubSearchParams, page: int, per_page: int,
+                            enhance_with_exa: bool) -> str:
+        """Build the key identifying a combined search, used to coalesce identical searches."""
+        use_exa = enhance_with_exa and (bool(self.exa_api_key) or self.vector_index is not None)
+        return f"{self.github_cache_key(search_params, page, per_page)}:exa={int(use_exa)}"
+
     def github_search(self, search_params: GitHubSearchParams, page: int = 1, per_page: int = 10) -> Optional[SearchResults]:
         """
         Perform a search using the GitHub API.
@@ -35,28 +144,148 @@ class SearchService:
 
         Returns:
             SearchResults or None if the request failed
+
+        Raises:
+            GitHubRateLimitExceeded: If every pooled token stays exhausted longer
+                than the pool's queueing limit
+        """
+        if self.candidate_pools is not None and self.candidate_pools.serves(page, per_page):
+            pool, missing = self._candidate_pool(search_params, page, per_page)
+            pool = self._grown_pool(search_params, pool, missing, page, per_page)
+            return pool.page(page, per_page) if pool is not None else None
+        return self._fetch_github_search(search_params, page, per_page)
+
+    def _fetch_github_search(self, search_params: GitHubSearchParams, page: int,
+                             per_page: int) -> Optional[SearchResults]:
+        """Fetch one page of a search from GitHub, or answer it from the cache or local index."""
+        prepared, results = self._prepare_github_search(
+            search_params, page, per_page)
+        if prepared is None:
+            return results
+
+        try:
+            response = self._github_request(
+                prepared.url, prepared.headers, prepared.params)
+            return self._github_search_response(prepared, response)
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error during GitHub API request: {e}")
+            return None
+
+    def _candidate_pool(self, search_params: GitHubSearchParams, page: int,
+                        per_page: int) -> Tuple[CandidatePool, range]:
+        """Return the pool of a search and the pool pages to fetch before it covers a page."""
+        pool = self.candidate_pools.get(search_params)
+        return pool, pool.missing_pages(page, per_page)
+
+    def _grown_pool(self, search_params: GitHubSearchParams, pool: CandidatePool, missing: range,
+                    page: int, per_page: int) -> Optional[CandidatePool]:
+        """Fetch the missing pool pages of a search; see _stored_pool."""
+        chunks = []
+        for pool_page in missing:
+            chunk = self._fetch_github_search(search_params, pool_page, POOL_PAGE_SIZE)
+            if chunk is None:
+                break
+            chunks.append(chunk)
+            if len(chunk.results) < POOL_PAGE_SIZE:
+                break
+        return self._stored_pool(search_params, pool, chunks, page, per_page)
+
+    def _stored_pool(self, search_params: GitHubSearchParams, pool: CandidatePool,
+                     chunks: List[SearchResults], page: int, per_page: int) -> Optional[CandidatePool]:
+        """
+        Grow a pool by the pages fetched for it and store it.
+
+        Returns None if GitHub failed before the pool covered the page.
+        """
+        if chunks:
+            pool = pool.extended(chunks)
+            self.candidate_pools.set(search_params, pool)
+        if not pool.covers(page, per_page):
+            return None
+        return pool
+
+    def _ranks_pool(self, page: int, per_page: int) -> bool:
+        """Return whether a combined search ranks the whole candidate pool of a page."""
+        return (self.ranker is not None and self.candidate_pools is not None
+                and self.candidate_pools.serves(page, per_page))
+
+    @staticmethod
+    def _pool_ranking(use_exa: bool, use_vectors: bool) -> str:
+        """Name the enhancement a pool is ranked with."""
+        return "exa" if use_exa else "vectors" if use_vectors else "github"
+
+    def _ranked_pool_page(self, pool: CandidatePool, page: int, per_page: int,
+                          started: float) -> SearchResults:
+        """Serve a page of a pool that is already ranked, with no upstream call."""
+        results = pool.page(page, per_page, ranked=True)
+        results.timings = {"total": time.perf_counter() - started}
+        self.metrics.observe("exahub_stage_duration_seconds", results.timings["total"], stage="combined")
+        return results
+
+    def _rank_pool(self, search_params: GitHubSearchParams, pool: CandidatePool,
+                   exa_results: Optional[List[Dict[str, Any]]], timings: Dict[str, float], started: float,
+                   page: int, per_page: int, use_exa: bool, use_vectors: bool) -> SearchResults:
+        """Enhance and rank every item of a pool, store the ranking and serve a page of it."""
+        candidates = self._merge_results(pool.candidates(), exa_results, timings, started, use_vectors)
+        pool = pool.ranked_as(candidates.results, self._pool_ranking(use_exa, use_vectors))
+        # Without the Exa results the ranking is not kept, so the next page tries Exa again
+        if exa_results or not use_exa:
+            self.candidate_pools.set(search_params, pool)
+        results = pool.page(page, per_page, ranked=True)
+        results.timings = candidates.timings
+        return results
+
+    def _prepare_github_search(self, search_params: GitHubSearchParams, page: int,
+                               per_page: int) -> Tuple[Optional["GitHubSearchRequest"], Optional[SearchResults]]:
+        """
+        Build the GitHub request for a search, or answer it without one.
+
+        Returns:
+            A tuple of (request, None) when GitHub must be called, or
+            (None, results) when the search is answered from the cache or
+            cannot be run, in which case results is None
         """
         if not search_params.query:
             logger.error("No search query provided")
-            return None
+            return None, None
 
         # Validate GitHub token
-        if not self.github_token:
+        if not self.github_token and not self.token_pool:
             logger.error(
                 "GitHub API token not provided. Cannot perform GitHub search.")
-            return None
+            return None, None
+
+        # Serve repeated searches from the cache without spending rate-limit quota
+        cache_key = None
+        cached = None
+        if self.cache is not None:
+            cache_key = self.github_cache_key(search_params, page, per_page)
+            cached, fresh = self.cache.lookup(cache_key)
+            if cached is not None and fresh:
+                return None, cached.results.copy()
+
+        # Narrower filters on an already fully fetched search need no GitHub call
+        if self.local_index is not None and self.answer_locally:
+            results = self._local_search(search_params, page, per_page)
+            if results is not None:
+                return None, results
 
         # Build the GitHub search URL
         search_type = search_params.type or "repositories"
-        base_url = f"https://api.github.com/search/{search_type}"
+        base_url = f"{self.sessions.github_url}/search/{search_type}"
 
         # Prepare headers
         headers = {
             "Accept": "application/vnd.github.v3+json"
         }
 
-        if self.github_token:
-            headers["Authorization"] = f"token {self.github_token}"
+        # Revalidate a stale cache entry; a 304 does not count against the rate limit
+        if cached is not None:
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
 
         # Prepare parameters
         params = {
@@ -65,22 +294,126 @@ class SearchService:
             "per_page": per_page
         }
 
-        try:
-            response = requests.get(base_url, headers=headers, params=params)
-            response.raise_for_status()
+        return GitHubSearchRequest(
+            url=base_url, headers=headers, params=params, search_type=search_type,
+            query=search_params.query, page=page, per_page=per_page,
+            cache_key=cache_key, cached=cached, search_params=search_params
+        ), None
+
+    def _local_search(self, search_params: GitHubSearchParams, page: int,
+                      per_page: int) -> Optional[SearchResults]:
+        """Answer a search from the local index, with its freshness, or return None."""
+        answer = self.local_index.answer(search_params, page, per_page)
+        self.metrics.incr("exahub_local_index_lookups_total",
+                          result="answered" if answer else "gap")
+        if answer is None:
+            return None
 
-            data = response.json()
-            return SearchResults.from_github_api(
+        data, fetched_at = answer
+        with self.metrics.timer("exahub_stage_duration_seconds", stage="parse"):
+            results = SearchResults.from_github_api(
                 data=data,
-                search_type=search_type,
+                search_type=search_params.type or "repositories",
                 query=search_params.query,
                 page=page,
-                per_page=per_page
+                per_page=per_page,
+                compact=self.compact_results
             )
+        results.freshness = {
+            "source": "local_index",
+            "fetched_at": datetime.fromtimestamp(fetched_at, timezone.utc).isoformat(timespec="seconds"),
+            "age_seconds": round(time.time() - fetched_at, 1)
+        }
+        return results
 
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error during GitHub API request: {e}")
-            return None
+    def _github_search_response(self, prepared: "GitHubSearchRequest", response: Any) -> SearchResults:
+        """
+        Turn a GitHub search response into results, updating the cache.
+
+        The response may come from requests or from an async client with the
+        same status_code/headers/json()/raise_for_status() interface.
+        """
+        cached = prepared.cached
+        if response.status_code == 304 and cached is not None:
+            cached.etag = response.headers.get("ETag", cached.etag)
+            cached.last_modified = response.headers.get(
+                "Last-Modified", cached.last_modified)
+            self.cache.set(prepared.cache_key, cached)
+            self.cache.stats.incr("revalidations")
+            return cached.results.copy()
+
+        response.raise_for_status()
+
+        data = response.json()
+        with self.metrics.timer("exahub_stage_duration_seconds", stage="parse"):
+            results = SearchResults.from_github_api(
+                data=data,
+                search_type=prepared.search_type,
+                query=prepared.query,
+                page=prepared.page,
+                per_page=prepared.per_page,
+                compact=self.compact_results
+            )
+
+        if self.local_index is not None and prepared.search_params is not None:
+            self.local_index.record(
+                prepared.search_params, prepared.page, prepared.per_page, data)
+
+        if prepared.cache_key is not None:
+            self.cache.set(prepared.cache_key, CachedGitHubResponse(
+                results=results,
+                etag=response.headers.get("ETag"),
+                last_modified=response.headers.get("Last-Modified")
+            ))
+            return results.copy()
+        return results
+
+    def _github_request(self, url: str, headers: Dict[str, str], params: Dict[str, Any]) -> requests.Response:
+        """
+        Send a GitHub API request, scheduling it on the token with the most quota.
+
+        A response rejected by a rate limit is retried once per remaining token;
+        the pool queues the request if every token is exhausted, and sheds it
+        if no quota returns in time.
+
+        Raises:
+            GitHubRateLimitExceeded: If the request is shed
+        """
+        if self.token_pool is None:
+            if self.github_token:
+                headers["Authorization"] = f"token {self.github_token}"
+            return self._send_github(url, headers, params)
+
+        # After every token was rate limited, acquiring again queues for quota or sheds
+        for attempt in range(len(self.token_pool) + 1):
+            token_state = self.token_pool.acquire()
+            headers["Authorization"] = f"token {token_state.token}"
+            response = None
+            try:
+                response = self._send_github(url, headers, params)
+            finally:
+                rate_limited = self.token_pool.release(
+                    token_state,
+                    response.status_code if response is not None else None,
+                    response.headers if response is not None else None
+                )
+            if not rate_limited:
+                return response
+        raise self.token_pool.exceeded()
+
+    def _send_github(self, url: str, headers: Dict[str, str], params: Dict[str, Any]) -> requests.Response:
+        """Send one GitHub API request on the pooled session, recording its round trip."""
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.sessions.github.get(
+                url, headers=headers, params=params, timeout=self.sessions.timeout)
+            return response
+        finally:
+            self.metrics.record_upstream(
+                "github", github_endpoint(url),
+                response.status_code if response is not None else None,
+                time.perf_counter() - started)
 
     def exa_search(self, query: str, num_results: int = 10) -> Optional[List[Dict[str, Any]]]:
         """
@@ -97,6 +430,53 @@ class SearchService:
             logger.error("Exa API key not provided")
             return None
 
+        cache_key = self._exa_cache_key(query, num_results)
+        if cache_key is not None:
+            cached = self.exa_cache.get(cache_key)
+            if cached is not None:
+                return cached
+
+        headers, payload = self._exa_request(query, num_results)
+
+        try:
+            response = self._send_exa(headers, payload)
+            response.raise_for_status()
+
+            results = response.json().get("results", [])
+            if cache_key is not None:
+                self.exa_cache.set(cache_key, results)
+            return results
+
+        except requests.exceptions.RequestException as e:
+            logger.error(f"Error during Exa API request: {e}")
+            return None
+
+    def _send_exa(self, headers: Dict[str, str], payload: Dict[str, Any]) -> requests.Response:
+        """Send one Exa search request on the pooled session, recording its round trip."""
+        started = time.perf_counter()
+        response = None
+        try:
+            response = self.sessions.exa.post(
+                f"{self.sessions.exa_url}/search",
+                headers=headers,
+                json=payload,
+                timeout=self.sessions.timeout
+            )
+            return response
+        finally:
+            self.metrics.record_upstream(
+                "exa", "search", response.status_code if response is not None else None,
+                time.perf_counter() - started)
+
+    def _exa_cache_key(self, query: str, num_results: int) -> Optional[str]:
+        """Return the cache key of an Exa search, or None without a cache."""
+        if self.exa_cache is None:
+            return None
+        # Exa results depend only on the query, so every page of a search shares them
+        return f"exa:search:{num_results}:{' '.join(query.lower().split())}"
+
+    def _exa_request(self, query: str, num_results: int) -> Tuple[Dict[str, str], Dict[str, Any]]:
+        """Return the headers and JSON payload of an Exa search request."""
         headers = {
             "x-api-key": self.exa_api_key,
             "Content-Type": "application/json"
@@ -107,26 +487,18 @@ class SearchService:
             "numResults": num_results,
             "useAutoprompt": True
         }
-
-        try:
-            response = requests.post(
-                "https://api.exa.ai/search",
-                headers=headers,
-                json=payload
-            )
-            response.raise_for_status()
-
-            return response.json().get("results", [])
-
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error during Exa API request: {e}")
-            return None
+        return headers, payload
 
     def combined_search(self, search_params: GitHubSearchParams, page: int = 1, per_page: int = 10,
                         enhance_with_exa: bool = True) -> Optional[SearchResults]:
         """
         Perform a combined search using both GitHub and Exa APIs.
 
+        When the service has an executor, the GitHub and Exa calls are fired
+        together and the per-leg timings are recorded on the results. When it
+        has a single-flight coalescer, concurrent identical searches share one
+        pair of upstream calls.
+
         Args:
             search_params: Search parameters object
             page: Page number for paginated results
@@ -136,74 +508,216 @@ class SearchService:
         Returns:
             Enhanced SearchResults or None if both searches failed
         """
-        # First, perform the GitHub search
-        github_results = self.github_search(search_params, page, per_page)
+        use_exa = enhance_with_exa and bool(self.exa_api_key)
+        use_vectors = enhance_with_exa and self.vector_index is not None
+
+        if self.single_flight is None:
+            return self._combined_search(search_params, page, per_page, use_exa, use_vectors)
+
+        key = self.combined_search_key(
+            search_params, page, per_page, enhance_with_exa)
+        results, _ = self.single_flight.do(
+            key, self._combined_search, search_params, page, per_page, use_exa, use_vectors)
+        # Every caller gets its own copy of the shared result
+        return results.copy() if results else results
+
+    def _combined_search(self, search_params: GitHubSearchParams, page: int, per_page: int,
+                         use_exa: bool, use_vectors: bool = False) -> Optional[SearchResults]:
+        """Run the GitHub and (optionally) Exa searches and merge their results."""
+        started = time.perf_counter()
+        if self._ranks_pool(page, per_page):
+            return self._combined_pool_search(search_params, page, per_page, use_exa, use_vectors, started)
+
+        if use_exa and self.executor is not None:
+            github_results, exa_results, timings = self._run_concurrently(
+                partial(self.github_search, search_params, page, per_page),
+                partial(self.exa_search, search_params.query, per_page))
+        else:
+            timings = {}
+            # First, perform the GitHub search
+            github_results, timings["github"] = self._timed(
+                self.github_search, search_params, page, per_page)
+
+            # Perform Exa search to enhance results
+            exa_results = None
+            if github_results and use_exa:
+                exa_results, timings["exa"] = self._timed(
+                    self.exa_search, search_params.query, num_results=per_page)
+
+        return self._merge_results(github_results, exa_results, timings, started, use_vectors)
+
+    def _combined_pool_search(self, search_params: GitHubSearchParams, page: int, per_page: int,
+                              use_exa: bool, use_vectors: bool, started: float) -> Optional[SearchResults]:
+        """
+        Serve a combined search page from the search's candidate pool, ranked as a whole.
+
+        A pool already ranked with the same enhancement serves the page with
+        no upstream call. Otherwise the pool is grown to cover the page and
+        all of it is enhanced, with one Exa search of POOL_PAGE_SIZE results
+        or the vector index, and ranked before the page is sliced.
+        """
+        pool, missing = self._candidate_pool(search_params, page, per_page)
+        if not missing and pool.is_ranked(self._pool_ranking(use_exa, use_vectors)):
+            return self._ranked_pool_page(pool, page, per_page, started)
+
+        grow = partial(self._grown_pool, search_params, pool, missing, page, per_page)
+        if use_exa and self.executor is not None:
+            pool, exa_results, timings = self._run_concurrently(
+                grow, partial(self.exa_search, search_params.query, POOL_PAGE_SIZE))
+        else:
+            timings = {}
+            pool, timings["github"] = self._timed(grow)
+            exa_results = None
+            if pool is not None and use_exa:
+                exa_results, timings["exa"] = self._timed(
+                    self.exa_search, search_params.query, num_results=POOL_PAGE_SIZE)
+
+        if pool is None:
+            return None
+        return self._rank_pool(search_params, pool, exa_results, timings, started,
+                               page, per_page, use_exa, use_vectors)
+
+    def _merge_results(self, github_results: Optional[SearchResults], exa_results: Optional[List[Dict[str, Any]]],
+                       timings: Dict[str, float], started: float,
+                       use_vectors: bool = False) -> Optional[SearchResults]:
+        """
+        Enhance the GitHub results with the Exa results and record the stage timings.
 
+        With use_vectors, results Exa did not return (no API key, a failure or
+        a missed deadline) are scored against the local vector index instead.
+        """
         # If GitHub search failed or no Exa enhancement requested, return GitHub results
-        if not github_results or not enhance_with_exa or not self.exa_api_key:
+        if not github_results:
             return github_results
 
-        # Perform Exa search to enhance results
-        exa_results = self.exa_search(
-            search_params.query, num_results=per_page)
+        from_exa = bool(exa_results)
+        if not exa_results and use_vectors:
+            exa_results, timings["vectors"] = self._timed(self._vector_search, github_results)
+
+        if exa_results:
+            with self.metrics.timer("exahub_stage_duration_seconds", stage="enhance"):
+                self._enhance_results(github_results, exa_results)
+
+        if self.ranker is not None:
+            with self.metrics.timer("exahub_stage_duration_seconds", stage="rank"):
+                self.ranker.rank_results(github_results)
+
+        if self.vector_index is not None:
+            self.vector_index.corpus.add_results(
+                github_results.search_type, github_results.results,
+                exa_results if from_exa else None)
+
+        timings["total"] = time.perf_counter() - started
+        github_results.timings = timings
+        for stage, seconds in timings.items():
+            self.metrics.observe("exahub_stage_duration_seconds", seconds,
+                                 stage="combined" if stage == "total" else stage)
+        logger.debug(f"Combined search timings: {timings}")
+        return github_results
 
-        if not exa_results:
-            return github_results
+    def _run_concurrently(self, github_leg: Callable[[], Any], exa_leg: Callable[[], Any]
+                          ) -> Tuple[Any, Optional[List[Dict[str, Any]]], Dict[str, float]]:
+        """
+        Run the GitHub and Exa calls together on the executor.
 
-        # Process results based on search type
-        if search_params.type == "repositories":
-            self._enhance_repository_results(github_results, exa_results)
-        elif search_params.type == "code":
-            self._enhance_code_results(github_results, exa_results)
-        elif search_params.type == "issues":
-            self._enhance_issue_results(github_results, exa_results)
-        elif search_params.type == "users":
-            self._enhance_user_results(github_results, exa_results)
+        The Exa result is ignored if GitHub fails or misses its deadline, and
+        an Exa leg that misses its deadline leaves the results unenhanced.
+        Deadlines are measured from the moment both calls are submitted.
 
-        return github_results
+        Args:
+            github_leg: Call returning a page of GitHub results or a candidate pool, None on failure
+            exa_leg: Call returning the Exa results
+        """
+        timings: Dict[str, float] = {}
+        submitted = time.perf_counter()
+
+        github_future = self.executor.submit(self._timed, github_leg)
+        exa_future = self.executor.submit(self._timed, exa_leg)
+
+        try:
+            github_results, timings["github"] = github_future.result(
+                timeout=self.github_deadline)
+        except FutureTimeoutError:
+            logger.error(
+                f"GitHub search exceeded its {self.github_deadline}s deadline")
+            github_future.cancel()
+            exa_future.cancel()
+            return None, None, timings
+
+        if not github_results:
+            # No point waiting for Exa when there is nothing to enhance
+            exa_future.cancel()
+            return github_results, None, timings
 
-    def _enhance_repository_results(self, github_results: SearchResults, exa_results: List[Dict[str, Any]]):
+        remaining = None
+        if self.exa_deadline is not None:
+            remaining = max(0.0, self.exa_deadline -
+                            (time.perf_counter() - submitted))
+
+        try:
+            exa_results, timings["exa"] = exa_future.result(timeout=remaining)
+        except FutureTimeoutError:
+            logger.warning(
+                f"Exa search exceeded its {self.exa_deadline}s deadline; returning unenhanced results")
+            exa_future.cancel()
+            exa_results = None
+
+        return github_results, exa_results, timings
+
+    def _vector_search(self, github_results: SearchResults) -> Optional[List[Dict[str, Any]]]:
+        """Score the query's nearest documents and the GitHub results against the local vector index."""
+        return self.vector_index.search(
+            github_results.query, include=[item.html_url for item in github_results.results])
+
+    @staticmethod
+    def _timed(func: Callable, *args, **kwargs) -> Tuple[Any, float]:
+        """Call a function and return its result with the elapsed wall time in seconds."""
+        started = time.perf_counter()
+        result = func(*args, **kwargs)
+        return result, time.perf_counter() - started
+
+    def _enhance_results(self, github_results: SearchResults, exa_results: List[Dict[str, Any]]):
+        """Enhance GitHub results with Exa data based on the search type."""
+        exa_index = ExaResultIndex(exa_results)
+
+        if github_results.search_type == "repositories":
+            self._enhance_repository_results(github_results, exa_index)
+        elif github_results.search_type == "code":
+            self._enhance_code_results(github_results, exa_index)
+        elif github_results.search_type == "issues":
+            self._enhance_issue_results(github_results, exa_index)
+        elif github_results.search_type == "users":
+            self._enhance_user_results(github_results, exa_index)
+
+    def _enhance_repository_results(self, github_results: SearchResults, exa_index: ExaResultIndex):
         """Enhance repository search results with Exa data."""
         for repo in github_results.repositories:
-            # Find matching repository in Exa results by URL or name
-            for exa_result in exa_results:
-                if (exa_result.get("url") == repo.html_url or
-                        repo.full_name.lower() in exa_result.get("url", "").lower()):
+            # Find matching repository in Exa results by URL or owner/name
+            exa_result = exa_index.match_repository(
+                repo.html_url, repo.full_name)
+            if exa_result:
+                apply_exa_result(repo, exa_result)
 
-                    repo.relevance_score = exa_result.get("score")
-                    repo.semantic_similarity = exa_result.get("similarity", 0)
-                    repo.exa_content = exa_result.get("text")
-                    break
-
-    def _enhance_code_results(self, github_results: SearchResults, exa_results: List[Dict[str, Any]]):
+    def _enhance_code_results(self, github_results: SearchResults, exa_index: ExaResultIndex):
         """Enhance code search results with Exa data."""
         for code in github_results.code_results:
             # Find matching code in Exa results by URL
-            for exa_result in exa_results:
-                if code.html_url == exa_result.get("url"):
-                    code.relevance_score = exa_result.get("score")
-                    code.semantic_similarity = exa_result.get("similarity", 0)
-                    code.exa_content = exa_result.get("text")
-                    break
-
-    def _enhance_issue_results(self, github_results: SearchResults, exa_results: List[Dict[str, Any]]):
+            exa_result = exa_index.match_url(code.html_url)
+            if exa_result:
+                apply_exa_result(code, exa_result)
+
+    def _enhance_issue_results(self, github_results: SearchResults, exa_index: ExaResultIndex):
         """Enhance issue search results with Exa data."""
         for issue in github_results.issues:
             # Find matching issue in Exa results by URL
-            for exa_result in exa_results:
-                if issue.html_url == exa_result.get("url"):
-                    issue.relevance_score = exa_result.get("score")
-                    issue.semantic_similarity = exa_result.get("similarity", 0)
-                    issue.exa_content = exa_result.get("text")
-                    break
-
-    def _enhance_user_results(self, github_results: SearchResults, exa_results: List[Dict[str, Any]]):
+            exa_result = exa_index.match_url(issue.html_url)
+            if exa_result:
+                apply_exa_result(issue, exa_result)
+
+    def _enhance_user_results(self, github_results: SearchResults, exa_index: ExaResultIndex):
         """Enhance user search results with Exa data."""
         for user in github_results.users:
             # Find matching user in Exa results by URL
-            for exa_result in exa_results:
-                if user.html_url == exa_result.get("url"):
-                    user.relevance_score = exa_result.get("score")
-                    user.semantic_similarity = exa_result.get("similarity", 0)
-                    user.exa_content = exa_result.get("text")
-                    break
+            exa_result = exa_index.match_url(user.html_url)
+            if exa_result:
+                apply_exa_result(user, exa_result)
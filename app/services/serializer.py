@@ -0,0 +1,142 @@
+"""
+JSON serialization of search results
+
+Encodes /search/api responses straight to bytes without going through
+jsonify. orjson is used when it is installed and the stdlib encoder
+otherwise. Clients can request a projection of the result fields so that
+only the fields they need are read and encoded.
+"""
+from dataclasses import fields as dataclass_fields
+from datetime import date
+from typing import Any, Dict, Iterable, List, Optional, Sequence
+import json
+
+from app.models.search_result import (GitHubCodeResult, GitHubIssueResult, GitHubRepository,
+                                      GitHubUserResult, SearchResults, result_to_dict)
+
+try:
+    import orjson
+except ImportError:
+    # Optional accelerated encoder; the stdlib encoder is used without it
+    orjson = None
+
+# Field names a projection may select, per search type
+RESULT_FIELDS: Dict[str, Sequence[str]] = {
+    search_type: tuple(f.name for f in dataclass_fields(model))
+    for search_type, model in (
+        ("repositories", GitHubRepository),
+        ("code", GitHubCodeResult),
+        ("issues", GitHubIssueResult),
+        ("users", GitHubUserResult)
+    )
+}
+
+
+class InvalidFieldsError(ValueError):
+    """Raised when a field projection names fields the search type does not have."""
+
+    def __init__(self, unknown: List[str], search_type: str):
+        self.unknown = unknown
+        super().__init__(
+            f"Unknown fields for {search_type} results: {', '.join(unknown)}")
+
+
+def _default(value: Any) -> Any:
+    """Encode the few non-JSON types that can appear in a result, like Flask's provider does."""
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (set, frozenset)):
+        return list(value)
+    raise TypeError(
+        f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"),
+                            default=_default)
+
+
+def dumps(payload: Any) -> bytes:
+    """Encode a payload as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        return orjson.dumps(payload, default=_default)
+    return _encoder.encode(payload).encode("utf-8")
+
+
+def parse_fields(fields: Any, search_type: str) -> Optional[List[str]]:
+    """
+    Validate a requested field projection.
+
+    Args:
+        fields: A list of field names or a comma-separated string; empty means all fields
+        search_type: The search type whose result fields may be selected
+
+    Returns:
+        The selected field names in request order, or None for all fields
+
+    Raises:
+        InvalidFieldsError: If a field does not exist on the search type's results
+    """
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    if not isinstance(fields, (list, tuple)):
+        raise InvalidFieldsError([str(fields)], search_type)
+
+    selected = list(dict.fromkeys(str(name).strip()
+                    for name in fields if str(name).strip()))
+    allowed = RESULT_FIELDS.get(search_type, ())
+    unknown = [name for name in selected if name not in allowed]
+    if unknown:
+        raise InvalidFieldsError(unknown, search_type)
+    return selected or None
+
+
+def project_results(results: Iterable[Any], fields: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """
+    Return the results as dictionaries, restricted to the given fields.
+
+    Only the projected fields are read, so compact results never hydrate the
+    fields a client did not ask for.
+    """
+    return [result_to_dict(result, fields) for result in results]
+
+
+def ndjson_lines(results: Iterable[Any], fields: Optional[List[str]] = None) -> bytes:
+    """Encode results as newline-delimited JSON, one result per line."""
+    return b"".join(dumps(result_to_dict(result, fields)) + b"\n" for result in results)
+
+
+def search_results_payload(results: SearchResults, page: int, per_page: int,
+                           fields: Optional[List[str]] = None) -> Dict[str, Any]:
+    """Return the /search/api response body for a results page, before encoding."""
+    payload = {
+        "query": results.query,
+        "search_type": results.search_type,
+        "total_count": results.total_count,
+        "page": page,
+        "per_page": per_page,
+        "has_next_page": results.has_next_page,
+        "timings": results.timings,
+        "results": project_results(results.results, fields)
+    }
+    if results.freshness is not None:
+        payload["freshness"] = results.freshness
+    return payload
+
+
+def serialize_search_results(results: SearchResults, page: int, per_page: int,
+                             fields: Optional[List[str]] = None) -> bytes:
+    """
+    Encode a search response for /search/api.
+
+    Args:
+        results: The search results to encode
+        page: Page number that was requested
+        per_page: Page size that was requested
+        fields: Optional projection of the result fields
+
+    Returns:
+        The response body as UTF-8 JSON bytes
+    """
+    return dumps(search_results_payload(results, page, per_page, fields))
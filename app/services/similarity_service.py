@@ -3,10 +3,17 @@ Similarity Service for Exa API
 
 This service implements similarity search functionality using the Exa API.
 """
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
 from datetime import datetime
-from typing import List, Optional, Any
+from typing import List, Optional, Any, Callable, Dict, Iterator, Tuple
+import hashlib
+import json
 import os
 import logging
+import random
+import threading
+import time
 import requests
 try:
     from exa import Exa
@@ -19,24 +26,192 @@ except ImportError:
             "Neither 'exa' nor 'exa_py' package is installed. "
             "Please install one of them using: pip install exa-py or pip install exa"
         )
+from app.services.http_client import UpstreamSessions
+from app.services.cache import CacheStats
+from app.services.metrics import NULL_METRICS, Metrics
+from app.services.result_matcher import normalize_url
+from app.services.result_filter import filter_results
 
 logger = logging.getLogger(__name__)
 
+# Exa responses worth retrying after a backoff in bulk lookups
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+
+
+class ExaRequestError(ValueError):
+    """Raised when the Exa API answers with a non-200 status."""
+
+    def __init__(self, status_code: int, message: str):
+        self.status_code = status_code
+        super().__init__(
+            f"Request failed with status code {status_code}: {message}")
+
+
+@dataclass
+class SimilarityResult:
+    """An Exa search or find-similar result, with the fields the app reads."""
+    url: str
+    id: Optional[str] = None
+    title: Optional[str] = None
+    score: Optional[float] = None
+    published_date: Optional[str] = None
+    author: Optional[str] = None
+    text: Optional[str] = None
+    highlights: Optional[List[str]] = None
+    highlight_scores: Optional[List[float]] = None
+
+    @classmethod
+    def from_api(cls, data: Dict[str, Any]) -> "SimilarityResult":
+        """Create a result from an item of an Exa API response's "results"."""
+        return cls(
+            url=data.get("url"),
+            id=data.get("id"),
+            title=data.get("title"),
+            score=data.get("score"),
+            published_date=data.get("publishedDate"),
+            author=data.get("author"),
+            text=data.get("text"),
+            highlights=data.get("highlights"),
+            highlight_scores=data.get("highlightScores")
+        )
+
+
+class PooledExa(Exa):
+    """Exa client that sends requests through a shared pooled session."""
+
+    def __init__(self, api_key: str, sessions: UpstreamSessions, metrics: Metrics = NULL_METRICS):
+        """Initialize the client with the shared upstream sessions."""
+        super().__init__(api_key, base_url=sessions.exa_url)
+        self.sessions = sessions
+        self.metrics = metrics
+
+    def request(self, endpoint: str, data):
+        """Send a request to the Exa API using the pooled session and timeouts."""
+        started = time.perf_counter()
+        res = None
+        try:
+            res = self.sessions.exa.post(
+                self.base_url + endpoint,
+                json=data,
+                headers=self.headers,
+                timeout=self.sessions.timeout
+            )
+        finally:
+            self.metrics.record_upstream(
+                "exa", endpoint.lstrip("/"), res.status_code if res is not None else None,
+                time.perf_counter() - started)
+        if res.status_code != 200:
+            raise ExaRequestError(res.status_code, res.text)
+        return res.json()
+
 
 class SimilarityService:
-    """Service for handling similarity search operations with Exa API."""
+    """
+    Service for handling similarity search operations with Exa API.
 
-    def __init__(self, exa_api_key: Optional[str] = None):
-        """Initialize the similarity service with the Exa API key."""
-        self.exa_api_key = exa_api_key or os.environ.get('EXA_API_KEY')
-        self.exa_client = None
+    A single instance is shared by all requests of the app; the Exa client is
+    stateless apart from its key, so searches can run concurrently and the key
+    can be swapped with reload_api_key() without a restart.
 
-        if not self.exa_api_key:
-            logger.warning(
-                "Exa API key not provided. Exa search capabilities will be disabled.")
-        else:
-            # Initialize the Exa client
-            self.exa_client = Exa(self.exa_api_key)
+    With a cache, upstream results are keyed only on the parameters that change
+    what Exa returns. Text content is always fetched so that display toggles
+    such as snippets can be applied by the caller on the cached results.
+    """
+
+    ENDPOINTS = ("search", "find_similar")
+
+    def __init__(self, exa_api_key: Optional[str] = None, sessions: Optional[UpstreamSessions] = None,
+                 cache: Optional[Any] = None, bulk_max_workers: int = 4, bulk_max_retries: int = 3,
+                 bulk_backoff: float = 1.0, metrics: Optional[Metrics] = None):
+        """
+        Initialize the similarity service.
+
+        Args:
+            exa_api_key: Exa API key
+            sessions: Shared pooled HTTP sessions; a private set is created if omitted
+            cache: Result cache for Exa responses (see app.services.cache)
+            bulk_max_workers: Number of concurrent Exa calls across all bulk lookups
+            bulk_max_retries: Retries per URL in bulk lookups after a rate limit or server error
+            bulk_backoff: Base delay in seconds of the exponential backoff between retries
+            metrics: Registry receiving Exa round-trip timings; nothing is recorded if omitted
+        """
+        self.sessions = sessions or UpstreamSessions()
+        self.cache = cache
+        self.metrics = metrics or NULL_METRICS
+        self.cache_stats = {endpoint: CacheStats()
+                            for endpoint in self.ENDPOINTS}
+        self.exa_api_key = None
+        self.exa_client = None
+        self.bulk_max_retries = bulk_max_retries
+        self.bulk_backoff = bulk_backoff
+        self._lock = threading.Lock()
+        # Threads are started on first use
+        self._bulk_executor = ThreadPoolExecutor(
+            max_workers=bulk_max_workers, thread_name_prefix='exahub-similar')
+        # Set when Exa rate limits a bulk call so every worker backs off together
+        self._backoff_until = 0.0
+
+        self.reload_api_key(exa_api_key or os.environ.get('EXA_API_KEY'))
+
+    def reload_api_key(self, exa_api_key: Optional[str]):
+        """Replace the Exa API key, rebuilding the client on the shared HTTP pool."""
+        with self._lock:
+            if not exa_api_key:
+                logger.warning(
+                    "Exa API key not provided. Exa search capabilities will be disabled.")
+                self.exa_client = None
+            else:
+                # Initialize the Exa client
+                self.exa_client = PooledExa(
+                    exa_api_key, self.sessions, self.metrics)
+            self.exa_api_key = exa_api_key
+
+    def _client(self) -> PooledExa:
+        """Return the current Exa client, raising if no API key is configured."""
+        client = self.exa_client
+        if client is None:
+            raise ValueError("Exa API key is required for similarity search")
+        return client
+
+    @staticmethod
+    def cache_key(endpoint: str, subject: str, params: Dict[str, Any]) -> str:
+        """Build a cache key from the parameters that affect the upstream result."""
+        normalized = {}
+        for name, value in params.items():
+            if name == "text":
+                continue
+            if name in ("include_domains", "exclude_domains", "content_types"):
+                value = sorted(item.strip().lower() for item in value)
+            normalized[name] = value
+        payload = json.dumps([subject.strip(), normalized],
+                             sort_keys=True, default=str)
+        return f"exa:{endpoint}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+    def _cached(self, endpoint: str, subject: str, params: Dict[str, Any],
+                fetch: Callable[[], List[Any]]) -> List[Any]:
+        """Return cached results for an upstream call, fetching and storing them on a miss."""
+        if self.cache is None:
+            return fetch()
+
+        key = self.cache_key(endpoint, subject, params)
+        results = self.cache.get(key)
+        if results is not None:
+            self.cache_stats[endpoint].incr("hits")
+            return results
+
+        self.cache_stats[endpoint].incr("misses")
+        results = fetch()
+        self.cache.set(key, results)
+        return results
+
+    def cache_metrics(self) -> Dict[str, Any]:
+        """Return hit/miss counters per endpoint along with the shared cache counters."""
+        metrics = {endpoint: stats.as_dict()
+                   for endpoint, stats in self.cache_stats.items()}
+        if self.cache is not None:
+            metrics["cache"] = dict(self.cache.stats.as_dict(),
+                                    size=len(self.cache))
+        return metrics
 
     def validate_api_key(self) -> bool:
         """Validate that the Exa API key is available."""
@@ -45,6 +220,73 @@ class SimilarityService:
             return False
         return True
 
+    def search_params(self, num_results: int = 5, search_type: str = "neural", use_autoprompt: bool = True,
+                      include_domains: Optional[List[str]] = None, exclude_domains: Optional[List[str]] = None,
+                      content_types: Optional[List[str]] = None, language: Optional[str] = None,
+                      start_date: Optional[str] = None, end_date: Optional[str] = None,
+                      text: bool = True) -> Dict[str, Any]:
+        """
+        Build the Exa search parameters of search_similar_content.
+
+        Only options exa-py's search_and_contents accepts are passed;
+        content_types and language have no SDK counterpart and are ignored.
+        """
+        # Build search parameters
+        params = {
+            "type": search_type,
+            "use_autoprompt": use_autoprompt,
+            "num_results": num_results,
+            "text": text or self.cache is not None
+        }
+
+        # Add optional parameters
+        if include_domains:
+            params["include_domains"] = include_domains
+
+        if exclude_domains:
+            params["exclude_domains"] = exclude_domains
+
+        if start_date:
+            params["start_published_date"] = start_date
+
+        if end_date:
+            params["end_published_date"] = end_date
+
+        return params
+
+    def find_similar_params(self, num_results: int = 5, include_domains: Optional[List[str]] = None,
+                            exclude_domains: Optional[List[str]] = None, language: Optional[str] = None,
+                            start_date: Optional[str] = None, end_date: Optional[str] = None,
+                            text_similarity: bool = True, text: bool = False) -> Dict[str, Any]:
+        """
+        Build the Exa find-similar parameters of find_similar_links.
+
+        Only options exa-py's find_similar_and_contents accepts are passed;
+        language and text_similarity have no SDK counterpart and are ignored.
+        """
+        # Build parameters
+        # A cached entry also serves requests that want the text, so it is
+        # always fetched when caching; cache_key leaves "text" out
+        params = {
+            "num_results": num_results,
+            "text": text or self.cache is not None
+        }
+
+        # Add optional parameters
+        if include_domains:
+            params["include_domains"] = include_domains
+
+        if exclude_domains:
+            params["exclude_domains"] = exclude_domains
+
+        if start_date:
+            params["start_published_date"] = start_date
+
+        if end_date:
+            params["end_published_date"] = end_date
+
+        return params
+
     def search_similar_content(
         self,
         prompt: str,
@@ -85,36 +327,14 @@ class SimilarityService:
             raise ValueError("Exa API key is required for similarity search")
 
         try:
-            # Build search parameters
-            params = {
-                "type": search_type,
-                "use_autoprompt": use_autoprompt,
-                "num_results": num_results,
-                "text": text
-            }
-
-            # Add optional parameters
-            if include_domains:
-                params["include_domains"] = include_domains
-
-            if exclude_domains:
-                params["exclude_domains"] = exclude_domains
-
-            if content_types:
-                params["content_types"] = content_types
-
-            if language:
-                params["language"] = language
-
-            if start_date:
-                params["start_date"] = start_date
-
-            if end_date:
-                params["end_date"] = end_date
+            params = self.search_params(
+                num_results, search_type, use_autoprompt, include_domains, exclude_domains,
+                content_types, language, start_date, end_date, text)
 
             # Execute search
-            results = self.exa_client.search_and_contents(prompt, **params)
-            return results.results
+            return self._cached(
+                "search", prompt, params,
+                lambda: self._client().search_and_contents(prompt, **params).results)
         except Exception as e:
             # Log the error
             logging.error(f"Error occurred during search: {e}")
@@ -150,95 +370,110 @@ class SimilarityService:
             A list of similar URL result objects
         """
         try:
-            # Build parameters
-            params = {
-                "num_results": num_results,
-                "text": text
-            }
-
-            # Add optional parameters
-            if include_domains:
-                params["include_domains"] = include_domains
-
-            if exclude_domains:
-                params["exclude_domains"] = exclude_domains
-
-            if language:
-                params["language"] = language
-
-            if start_date:
-                params["start_date"] = start_date
-
-            if end_date:
-                params["end_date"] = end_date
-
-            if text_similarity is not None:
-                params["text_similarity"] = text_similarity
+            params = self.find_similar_params(
+                num_results, include_domains, exclude_domains, language,
+                start_date, end_date, text_similarity, text)
 
             # Execute search
-            results = self.exa_client.find_similar(url=url, **params)
-            return results.results
+            return self._cached(
+                "find_similar", url, params,
+                lambda: self._client().find_similar_and_contents(url, **params).results)
         except Exception as e:
             # Log the error
             logging.error(f"Error occurred while finding similar links: {e}")
             raise e
 
+    def find_similar_links_bulk(self, urls: List[str], **kwargs) -> Iterator[Tuple[str, Optional[List[Any]], Optional[str]]]:
+        """
+        Find links similar to each of many URLs, yielding answers as they complete.
+
+        URLs that normalize to the same address are looked up once. Lookups run
+        on a bounded worker pool shared by all bulk callers and go through the
+        result cache, so repeated URLs are answered without an Exa call. A rate
+        limit or server error is retried with exponential backoff, and a rate
+        limit pauses every worker until the backoff has passed.
+
+        Args:
+            urls: The URLs to find similar content for
+            **kwargs: Options passed to find_similar_links for every URL
+
+        Yields:
+            Tuples of (url, results, error) in completion order, with either
+            results or an error message set
+        """
+        unique = {}
+        for url in urls:
+            if url and url.strip():
+                unique.setdefault(normalize_url(url), url.strip())
+
+        futures = {self._bulk_executor.submit(self._find_similar_with_backoff, url, kwargs): url
+                   for url in unique.values()}
+        try:
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    yield url, future.result(), None
+                except Exception as e:
+                    yield url, None, str(e)
+        finally:
+            # The caller stopped early, e.g. the client disconnected
+            for future in futures:
+                future.cancel()
+
+    def _find_similar_with_backoff(self, url: str, kwargs: Dict[str, Any]) -> List[Any]:
+        """Run find_similar_links, retrying rate limits and server errors with backoff."""
+        attempt = 0
+        while True:
+            wait = self._backoff_until - time.time()
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                return self.find_similar_links(url, **kwargs)
+            except (ExaRequestError, requests.RequestException) as e:
+                status_code = getattr(e, "status_code", None)
+                retryable = status_code in RETRY_STATUS_CODES or isinstance(
+                    e, requests.RequestException)
+                if not retryable or attempt >= self.bulk_max_retries:
+                    raise
+                delay = self.bulk_backoff * (2 ** attempt) * \
+                    (1 + random.random() / 2)
+                if status_code == 429:
+                    self._backoff_until = max(
+                        self._backoff_until, time.time() + delay)
+                logger.info(
+                    f"Retrying similar links for {url} in {delay:.1f}s after: {e}")
+                time.sleep(delay)
+                attempt += 1
+
     def filter_results(
         self,
         results: List[Any],
         min_date: Optional[datetime] = None,
         max_date: Optional[datetime] = None,
-        min_score: Optional[float] = None
+        min_score: Optional[float] = None,
+        max_score: Optional[float] = None,
+        include_domains: Optional[List[str]] = None,
+        exclude_domains: Optional[List[str]] = None
     ) -> List[Any]:
         """
-        Filter results based on date and score.
+        Filter results based on date, score and domain.
+
+        Publication dates are parsed once for the whole batch and may be plain
+        dates or ISO 8601 timestamps; a result without a usable date or score
+        is not filtered on it (see app.services.result_filter).
 
         Args:
             results: The results to filter
             min_date: Minimum publication date
             max_date: Maximum publication date
             min_score: Minimum relevance score
+            max_score: Maximum relevance score
+            include_domains: Domains to keep results from, subdomains included
+            exclude_domains: Domains to drop results from, subdomains included
 
         Returns:
             A list of filtered result objects
         """
-        if not results:
-            return []
-
-        filtered_results = []
-
-        for result in results:
-            # Check if result meets all filter criteria
-            include = True
-
-            # Filter by published date
-            if min_date and hasattr(result, 'published_date') and result.published_date:
-                try:
-                    # Convert string date to datetime object
-                    pub_date = datetime.strptime(
-                        result.published_date, "%Y-%m-%d")
-                    if pub_date < min_date:
-                        include = False
-                except (ValueError, TypeError):
-                    # If date parsing fails, skip date filtering for this result
-                    pass
-
-            if max_date and hasattr(result, 'published_date') and result.published_date:
-                try:
-                    # Convert string date to datetime object
-                    pub_date = datetime.strptime(
-                        result.published_date, "%Y-%m-%d")
-                    if pub_date > max_date:
-                        include = False
-                except (ValueError, TypeError):
-                    # If date parsing fails, skip date filtering for this result
-                    pass
-
-            # Filter by score
-            if min_score is not None and hasattr(result, 'score') and result.score < min_score:
-                include = False
-
-            if include:
-                filtered_results.append(result)
-
-        return filtered_results
+        return filter_results(
+            results, min_date=min_date, max_date=max_date, min_score=min_score, max_score=max_score,
+            include_domains=include_domains, exclude_domains=exclude_domains)
@@ -0,0 +1,292 @@
+"""
+Single-flight request coalescing
+
+Concurrent callers asking for the same key share one execution of the
+underlying call and its result. Within a worker this is coordinated with
+threading primitives. Across worker processes on one host an optional
+SQLite database holds a lease per key: the process holding a key's lease
+runs the call and stores its result, which callers of that key in other
+processes pick up instead of running it again. Callers of other keys never
+wait on each other.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import logging
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+logger = logging.getLogger(__name__)
+
+# Bounds of the interval at which another process's lease is polled
+POLL_INTERVAL = 0.01
+MAX_POLL_INTERVAL = 0.2
+
+
+class _Call:
+    """An in-flight call whose result is shared with followers."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _FlightStore:
+    """
+    Per-key leases and results of calls, shared by worker processes through SQLite.
+
+    A lease expires after lease_ttl seconds so that a crashed leader does not
+    block its key; stored results are kept for as long.
+    """
+
+    def __init__(self, path: str, lease_ttl: float):
+        """
+        Initialize the store.
+
+        Args:
+            path: Path of the SQLite database file
+            lease_ttl: Seconds a lease is held and a result is kept
+        """
+        self.path = path
+        self.lease_ttl = lease_ttl
+        self.owner = uuid.uuid4().hex
+        self._local = threading.local()
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flight_leases ("
+                " key TEXT PRIMARY KEY,"
+                " owner TEXT NOT NULL,"
+                " expires_at REAL NOT NULL)"
+            )
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS flight_results ("
+                " key TEXT PRIMARY KEY,"
+                " value BLOB NOT NULL,"
+                " finished_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def result(self, key: str, since: float) -> Tuple[bool, Any]:
+        """Return (found, result) for a call of a key that finished at or after since."""
+        row = self._connection().execute(
+            "SELECT value FROM flight_results WHERE key = ? AND finished_at >= ?", (key, since)
+        ).fetchone()
+        if row is None:
+            return False, None
+        return True, pickle.loads(row[0])
+
+    def lease(self, key: str) -> bool:
+        """Take the lease of a key unless another live caller holds it."""
+        now = time.time()
+        with self._connection() as conn:
+            cursor = conn.execute(
+                "INSERT INTO flight_leases (key, owner, expires_at) VALUES (?, ?, ?)"
+                " ON CONFLICT (key) DO UPDATE SET owner = excluded.owner,"
+                " expires_at = excluded.expires_at WHERE flight_leases.expires_at <= ?",
+                (key, self.owner, now + self.lease_ttl, now)
+            )
+            return cursor.rowcount == 1
+
+    def release(self, key: str, blob: Optional[bytes] = None):
+        """Give up the lease of a key, storing the pickled result of its call if there is one."""
+        now = time.time()
+        with self._connection() as conn:
+            if blob is not None:
+                conn.execute(
+                    "INSERT OR REPLACE INTO flight_results (key, value, finished_at) VALUES (?, ?, ?)",
+                    (key, sqlite3.Binary(blob), now)
+                )
+            conn.execute(
+                "DELETE FROM flight_leases WHERE key = ? AND owner = ?", (key, self.owner))
+            conn.execute(
+                "DELETE FROM flight_results WHERE finished_at < ?", (now - self.lease_ttl,))
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share the same key."""
+
+    def __init__(self, lock_dir: Optional[str] = None, lock_timeout: float = 30.0):
+        """
+        Initialize the coalescer.
+
+        Args:
+            lock_dir: Directory of the SQLite database used to coordinate worker
+                processes; cross-process coalescing is disabled if omitted
+            lock_timeout: Seconds to wait for another process's call of the same
+                key before running the call anyway
+        """
+        self.lock_dir = lock_dir
+        self.lock_timeout = lock_timeout
+        self.executed = 0
+        self.shared = 0
+        self._calls: Dict[str, _Call] = {}
+        self._lock = threading.Lock()
+        self._store: Optional[_FlightStore] = None
+
+        if lock_dir:
+            if not os.path.exists(lock_dir):
+                os.makedirs(lock_dir)
+            self._store = _FlightStore(
+                os.path.join(lock_dir, "single_flight.sqlite3"), lease_ttl=lock_timeout)
+
+    def do(self, key: str, func: Callable, *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Run func(*args, **kwargs) once for all concurrent callers with the same key.
+
+        Args:
+            key: Normalized key identifying the call
+            func: The call to execute
+
+        Returns:
+            A tuple of (result, shared) where shared is True if the result came
+            from another caller's execution, in this process or another one.
+            Exceptions are re-raised to every caller in this process.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result, True
+
+        shared = False
+        try:
+            if self._store is None:
+                call.result = self._execute(func, args, kwargs)
+            else:
+                call.result, shared = self._do_shared(key, func, args, kwargs)
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+        return call.result, shared
+
+    def _execute(self, func: Callable, args: tuple, kwargs: Dict[str, Any]) -> Any:
+        """Run the call, counting the execution."""
+        with self._lock:
+            self.executed += 1
+        return func(*args, **kwargs)
+
+    def _do_shared(self, key: str, func: Callable, args: tuple,
+                   kwargs: Dict[str, Any]) -> Tuple[Any, bool]:
+        """Run the call under the key's lease, or take the result of another process's call."""
+        started = time.time()
+        deadline = time.monotonic() + self.lock_timeout
+        interval = POLL_INTERVAL
+        try:
+            while True:
+                found, result = self._store.result(key, started)
+                if found:
+                    with self._lock:
+                        self.shared += 1
+                    return result, True
+                if self._store.lease(key):
+                    break
+                if time.monotonic() >= deadline:
+                    logger.warning(f"Timed out waiting for the single-flight lease of {key}")
+                    return self._execute(func, args, kwargs), False
+                time.sleep(interval)
+                interval = min(interval * 2, MAX_POLL_INTERVAL)
+        except (sqlite3.Error, pickle.PickleError) as e:
+            logger.error(f"Error coordinating single-flight call across processes: {e}")
+            return self._execute(func, args, kwargs), False
+
+        blob = None
+        try:
+            result = self._execute(func, args, kwargs)
+            try:
+                blob = pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+            except (pickle.PickleError, TypeError, AttributeError) as e:
+                logger.error(f"Single-flight result of {key} cannot be shared: {e}")
+            return result, False
+        finally:
+            try:
+                self._store.release(key, blob)
+            except sqlite3.Error as e:
+                logger.error(f"Error releasing the single-flight lease of {key}: {e}")
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many calls were executed and how many callers shared a result."""
+        return {
+            "executed": self.executed,
+            "shared": self.shared
+        }
+
+
+class AsyncSingleFlight:
+    """
+    Coalesce concurrent coroutine calls that share the same key.
+
+    Only coroutines on one event loop are coordinated; the cross-process lease
+    of SingleFlight is not used since waiting for it would block the loop.
+    """
+
+    def __init__(self):
+        self.executed = 0
+        self.shared = 0
+        self._calls: Dict[str, asyncio.Future] = {}
+
+    async def do(self, key: str, func: Callable[..., Awaitable], *args, **kwargs) -> Tuple[Any, bool]:
+        """
+        Await func(*args, **kwargs) once for all concurrent callers with the same key.
+
+        Returns:
+            A tuple of (result, shared) like SingleFlight.do()
+        """
+        call = self._calls.get(key)
+        if call is not None:
+            self.shared += 1
+            # A follower that is cancelled must not cancel the leader's call
+            return await asyncio.shield(call), True
+
+        call = asyncio.get_running_loop().create_future()
+        self._calls[key] = call
+        self.executed += 1
+        try:
+            result = await func(*args, **kwargs)
+        except asyncio.CancelledError:
+            call.cancel()
+            raise
+        except BaseException as e:
+            call.set_exception(e)
+            # Mark the exception as retrieved in case there are no followers
+            call.exception()
+            raise
+        else:
+            call.set_result(result)
+            return result, False
+        finally:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        """Return how many calls were executed and how many callers shared a result."""
+        return {
+            "executed": self.executed,
+            "shared": self.shared
+        }
@@ -0,0 +1,442 @@
+"""
+Local vector index for semantic scoring without Exa
+
+The text collected from searches, GitHub descriptions and topics along
+with the content Exa returned, is kept in a SQLite corpus. A build step
+turns the corpus into L2-normalized vectors and saves them as an .npz file
+that every worker loads and reloads when it changes.
+
+Vectors are IDF-weighted, sign-hashed bags of words, so no embedding model
+is needed. Queries are scored against all vectors in one NumPy product up
+to a brute-force limit. Past that limit the vectors are clustered with
+k-means into an inverted-file (IVF) index, and only the lists nearest the
+query are scored.
+
+Search results have the shape of Exa results, so SearchService enhances
+GitHub results from them exactly as it does from a live Exa search.
+
+NumPy is optional; without it the index is disabled.
+"""
+from collections import Counter
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+import logging
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+
+try:
+    import numpy as np
+except ImportError:  # pragma: no cover - optional dependency
+    np = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_DIMENSIONS = 256
+
+# Corpora larger than this are searched through an IVF index
+DEFAULT_BRUTE_FORCE_LIMIT = 20000
+
+# Seconds between checks for a rebuilt index file
+RELOAD_INTERVAL = 30
+
+# Longest text taken from a single document
+MAX_DOCUMENT_CHARS = 4000
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Split text into lowercase alphanumeric tokens."""
+    return TOKEN_PATTERN.findall(text.lower()) if text else []
+
+
+def document_text(search_type: str, item: Any) -> str:
+    """Return the text of a GitHub result that its vector is built from."""
+    if search_type == "repositories":
+        parts = [item.full_name, item.description, item.language, " ".join(item.topics or ())]
+    elif search_type == "code":
+        parts = [(item.repository or {}).get("full_name"), item.path]
+    elif search_type == "issues":
+        parts = [item.title, item.body]
+    else:
+        parts = [item.login, item.name, item.bio]
+    parts.append(item.exa_content)
+    return " ".join(part for part in parts if part)[:MAX_DOCUMENT_CHARS]
+
+
+class VectorCorpus:
+    """
+    SQLite store of the documents collected from searches.
+
+    The database file can be shared by several worker processes on one host.
+    """
+
+    def __init__(self, path: str):
+        """
+        Initialize the corpus.
+
+        Args:
+            path: Path of the SQLite database file
+        """
+        self.path = path
+        self._local = threading.local()
+
+        directory = os.path.dirname(path)
+        if directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS vector_documents ("
+                " key TEXT PRIMARY KEY,"
+                " text TEXT NOT NULL,"
+                " exa_content TEXT,"
+                " updated_at REAL NOT NULL)"
+            )
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the calling thread's connection, opening it on first use."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, documents: Iterable[Tuple[str, str, Optional[str]]]):
+        """
+        Insert or update documents, keeping earlier Exa content when none is given.
+
+        Args:
+            documents: (key, text, exa_content) tuples; the key is the result URL
+        """
+        now = time.time()
+        rows = [(key, text, exa_content, now) for key, text, exa_content in documents if key and text]
+        if not rows:
+            return
+        try:
+            with self._connection() as conn:
+                conn.executemany(
+                    "INSERT INTO vector_documents (key, text, exa_content, updated_at) VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT (key) DO UPDATE SET"
+                    " text = excluded.text,"
+                    " exa_content = COALESCE(excluded.exa_content, exa_content),"
+                    " updated_at = excluded.updated_at"
+                    " WHERE text != excluded.text OR excluded.exa_content IS NOT NULL",
+                    rows
+                )
+        except sqlite3.Error as e:
+            logger.error(f"Error writing to the vector corpus: {e}")
+
+    def add_results(self, search_type: str, items: Sequence[Any],
+                    exa_results: Optional[Sequence[Dict[str, Any]]] = None):
+        """Add a page of GitHub results and the Exa results they were enhanced with."""
+        documents = [(item.html_url, document_text(search_type, item), item.exa_content)
+                     for item in items]
+        for exa_result in exa_results or ():
+            text = " ".join(part for part in (exa_result.get("title"), exa_result.get("text")) if part)
+            documents.append((exa_result.get("url"), text[:MAX_DOCUMENT_CHARS], exa_result.get("text")))
+        self.add(documents)
+
+    def documents(self) -> Iterator[Tuple[str, str]]:
+        """Yield the (key, text) of every document."""
+        yield from self._connection().execute("SELECT key, text FROM vector_documents ORDER BY key")
+
+    def exa_content(self, keys: Sequence[str]) -> Dict[str, str]:
+        """Return the stored Exa content of the given documents that have some."""
+        if not keys:
+            return {}
+        placeholders = ",".join("?" * len(keys))
+        return dict(self._connection().execute(
+            f"SELECT key, exa_content FROM vector_documents"
+            f" WHERE key IN ({placeholders}) AND exa_content IS NOT NULL", list(keys)))
+
+    def last_updated(self) -> float:
+        """Return when a document was last added or changed, or 0 for an empty corpus."""
+        return self._connection().execute(
+            "SELECT COALESCE(MAX(updated_at), 0) FROM vector_documents").fetchone()[0]
+
+    def __len__(self) -> int:
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM vector_documents").fetchone()[0]
+
+
+def _hash_tokens(tokens: Iterable[str], dimensions: int) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Return the bucket and sign of each token; dimensions must be a power of two."""
+    hashes = np.fromiter((zlib.crc32(token.encode()) for token in tokens), dtype=np.uint32)
+    buckets = (hashes & (dimensions - 1)).astype(np.intp)
+    signs = np.where(hashes & 0x80000000, -1.0, 1.0).astype(np.float32)
+    return buckets, signs
+
+
+def embed(texts: Sequence[str], idf: Dict[str, float], default_idf: float,
+          dimensions: int) -> "np.ndarray":
+    """
+    Return L2-normalized vectors of texts, one row per text.
+
+    Each token adds (1 + log tf) * idf to its hashed bucket, with the bucket's sign.
+    """
+    rows, tokens, weights = [], [], []
+    for row, text in enumerate(texts):
+        for token, count in Counter(tokenize(text)).items():
+            rows.append(row)
+            tokens.append(token)
+            weights.append((1.0 + math.log(count)) * idf.get(token, default_idf))
+
+    vectors = np.zeros((len(texts), dimensions), dtype=np.float32)
+    if tokens:
+        buckets, signs = _hash_tokens(tokens, dimensions)
+        np.add.at(vectors, (np.asarray(rows, dtype=np.intp), buckets),
+                  signs * np.asarray(weights, dtype=np.float32))
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    np.divide(vectors, norms, out=vectors, where=norms > 0)
+    return vectors
+
+
+def _kmeans(vectors: "np.ndarray", clusters: int, iterations: int = 10, seed: int = 0) -> "np.ndarray":
+    """Return unit-length centroids of spherical k-means run on a sample of the vectors."""
+    rng = np.random.default_rng(seed)
+    sample = vectors[rng.choice(len(vectors), size=min(len(vectors), clusters * 64), replace=False)]
+    centroids = sample[rng.choice(len(sample), size=clusters, replace=False)].copy()
+    for _ in range(iterations):
+        assignment = np.argmax(sample @ centroids.T, axis=1)
+        sums = np.zeros_like(centroids)
+        np.add.at(sums, assignment, sample)
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Clusters that lost every member keep their previous centroid
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return centroids.astype(np.float32)
+
+
+def _assign(vectors: "np.ndarray", centroids: "np.ndarray", chunk: int = 8192) -> "np.ndarray":
+    """Return the nearest centroid of every vector."""
+    return np.concatenate([np.argmax(vectors[start:start + chunk] @ centroids.T, axis=1)
+                           for start in range(0, len(vectors), chunk)]) if len(vectors) else np.zeros(0, np.intp)
+
+
+def build_vector_index(corpus: VectorCorpus, path: str, dimensions: int = DEFAULT_DIMENSIONS,
+                       brute_force_limit: int = DEFAULT_BRUTE_FORCE_LIMIT, seed: int = 0) -> Dict[str, Any]:
+    """
+    Build the vector index of a corpus and save it to an .npz file.
+
+    The file is replaced atomically, so running workers pick it up on their
+    next reload check.
+
+    Args:
+        corpus: The documents to index
+        path: Where to save the index
+        dimensions: Length of the vectors; must be a power of two
+        brute_force_limit: Largest corpus searched without an IVF index
+        seed: Seed of the k-means sampling
+
+    Returns:
+        Statistics of the built index
+    """
+    if np is None:
+        raise RuntimeError("The vector index requires NumPy")
+    if dimensions & (dimensions - 1):
+        raise ValueError(f"Vector dimensions must be a power of two, not {dimensions}")
+
+    started = time.perf_counter()
+    built_at = time.time()
+    keys, texts = [], []
+    for key, text in corpus.documents():
+        keys.append(key)
+        texts.append(text)
+
+    # Inverse document frequencies of the corpus vocabulary
+    document_frequency = Counter(token for text in texts for token in set(tokenize(text)))
+    vocabulary = sorted(document_frequency)
+    idf = np.array([math.log((1 + len(texts)) / (1 + document_frequency[token])) + 1
+                    for token in vocabulary], dtype=np.float32)
+    vectors = embed(texts, dict(zip(vocabulary, idf.tolist())), float(idf.max(initial=1.0)), dimensions)
+
+    clusters = 0
+    centroids = np.zeros((0, dimensions), dtype=np.float32)
+    offsets = np.zeros(1, dtype=np.int64)
+    if len(vectors) > brute_force_limit:
+        # Sort the vectors by cluster so that each inverted list is a slice
+        clusters = min(len(vectors), int(4 * math.sqrt(len(vectors))))
+        centroids = _kmeans(vectors, clusters, seed=seed)
+        assignment = _assign(vectors, centroids)
+        order = np.argsort(assignment, kind="stable")
+        vectors = vectors[order]
+        keys = [keys[i] for i in order]
+        offsets = np.searchsorted(assignment[order], np.arange(clusters + 1)).astype(np.int64)
+
+    temporary = f"{path}.{os.getpid()}.tmp.npz"
+    directory = os.path.dirname(path)
+    if directory and not os.path.exists(directory):
+        os.makedirs(directory)
+    np.savez(
+        temporary,
+        vectors=vectors,
+        keys=np.frombuffer("\n".join(keys).encode(), dtype=np.uint8),
+        vocabulary=np.frombuffer("\n".join(vocabulary).encode(), dtype=np.uint8),
+        idf=idf,
+        centroids=centroids,
+        offsets=offsets,
+        built_at=np.float64(built_at)
+    )
+    os.replace(temporary, path)
+
+    stats = {
+        "documents": len(keys),
+        "vocabulary": len(vocabulary),
+        "dimensions": dimensions,
+        "clusters": clusters,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+    logger.info(f"Built vector index {path}: {stats}")
+    return stats
+
+
+class _IndexData:
+    """The arrays of one build of the index, never modified once loaded."""
+
+    def __init__(self, arrays: Any, mtime: float):
+        self.mtime = mtime
+        self.vectors = arrays["vectors"]
+        self.dimensions = self.vectors.shape[1]
+        keys = arrays["keys"].tobytes().decode()
+        self.keys = keys.split("\n") if keys else []
+        self.rows = {key: row for row, key in enumerate(self.keys)}
+        vocabulary = arrays["vocabulary"].tobytes().decode()
+        idf = arrays["idf"].tolist()
+        self.idf = dict(zip(vocabulary.split("\n"), idf)) if vocabulary else {}
+        self.default_idf = max(idf, default=1.0)
+        self.centroids = arrays["centroids"]
+        self.offsets = arrays["offsets"]
+        self.built_at = float(arrays["built_at"])
+
+
+class VectorIndex:
+    """Search and corpus collection over the vector index file built by build_vector_index()."""
+
+    def __init__(self, path: str, corpus: VectorCorpus, top_k: int = 50, nprobe: int = 8,
+                 reload_interval: float = RELOAD_INTERVAL):
+        """
+        Initialize the index, loading the index file if it exists.
+
+        Args:
+            path: Path of the .npz index file
+            corpus: The corpus that searches add to and that the index is built from
+            top_k: Nearest documents returned by a search, besides the included keys
+            nprobe: Inverted lists scored per search once the index is clustered
+            reload_interval: Seconds between checks for a rebuilt index file
+        """
+        self.path = path
+        self.corpus = corpus
+        self.top_k = top_k
+        self.nprobe = nprobe
+        self.reload_interval = reload_interval
+        self._data: Optional[_IndexData] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self._load()
+
+    @classmethod
+    def from_config(cls, config: Any, instance_path: str) -> Optional["VectorIndex"]:
+        """Create the index from the 'VECTOR_INDEX_*' config keys, or None without NumPy."""
+        if np is None:
+            logger.warning("NumPy is not installed; the local vector index is disabled")
+            return None
+        return cls(
+            config.get('VECTOR_INDEX_PATH') or os.path.join(instance_path, 'vector_index.npz'),
+            VectorCorpus(config.get('VECTOR_CORPUS_PATH') or os.path.join(instance_path, 'vector_corpus.sqlite3')),
+            top_k=int(config.get('VECTOR_INDEX_TOP_K', 50)),
+            nprobe=int(config.get('VECTOR_INDEX_NPROBE', 8))
+        )
+
+    def _load(self):
+        """Load the index file if it changed since it was last loaded."""
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if self._data is not None and self._data.mtime == mtime:
+            return
+        try:
+            with np.load(self.path) as arrays:
+                self._data = _IndexData(arrays, mtime)
+            logger.info(f"Loaded vector index {self.path} with {len(self._data.keys)} documents")
+        except (OSError, ValueError, KeyError) as e:
+            logger.error(f"Error loading vector index {self.path}: {e}")
+
+    def current(self) -> Optional[_IndexData]:
+        """Return the loaded index, reloading it first if the file was rebuilt."""
+        now = time.monotonic()
+        if now - self._checked_at >= self.reload_interval:
+            with self._lock:
+                if now - self._checked_at >= self.reload_interval:
+                    self._checked_at = now
+                    self._load()
+        return self._data
+
+    def __len__(self) -> int:
+        data = self.current()
+        return len(data.keys) if data is not None else 0
+
+    def _nearest(self, data: _IndexData, query: "np.ndarray", k: int) -> Tuple["np.ndarray", "np.ndarray"]:
+        """Return the rows and scores of the k documents nearest a query vector, best first."""
+        if len(data.centroids):
+            # Score only the inverted lists whose centroids are nearest the query
+            lists = np.argsort(data.centroids @ query)[::-1][:self.nprobe]
+            rows = np.concatenate([np.arange(data.offsets[i], data.offsets[i + 1]) for i in lists])
+            scores = data.vectors[rows] @ query
+        else:
+            rows = None
+            scores = data.vectors @ query
+
+        k = min(k, len(scores))
+        if k <= 0:
+            return np.zeros(0, np.intp), np.zeros(0, np.float32)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return (top if rows is None else rows[top]), scores[top]
+
+    def search(self, query: str, k: Optional[int] = None,
+               include: Sequence[str] = ()) -> Optional[List[Dict[str, Any]]]:
+        """
+        Return the documents nearest a query as Exa-style results.
+
+        Args:
+            query: The search query
+            k: Number of nearest documents; defaults to top_k
+            include: Keys of documents to score as well, such as the URLs of
+                the GitHub results being enhanced
+
+        Returns:
+            Results with url, score, similarity and text (the stored Exa
+            content), best first, or None if no index has been built
+        """
+        data = self.current()
+        if data is None or not data.keys:
+            return None
+
+        vector = embed([query], data.idf, data.default_idf, data.dimensions)[0]
+        if not vector.any():
+            return []
+
+        rows, scores = self._nearest(data, vector, k or self.top_k)
+        scored = dict(zip(rows.tolist(), scores.tolist()))
+        extra = [data.rows[key] for key in include if key in data.rows and data.rows[key] not in scored]
+        if extra:
+            scored.update(zip(extra, (data.vectors[extra] @ vector).tolist()))
+
+        ranked = sorted(scored.items(), key=lambda entry: entry[1], reverse=True)
+        keys = [data.keys[row] for row, _ in ranked]
+        try:
+            content = self.corpus.exa_content(keys)
+        except sqlite3.Error as e:
+            logger.error(f"Error reading from the vector corpus: {e}")
+            content = {}
+        return [
+            {"url": key, "score": max(score, 0.0), "similarity": max(score, 0.0), "text": content.get(key)}
+            for key, (_, score) in zip(keys, ranked)
+        ]
@@ -0,0 +1,10 @@
+from dotenv import load_dotenv
+from app import create_app
+from app.asgi import create_asgi_app
+
+# Load environment variables from .env file if it exists
+load_dotenv()
+
+# Create the ASGI application; serve it with an ASGI server, e.g.
+#   uvicorn asgi:app --host 0.0.0.0 --port 5000
+app = create_asgi_app(create_app())
@@ -0,0 +1,67 @@
+"""
+Benchmark: GitHub calls and latency of browsing sessions with candidate pools
+
+Simulates browsing sessions, each flipping through the first pages of its
+own search at 10 results per page, against the local GitHub stub. Each
+session runs once fetching every page from GitHub and once serving pages
+from a candidate pool, and the benchmark counts the GitHub calls each way.
+
+Usage:
+    python -m benchmarks.bench_candidate_pool --sessions 20 --pages 10 --latency 0.05
+"""
+import argparse
+import statistics
+import time
+
+from app.models.search_params import GitHubSearchParams
+from app.services.cache import MemoryCache
+from app.services.candidate_pool import CandidatePools
+from app.services.http_client import UpstreamSessions
+from app.services.search_service import SearchService
+from benchmarks.stub_server import StubServer
+
+PER_PAGE = 10
+
+
+def browse(service: SearchService, server: StubServer, sessions: int, pages: int, variant: str):
+    """Run the sessions, returning the GitHub calls made and per-page latencies in milliseconds."""
+    before = server.counts["github"]
+    latencies = []
+    for session in range(sessions):
+        search_params = GitHubSearchParams(query=f"{variant} session {session}")
+        for page in range(1, pages + 1):
+            started = time.perf_counter()
+            results = service.github_search(search_params, page, PER_PAGE)
+            latencies.append((time.perf_counter() - started) * 1000)
+            assert results is not None and len(results.results) == PER_PAGE
+    return server.counts["github"] - before, latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=10)
+    parser.add_argument("--pool-size", type=int, default=300)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="Stub server latency in seconds")
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency).start()
+    try:
+        variants = {
+            "per page": None,
+            "pooled": CandidatePools(MemoryCache(max_entries=args.sessions), size=args.pool_size),
+        }
+        print(f"{'variant':<9} {'github calls':>12} {'mean ms':>8} {'p50 ms':>7} {'max ms':>7}")
+        for name, pools in variants.items():
+            service = SearchService(github_token="stub-token", sessions=UpstreamSessions(github_url=server.url),
+                                    compact_results=True, candidate_pools=pools)
+            calls, latencies = browse(service, server, args.sessions, args.pages, name)
+            print(f"{name:<9} {calls:>12} {statistics.mean(latencies):>8.2f} "
+                  f"{statistics.median(latencies):>7.2f} {max(latencies):>7.2f}")
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
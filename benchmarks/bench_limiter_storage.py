@@ -0,0 +1,72 @@
+"""
+Benchmark: rate-limit check overhead of the SQLite storage versus memory://
+
+Times one limiter hit with the fixed-window and moving-window strategies
+on the in-process memory storage and on the SQLite storage shared by
+worker processes, from one thread and from several threads at once.
+
+Usage:
+    python -m benchmarks.bench_limiter_storage --hits 5000 --threads 1 8
+"""
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import os
+import tempfile
+import time
+
+from limits import parse
+from limits.storage import storage_from_string
+from limits.strategies import FixedWindowRateLimiter, MovingWindowRateLimiter
+
+import app.services.limiter_storage  # noqa: F401  registers sqlite://
+
+STRATEGIES = {
+    "fixed-window": FixedWindowRateLimiter,
+    "moving-window": MovingWindowRateLimiter,
+}
+
+# The app's default limits plus a typical route limit, as checked on every request
+LIMITS = [parse("200 per day"), parse("50 per hour"), parse("30 per minute")]
+
+
+def time_hits(limiter, hits: int, threads: int) -> float:
+    """Return the mean wall time in microseconds of one request's limit checks."""
+    def client(worker: int):
+        # Every client is a different remote address, as in production
+        for i in range(hits // threads):
+            for item in LIMITS:
+                limiter.hit(item, f"127.0.0.{worker}", f"key{i % 100}")
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        list(pool.map(client, range(threads)))
+    return (time.perf_counter() - started) / hits * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--hits", type=int, default=5000)
+    parser.add_argument("--threads", type=int, nargs="+", default=[1, 8])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        storages = {
+            "memory://": "memory://",
+            "sqlite://": f"sqlite:///{os.path.join(directory, 'ratelimit.sqlite3')}",
+        }
+        print(f"{'strategy':<14} {'threads':>7} " +
+              " ".join(f"{name + ' µs':>13}" for name in storages) + f" {'ratio':>7}")
+        for strategy, limiter_class in STRATEGIES.items():
+            for threads in args.threads:
+                timings = []
+                for uri in storages.values():
+                    storage = storage_from_string(uri)
+                    storage.reset()
+                    timings.append(time_hits(limiter_class(storage), args.hits, threads))
+                print(f"{strategy:<14} {threads:>7} " +
+                      " ".join(f"{timing:>13.1f}" for timing in timings) +
+                      f" {timings[1] / timings[0]:>6.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""
+Benchmark: local index writes and refinement answers
+
+Times indexing one page of a GitHub repository search and answering a
+refinement (a language, a star range, an extra topic and an excluded topic)
+of a fully indexed search of each size, from the SQLite local index.
+
+Usage:
+    python -m benchmarks.bench_local_index --sizes 100 1000
+"""
+import argparse
+import os
+import tempfile
+import timeit
+
+from app.models.search_params import GitHubSearchParams
+from app.services.local_index import LocalIndex
+from benchmarks.stub_server import github_items
+
+PER_PAGE = 100
+
+REFINEMENTS = {
+    "language": {"language": "Python"},
+    "stars": {"stars": (100, 2000)},
+    "topic": {"topics": ["ai"]},
+    "exclude topic": {"exclude_topics": ["ai"]},
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'indexed':>8} {'record page ms':>15} " +
+          " ".join(f"{name + ' ms':>16}" for name in REFINEMENTS))
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            index = LocalIndex(os.path.join(directory, "index.sqlite3"))
+            base = GitHubSearchParams(query=f"benchmark {size}")
+            pages = [{"total_count": size, "items": github_items("repositories", page, PER_PAGE)}
+                     for page in range(1, size // PER_PAGE + 1)]
+
+            record = min(timeit.repeat(
+                lambda: [index.record(base, page, PER_PAGE, data) for page, data in enumerate(pages, 1)],
+                number=1, repeat=args.repeat)) / len(pages) * 1000
+
+            timings = []
+            for refinement in REFINEMENTS.values():
+                params = GitHubSearchParams(query=base.query, **refinement)
+                assert index.answer(params, 1, 10) is not None
+                timings.append(min(timeit.repeat(lambda: index.answer(params, 1, 10),
+                                                 number=50, repeat=args.repeat)) / 50 * 1000)
+        print(f"{size:>8} {record:>15.2f} " + " ".join(f"{timing:>16.2f}" for timing in timings))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Micro-benchmark for Exa to GitHub result matching
+
+Compares the previous nested-loop repository matching against the
+hash-indexed ExaResultIndex for growing result set sizes.
+
+Usage:
+    python -m benchmarks.bench_matching
+"""
+import argparse
+import timeit
+
+from app.models.search_result import GitHubRepository
+from app.services.result_matcher import ExaResultIndex, apply_exa_result
+
+
+def make_results(size: int):
+    """Create matching GitHub repositories and Exa results; half the Exa URLs point at sub-paths."""
+    repos = [
+        GitHubRepository(
+            id=i,
+            name=f"project-{i}",
+            full_name=f"Owner{i % 37}/project-{i}",
+            html_url=f"https://github.com/Owner{i % 37}/project-{i}"
+        )
+        for i in range(size)
+    ]
+    exa_results = []
+    for i in reversed(range(size)):
+        url = f"https://github.com/owner{i % 37}/project-{i}"
+        if i % 2:
+            url += "/tree/main/docs"
+        exa_results.append({"url": url, "score": 0.5, "text": "..."})
+    return repos, exa_results
+
+
+def nested_loop(repos, exa_results):
+    """The O(N x M) matching used before the index was introduced."""
+    for repo in repos:
+        for exa_result in exa_results:
+            if (exa_result.get("url") == repo.html_url or
+                    repo.full_name.lower() in exa_result.get("url", "").lower()):
+                apply_exa_result(repo, exa_result)
+                break
+
+
+def indexed(repos, exa_results):
+    """Build the index once and resolve each repository in O(1)."""
+    exa_index = ExaResultIndex(exa_results)
+    for repo in repos:
+        exa_result = exa_index.match_repository(repo.html_url, repo.full_name)
+        if exa_result:
+            apply_exa_result(repo, exa_result)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[10, 100, 500, 1000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'size':>6} {'nested (ms)':>12} {'indexed (ms)':>13} {'speedup':>8}")
+    for size in args.sizes:
+        repos, exa_results = make_results(size)
+        number = max(1, 2000 // size)
+        nested_ms = min(timeit.repeat(lambda: nested_loop(repos, exa_results),
+                                      number=number, repeat=args.repeat)) / number * 1000
+        indexed_ms = min(timeit.repeat(lambda: indexed(repos, exa_results),
+                                       number=number, repeat=args.repeat)) / number * 1000
+        print(f"{size:>6} {nested_ms:>12.3f} {indexed_ms:>13.3f} {nested_ms / indexed_ms:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
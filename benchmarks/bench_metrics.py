@@ -0,0 +1,52 @@
+"""
+Benchmark: overhead of the metrics hooks
+
+Measures the per-call cost of the hooks that SearchService, SimilarityService
+and the routes call on every request, with metrics disabled (NULL_METRICS)
+and enabled, and the cost of rendering /metrics.
+
+Usage:
+    python -m benchmarks.bench_metrics --number 200000
+"""
+import argparse
+import timeit
+
+from app.services.metrics import NULL_METRICS, Metrics
+
+
+def hooks(metrics):
+    """Return the hooks a single API search calls, as (name, callable) pairs."""
+    def timer():
+        with metrics.timer("exahub_stage_duration_seconds", stage="parse"):
+            pass
+
+    return [
+        ("timer", timer),
+        ("observe", lambda: metrics.observe(
+            "exahub_stage_duration_seconds", 0.01, stage="github")),
+        ("incr", lambda: metrics.incr(
+            "exahub_http_requests_total", endpoint="search.api_search", method="POST", status=200)),
+        ("record_upstream", lambda: metrics.record_upstream(
+            "github", "search/repositories", 200, 0.2)),
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--number", type=int, default=200000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'hook':<16} {'disabled ns':>12} {'enabled ns':>12}")
+    enabled = Metrics()
+    for (name, disabled_hook), (_, enabled_hook) in zip(hooks(NULL_METRICS), hooks(enabled)):
+        timings = [min(timeit.repeat(hook, number=args.number, repeat=args.repeat)) / args.number * 1e9
+                   for hook in (disabled_hook, enabled_hook)]
+        print(f"{name:<16} {timings[0]:>12.0f} {timings[1]:>12.0f}")
+
+    render = min(timeit.repeat(enabled.render, number=100, repeat=args.repeat)) / 100 * 1000
+    print(f"render /metrics: {render:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Benchmark: multi-signal re-ranking by candidate count
+
+Times ranking compact repository results with the NumPy ranker against the
+same weighted sum computed one result at a time in Python, and checks that
+both give the same order.
+
+Usage:
+    python -m benchmarks.bench_ranking --sizes 100 1000 10000
+"""
+import argparse
+import math
+import timeit
+from datetime import datetime, timezone
+
+from app.models.search_result import SearchResults
+from app.services.ranking import DEFAULT_WEIGHTS, Ranker
+from benchmarks.stub_server import github_items
+
+NOW = datetime(2024, 12, 1, tzinfo=timezone.utc)
+
+
+def make_items(count: int):
+    """Parse stub repositories and attach Exa scores to every other one."""
+    results = SearchResults.from_github_api(
+        {"total_count": count, "items": github_items("repositories", 1, count)},
+        "repositories", "benchmark", page=1, per_page=count, compact=True)
+    for i, item in enumerate(results.results[::2]):
+        item.relevance_score = (i * 7919 % 1000) / 1000
+        item.semantic_similarity = (i * 104729 % 1000) / 1000
+    return results.results
+
+
+def rank_loop(items, weights=DEFAULT_WEIGHTS, half_life=180.0):
+    """Rank with a per-result Python loop."""
+    top_stars = max((math.log1p(item.stargazers_count) for item in items), default=0) or 1
+    top_forks = max((math.log1p(item.forks_count) for item in items), default=0) or 1
+    scored = []
+    for position, item in enumerate(items):
+        pushed = datetime.strptime(item.pushed_at, "%Y-%m-%dT%H:%M:%SZ").replace(tzinfo=timezone.utc)
+        score = (weights["github"] * (1 - position / max(len(items) - 1, 1))
+                 + weights["stars"] * math.log1p(item.stargazers_count) / top_stars
+                 + weights["forks"] * math.log1p(item.forks_count) / top_forks
+                 + weights["recency"] * 2 ** (-max((NOW - pushed).total_seconds() / 86400, 0) / half_life)
+                 + weights["relevance"] * min(max(item.relevance_score or 0, 0), 1)
+                 + weights["similarity"] * min(max(item.semantic_similarity or 0, 0), 1))
+        scored.append((-score, position, item))
+    scored.sort(key=lambda entry: entry[:2])
+    return [item for _, _, item in scored]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    ranker = Ranker()
+    print(f"{'candidates':>10} {'loop ms':>9} {'numpy ms':>9} {'speedup':>8} {'same order':>11}")
+    for size in args.sizes:
+        items = make_items(size)
+        number = max(1, 10000 // size)
+        loop = min(timeit.repeat(lambda: rank_loop(items), number=number, repeat=args.repeat)) / number * 1000
+        vectorized = min(timeit.repeat(lambda: ranker.rank("repositories", items, NOW),
+                                       number=number, repeat=args.repeat)) / number * 1000
+        same = rank_loop(items) == ranker.rank("repositories", items, NOW)
+        print(f"{size:>10} {loop:>9.2f} {vectorized:>9.2f} {loop / vectorized:>7.1f}x {str(same):>11}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: results page rendering
+
+Times rendering results.html for a page of results with every card rendered
+afresh, with the result-card cache warm, and served from the page cache,
+and the time to load results.html when it has to be compiled versus when
+it comes from the bytecode cache.
+
+Usage:
+    python -m benchmarks.bench_render --per-page 10 100
+"""
+import argparse
+import tempfile
+import timeit
+
+from jinja2 import Environment
+
+from app import create_app
+from app.models.search_params import GitHubSearchParams
+from app.models.search_result import SearchResults
+from app.routes.search import render_results
+from benchmarks.stub_server import exa_results, github_items
+
+SEARCH_TYPES = ["repositories", "issues"]
+
+VARIANTS = {
+    "uncached": {"RENDER_CACHE_MAX_ENTRIES": 0},
+    "card cache": {},
+    "page cache": {"PAGE_CACHE_ENABLED": True},
+}
+
+
+def make_results(search_type: str, per_page: int) -> SearchResults:
+    """Parse a page of stub results and attach Exa fields to them."""
+    results = SearchResults.from_github_api(
+        {"total_count": 1000, "items": github_items(search_type, 1, per_page)},
+        search_type, "benchmark", page=1, per_page=per_page, compact=True)
+    for item, exa_result in zip(results.results, exa_results(per_page)):
+        item.relevance_score = exa_result["score"]
+        item.exa_content = exa_result["text"]
+    results.has_next_page = True
+    return results
+
+
+def time_load(env: Environment, name: str, repeat: int) -> float:
+    """Return the best time in milliseconds to load a template into an empty template cache."""
+    def load():
+        env.cache.clear()
+        env.get_template(name)
+    return min(timeit.repeat(load, number=20, repeat=repeat)) / 20 * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--per-page", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        apps = {name: create_app(dict(config, TESTING=True, TEMPLATE_CACHE_DIR=directory))
+                for name, config in VARIANTS.items()}
+
+        print(f"{'type':<13} {'per_page':>8} " +
+              " ".join(f"{name + ' ms':>14}" for name in VARIANTS) + f" {'speedup':>8}")
+        for search_type in SEARCH_TYPES:
+            for per_page in args.per_page:
+                results = make_results(search_type, per_page)
+                search_params = GitHubSearchParams(query="benchmark", type=search_type)
+                timings = []
+                for app in apps.values():
+                    with app.test_request_context("/search/", method="POST"):
+                        def render():
+                            return render_results(results, search_params, 1, per_page, True)
+                        render()
+                        number = max(1, 1000 // per_page)
+                        timings.append(min(timeit.repeat(render, number=number, repeat=args.repeat))
+                                       / number * 1000)
+                print(f"{search_type:<13} {per_page:>8} " +
+                      " ".join(f"{timing:>14.3f}" for timing in timings) +
+                      f" {timings[0] / min(timings[1:]):>7.1f}x")
+
+        env = apps["uncached"].jinja_env
+        bytecode_cache = env.bytecode_cache
+        env.bytecode_cache = None
+        compiled = time_load(env, "results.html", args.repeat)
+        env.bytecode_cache = bytecode_cache
+        cached = time_load(env, "results.html", args.repeat)
+        print(f"load results.html: compile {compiled:.2f} ms, from bytecode cache {cached:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Benchmark: filtering batches of Exa results
+
+Times the per-result filter SimilarityService used to run, which parses
+each published_date with strptime for each date bound, against the batch
+filter of app.services.result_filter, both filtering by a date range and a
+minimum score. The per-result filter only understands plain dates, so
+both run on plain dates and must agree; the batch filter is also timed on
+ISO timestamps and with domain predicates added.
+
+Usage:
+    python -m benchmarks.bench_result_filter --sizes 1000 10000 100000
+"""
+import argparse
+import timeit
+from datetime import datetime
+
+from app.services.result_filter import ResultColumns, filter_results
+
+MIN_DATE = datetime(2023, 3, 1)
+MAX_DATE = datetime(2024, 6, 30)
+
+
+class Result:
+    """Stand-in for an Exa result object."""
+    __slots__ = ("url", "score", "published_date")
+
+    def __init__(self, url, score, published_date):
+        self.url = url
+        self.score = score
+        self.published_date = published_date
+
+
+def make_results(count: int, timestamps: bool):
+    results = []
+    for i in range(count):
+        day = f"202{2 + i % 3}-{1 + i % 12:02d}-{1 + i % 28:02d}"
+        published = f"{day}T{i % 24:02d}:30:00.000Z" if timestamps else day
+        results.append(Result(f"https://{('www.github.com', 'blog.example.com', 'dev.to')[i % 3]}/item-{i}",
+                              (i * 7919 % 1000) / 1000, None if i % 17 == 0 else published))
+    return results
+
+
+def filter_loop(results, min_date, max_date, min_score):
+    """The per-result filter, as SimilarityService.filter_results ran it."""
+    filtered = []
+    for result in results:
+        include = True
+        if min_date and result.published_date:
+            try:
+                if datetime.strptime(result.published_date, "%Y-%m-%d") < min_date:
+                    include = False
+            except (ValueError, TypeError):
+                pass
+        if max_date and result.published_date:
+            try:
+                if datetime.strptime(result.published_date, "%Y-%m-%d") > max_date:
+                    include = False
+            except (ValueError, TypeError):
+                pass
+        if min_score is not None and result.score < min_score:
+            include = False
+        if include:
+            filtered.append(result)
+    return filtered
+
+
+def best_ms(func, repeat):
+    return min(timeit.repeat(func, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"{'results':>8} {'loop ms':>9} {'batch ms':>9} {'speedup':>8} {'same':>5} "
+          f"{'iso ms':>8} {'+domains ms':>12} {'refilter ms':>12}")
+    for size in args.sizes:
+        dates = make_results(size, timestamps=False)
+        timestamps = make_results(size, timestamps=True)
+        loop = best_ms(lambda: filter_loop(dates, MIN_DATE, MAX_DATE, 0.3), args.repeat)
+        batch = best_ms(lambda: filter_results(dates, MIN_DATE, MAX_DATE, 0.3), args.repeat)
+        same = filter_loop(dates, MIN_DATE, MAX_DATE, 0.3) == filter_results(dates, MIN_DATE, MAX_DATE, 0.3)
+        iso = best_ms(lambda: filter_results(timestamps, MIN_DATE, MAX_DATE, 0.3), args.repeat)
+        domains = best_ms(lambda: filter_results(timestamps, MIN_DATE, MAX_DATE, 0.3,
+                                                 include_domains=["github.com", "example.com"]), args.repeat)
+        # Columns parsed once can be filtered again with other bounds
+        columns = ResultColumns(timestamps)
+        refilter = best_ms(lambda: columns.select(columns.mask(MIN_DATE, MAX_DATE, 0.3)), args.repeat)
+        print(f"{size:>8} {loop:>9.2f} {batch:>9.2f} {loop / batch:>7.1f}x {str(same):>5} "
+              f"{iso:>8.2f} {domains:>12.2f} {refilter:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
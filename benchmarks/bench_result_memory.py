@@ -0,0 +1,60 @@
+"""
+Memory benchmark: dataclass result models versus the slotted Compact* models
+
+Parses GitHub-shaped search responses (with the full set of nested API
+links, as GitHub returns them) into each model family, drops the decoded
+JSON the way a cached page does, and reports the retained memory and parse
+time per 1,000 results.
+
+Usage:
+    python -m benchmarks.bench_result_memory --results 1000
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+
+from app.models.search_result import SearchResults
+from benchmarks.stub_server import github_items
+
+
+def measure(payload: bytes, search_type: str, compact: bool):
+    """Return (retained bytes, parse seconds) for parsing one payload."""
+    gc.collect()
+    tracemalloc.start()
+    data = json.loads(payload)
+    started = time.perf_counter()
+    results = SearchResults.from_github_api(
+        data, search_type, "benchmark", page=1, per_page=len(data["items"]), compact=compact)
+    elapsed = time.perf_counter() - started
+    del data
+    gc.collect()
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert len(results.results) > 0
+    return retained, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--results", type=int, default=1000)
+    args = parser.parse_args()
+
+    scale = 1000 / args.results
+    print(f"{'type':<14} {'dataclass KiB':>14} {'compact KiB':>12} {'saved':>7}"
+          f" {'dataclass ms':>13} {'compact ms':>11}   (per 1k results)")
+    for search_type in ("repositories", "code", "issues", "users"):
+        payload = json.dumps({
+            "total_count": args.results,
+            "items": github_items(search_type, 1, args.results)
+        }).encode("utf-8")
+        full_bytes, full_time = measure(payload, search_type, compact=False)
+        compact_bytes, compact_time = measure(payload, search_type, compact=True)
+        print(f"{search_type:<14} {full_bytes * scale / 1024:>14.1f} {compact_bytes * scale / 1024:>12.1f}"
+              f" {1 - compact_bytes / full_bytes:>7.0%}"
+              f" {full_time * scale * 1000:>13.2f} {compact_time * scale * 1000:>11.2f}")
+
+
+if __name__ == "__main__":
+    main()
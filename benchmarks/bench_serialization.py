@@ -0,0 +1,90 @@
+"""
+Benchmark: /search/api response serialization
+
+Compares the previous jsonify of per-result dictionaries against the
+serializer module with the stdlib encoder, with orjson (when installed) and
+with a field projection, for dataclass and compact result models.
+
+Usage:
+    python -m benchmarks.bench_serialization --per-page 100
+"""
+import argparse
+import timeit
+
+from flask import Flask, jsonify
+
+from app.models.search_result import SearchResults, result_to_dict
+from app.services import serializer
+from benchmarks.stub_server import exa_results, github_items
+
+PROJECTION = ["full_name", "html_url", "stargazers_count", "relevance_score"]
+
+
+def make_results(per_page: int, compact: bool) -> SearchResults:
+    """Parse a page of stub repositories and attach Exa fields to them."""
+    results = SearchResults.from_github_api(
+        {"total_count": 1000, "items": github_items("repositories", 1, per_page)},
+        "repositories", "benchmark", page=1, per_page=per_page, compact=compact)
+    for item, exa_result in zip(results.results, exa_results(per_page)):
+        item.relevance_score = exa_result["score"]
+        item.exa_content = exa_result["text"]
+    results.timings = {"github": 0.1, "exa": 0.2, "total": 0.2}
+    return results
+
+
+def with_jsonify(results: SearchResults, per_page: int) -> bytes:
+    """The response construction used before the serializer module."""
+    return jsonify({
+        "query": results.query,
+        "search_type": results.search_type,
+        "total_count": results.total_count,
+        "page": 1,
+        "per_page": per_page,
+        "has_next_page": results.has_next_page,
+        "timings": results.timings,
+        "results": [result_to_dict(result) for result in results.results]
+    }).get_data()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--per-page", type=int, nargs="+", default=[10, 100])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    accelerated = serializer.orjson
+    app = Flask(__name__)
+    variants = [
+        ("jsonify", lambda r, n: with_jsonify(r, n), None),
+        ("stdlib", lambda r, n: serializer.serialize_search_results(r, 1, n), None),
+        ("stdlib+fields", lambda r, n: serializer.serialize_search_results(r, 1, n, PROJECTION), None),
+    ]
+    if accelerated is not None:
+        variants += [
+            ("orjson", lambda r, n: serializer.serialize_search_results(r, 1, n), accelerated),
+            ("orjson+fields", lambda r, n: serializer.serialize_search_results(r, 1, n, PROJECTION),
+             accelerated),
+        ]
+    else:
+        print("orjson is not installed; only the stdlib encoder is measured")
+
+    print(f"{'model':<10} {'per_page':>8} {'variant':<14} {'ms':>8} {'KiB':>8} {'speedup':>8}")
+    with app.app_context():
+        for compact in (False, True):
+            for per_page in args.per_page:
+                results = make_results(per_page, compact)
+                baseline = None
+                for name, encode, encoder in variants:
+                    serializer.orjson = encoder
+                    number = max(1, 2000 // per_page)
+                    elapsed = min(timeit.repeat(lambda: encode(results, per_page),
+                                                number=number, repeat=args.repeat)) / number * 1000
+                    size = len(encode(results, per_page)) / 1024
+                    baseline = baseline or elapsed
+                    print(f"{'compact' if compact else 'dataclass':<10} {per_page:>8} {name:<14}"
+                          f" {elapsed:>8.3f} {size:>8.1f} {baseline / elapsed:>7.1f}x")
+    serializer.orjson = accelerated
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""
+Benchmark: per-request SimilarityService versus the shared app-level instance
+
+Runs search_similar_content against the local Exa stub, once constructing a
+new SimilarityService (and Exa client and connection pool) per call as the
+routes used to, and once reusing a single shared instance.
+
+Usage:
+    python -m benchmarks.bench_similarity_client --requests 200 --latency 0.01
+"""
+import argparse
+import statistics
+import time
+
+from app.services.http_client import UpstreamSessions
+from app.services.similarity_service import SimilarityService
+from benchmarks.stub_server import StubServer
+
+
+def run(make_service, requests: int):
+    """Time search_similar_content calls, returning per-call latencies in milliseconds."""
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        make_service().search_similar_content(f"query {i % 10}", num_results=5)
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+def summarize(name: str, latencies):
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(f"{name:<12} mean {statistics.mean(latencies):7.2f} ms"
+          f"  p50 {statistics.median(latencies):7.2f} ms  p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.01,
+                        help="Stub server latency in seconds")
+    args = parser.parse_args()
+
+    server = StubServer(latency=args.latency).start()
+    try:
+        def per_request():
+            return SimilarityService(
+                exa_api_key="stub-key", sessions=UpstreamSessions(exa_url=server.url))
+
+        shared_service = SimilarityService(
+            exa_api_key="stub-key", sessions=UpstreamSessions(exa_url=server.url))
+
+        summarize("per-request", run(per_request, args.requests))
+        summarize("shared", run(lambda: shared_service, args.requests))
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
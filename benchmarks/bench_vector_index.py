@@ -0,0 +1,71 @@
+"""
+Benchmark: local vector index queries by corpus size
+
+Builds the vector index of synthetic corpora of each size, once searched by
+brute force and once through an IVF index, and times a query against each.
+The recall column is the share of the brute-force top 10 the IVF search
+also returns.
+
+Usage:
+    python -m benchmarks.bench_vector_index --sizes 1000 10000 50000
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import timeit
+
+from app.services.vector_index import VectorCorpus, VectorIndex, build_vector_index
+
+VOCABULARY = 5000
+WORDS_PER_DOCUMENT = 40
+QUERIES = 20
+
+
+def words(rng: random.Random, count: int):
+    """Draw words with a Zipf-like frequency distribution."""
+    return " ".join(f"w{int(rng.paretovariate(1.1)) % VOCABULARY}" for _ in range(count))
+
+
+def build(corpus: VectorCorpus, path: str, brute_force_limit: int, nprobe: int):
+    started = time.perf_counter()
+    build_vector_index(corpus, path, brute_force_limit=brute_force_limit)
+    return VectorIndex(path, corpus, top_k=10, nprobe=nprobe), time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 50000])
+    parser.add_argument("--nprobe", type=int, default=8)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    queries = [words(rng, 4) for _ in range(QUERIES)]
+
+    print(f"{'documents':>9} {'build s':>8} {'brute ms':>9} {'ivf build s':>12} "
+          f"{'ivf ms':>7} {'recall@10':>10}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as directory:
+            corpus = VectorCorpus(os.path.join(directory, "corpus.sqlite3"))
+            corpus.add((f"https://github.com/owner/project-{i}", words(rng, WORDS_PER_DOCUMENT), None)
+                       for i in range(size))
+
+            timings, results = [], []
+            for limit in (size, 0):
+                index, seconds = build(corpus, os.path.join(directory, f"index-{limit}.npz"),
+                                       limit, args.nprobe)
+                query_ms = min(timeit.repeat(lambda: [index.search(query) for query in queries],
+                                             number=1, repeat=args.repeat)) / QUERIES * 1000
+                timings += [seconds, query_ms]
+                results.append([{result["url"] for result in index.search(query)} for query in queries])
+
+            recall = sum(len(brute & ivf) / max(len(brute), 1)
+                         for brute, ivf in zip(*results)) / QUERIES
+        print(f"{size:>9} {timings[0]:>8.2f} {timings[1]:>9.2f} {timings[2]:>12.2f} "
+              f"{timings[3]:>7.2f} {recall:>10.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,21 @@
+"""
+Application instances for load tests
+
+Creates the Flask app with CSRF protection and request rate limits turned
+off, so that load tests measure the serving path rather than the limiter.
+Upstream URLs and tokens come from the environment as usual.
+
+Usage:
+    gunicorn --threads 8 benchmarks.load_app:app
+    uvicorn benchmarks.load_app:asgi_app
+"""
+from app import create_app
+
+app = create_app({'WTF_CSRF_ENABLED': False, 'RATELIMIT_ENABLED': False})
+
+try:
+    from app.asgi import create_asgi_app
+    asgi_app = create_asgi_app(app)
+except ImportError:
+    # The async serving path needs httpx
+    asgi_app = None
@@ -0,0 +1,93 @@
+"""
+Load test: WSGI (threaded) versus ASGI (async) serving of ExaHub routes
+
+Starts the stub GitHub/Exa upstreams with a fixed latency, then serves the
+app with a single gunicorn worker using a fixed number of threads and with
+a single uvicorn worker running the ASGI path, and drives both with the
+same unique, uncacheable searches at growing concurrency levels. The
+search_api scenario hits /search/api, which the ASGI path serves with
+coroutines; search_page submits the search form, a sync route the ASGI
+path hands to Flask on its thread pool, so it should keep pace with the
+threaded WSGI worker.
+
+Requires gunicorn for the WSGI side and uvicorn and httpx for the ASGI
+side; a side whose dependencies are missing is skipped.
+
+Usage:
+    python -m benchmarks.load_async --latency 0.3 --concurrency 10 50 200
+    python -m benchmarks.load_async --scenarios search_page --concurrency 8
+"""
+import argparse
+import itertools
+
+from benchmarks.loadgen import AppServer, asgi_command, free_port, missing_modules, run_load, wsgi_command
+from benchmarks.stub_server import StubServer
+
+SCENARIOS = {
+    "search_api": lambda session, url, query: session.post(
+        f"{url}/search/api", timeout=60, json={"query": query, "per_page": 10}),
+    "search_page": lambda session, url, query: session.post(
+        f"{url}/search/", timeout=60, data={"query": query, "type": "repositories",
+                                            "enhance_with_exa": "on"}),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--latency", type=float, default=0.3,
+                        help="Seconds each stub upstream call takes")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 200])
+    parser.add_argument("--requests-per-client", type=int, default=5)
+    parser.add_argument("--threads", type=int, default=8,
+                        help="Threads of the WSGI worker, and of the ASGI worker's sync routes")
+    parser.add_argument("--scenarios", nargs="+", choices=sorted(SCENARIOS),
+                        default=["search_api", "search_page"])
+    args = parser.parse_args()
+
+    stub = StubServer(latency=args.latency, rate_limit=10 ** 9).start()
+    env = {
+        "GITHUB_API_URL": stub.url,
+        "EXA_API_URL": stub.url,
+        "GITHUB_TOKEN": "load-test-token",
+        "EXA_API_KEY": "load-test-key",
+        "ASGI_WSGI_THREADS": str(args.threads),
+    }
+    counter = itertools.count()
+
+    print(f"upstream latency {args.latency * 1000:.0f} ms")
+    print(f"{'mode':<20} {'scenario':<12} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8}"
+          f" {'p99 ms':>8} {'errors':>7} {'rss MiB':>8}")
+    try:
+        port = free_port()
+        modes = [
+            ("wsgi", f"wsgi x{args.threads} threads", wsgi_command(port, threads=args.threads)),
+            ("asgi", "asgi", asgi_command(port)),
+        ]
+        for mode, name, command in modes:
+            missing = missing_modules(mode)
+            if missing:
+                print(f"{name:<20} skipped: {', '.join(missing)} not installed")
+                continue
+
+            server = AppServer(command, port, env).start()
+            try:
+                for scenario in args.scenarios:
+                    def send(session, i, request=SCENARIOS[scenario]):
+                        # Unique queries so that every request goes upstream
+                        return request(session, server.url, f"load test {next(counter)}")
+
+                    for concurrency in args.concurrency:
+                        result = run_load(send, concurrency,
+                                          concurrency * args.requests_per_client)
+                        rss = server.rss_kib()
+                        print(f"{name:<20} {scenario:<12} {concurrency:>5} {result['throughput']:>8.1f}"
+                              f" {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['p99_ms']:>8.0f}"
+                              f" {result['errors']:>7} {rss / 1024 if rss else 0:>8.1f}")
+            finally:
+                server.stop()
+    finally:
+        stub.stop()
+
+
+if __name__ == "__main__":
+    main()
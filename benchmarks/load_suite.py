@@ -0,0 +1,279 @@
+"""
+Load-test suite: ExaHub endpoints against local upstream stubs
+
+Serves the app in a subprocess (gunicorn, or uvicorn for the async path)
+against the stub GitHub and Exa APIs. It drives /search/, /search/api,
+/api/similarity-search and /api/similar-urls at each concurrency level
+and reports throughput, latency percentiles and server memory. Each run
+is saved as JSON under benchmarks/results, and `compare` flags throughput
+and latency regressions between two saved runs, e.g. from two commits.
+
+Usage:
+    python -m benchmarks.load_suite run --concurrency 1 10 50 --latency 0.1
+    python -m benchmarks.load_suite compare benchmarks/results/<before>.json [<after>.json]
+"""
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+import argparse
+import glob
+import json
+import os
+import platform
+import subprocess
+import sys
+import uuid
+
+import requests
+
+from benchmarks.loadgen import AppServer, asgi_command, free_port, missing_modules, run_load, wsgi_command
+from benchmarks.stub_server import StubServer
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+Send = Callable[[requests.Session, str, str], requests.Response]
+
+
+def search_page(session: requests.Session, base_url: str, query: str) -> requests.Response:
+    """Submit the search form and render results.html."""
+    return session.post(f"{base_url}/search/", timeout=60, data={
+        "query": query, "type": "repositories", "enhance_with_exa": "on"})
+
+
+def search_api(session: requests.Session, base_url: str, query: str) -> requests.Response:
+    """Run a combined search through the JSON API."""
+    return session.post(f"{base_url}/search/api", timeout=60, json={
+        "query": query, "per_page": 10, "enhance_with_exa": True})
+
+
+def similarity_search(session: requests.Session, base_url: str, query: str) -> requests.Response:
+    """Run an Exa similarity search."""
+    return session.post(f"{base_url}/api/similarity-search", timeout=60, data={
+        "prompt": query, "num_results": 10, "include_snippets": "on"})
+
+
+def similar_urls(session: requests.Session, base_url: str, query: str) -> requests.Response:
+    """Find pages similar to a URL."""
+    return session.post(f"{base_url}/api/similar-urls", timeout=60, data={
+        "url": f"https://github.com/load/{query.replace(' ', '-')}", "num_results": 10})
+
+
+SCENARIOS: Dict[str, Send] = {
+    "search_page": search_page,
+    "search_api": search_api,
+    "similarity_search": similarity_search,
+    "similar_urls": similar_urls,
+}
+
+
+def git_revision() -> Dict[str, Any]:
+    """Return the current commit and whether the work tree has uncommitted changes."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"],
+                                    capture_output=True, text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        return {"commit": None, "dirty": None}
+    return {"commit": commit, "dirty": dirty}
+
+
+def run_suite(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run every selected scenario at every concurrency level and return the report."""
+    missing = missing_modules(args.server)
+    if missing:
+        sys.exit(f"The {args.server} server needs {', '.join(missing)}")
+
+    stub = StubServer(latency=args.latency, error_rate=args.error_rate,
+                      rate_limit=args.rate_limit).start()
+    env = {
+        "GITHUB_API_URL": stub.url,
+        "EXA_API_URL": stub.url,
+        "GITHUB_TOKEN": "load-test-token",
+        "EXA_API_KEY": "load-test-key",
+    }
+    port = free_port()
+    command = (asgi_command(port, args.workers) if args.server == "asgi"
+               else wsgi_command(port, args.workers, args.threads))
+    # Queries of one run never hit cache entries left by another
+    run_id = uuid.uuid4().hex[:8]
+
+    report = {
+        "meta": dict(git_revision(), **{
+            "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "server": args.server,
+            "workers": args.workers,
+            "threads": args.threads,
+            "latency": args.latency,
+            "error_rate": args.error_rate,
+            "rate_limit": args.rate_limit,
+            "distinct_queries": args.distinct_queries,
+            "requests_per_client": args.requests_per_client,
+        }),
+        "results": []
+    }
+
+    print(f"{args.server} server, upstream latency {args.latency * 1000:.0f} ms, "
+          f"error rate {args.error_rate:.0%}")
+    print(f"{'scenario':<18} {'conc':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"
+          f" {'errors':>7} {'rss MiB':>8}")
+    server = AppServer(command, port, env).start()
+    try:
+        for scenario in args.scenarios:
+            send = SCENARIOS[scenario]
+            # Compile templates and open upstream connections before measuring
+            with requests.Session() as session:
+                responses = [send(session, server.url, f"warmup {run_id} {i}")
+                             for i in range(args.warmup)]
+            # A scenario whose endpoint is broken would only measure error responses
+            if responses and not any(response.ok for response in responses):
+                sys.exit(f"Every warmup request of {scenario} failed, the last with "
+                         f"HTTP {responses[-1].status_code}: {responses[-1].text[:200]}")
+
+            for concurrency in args.concurrency:
+                def request(session, i, scenario=scenario, concurrency=concurrency, send=send):
+                    n = i % args.distinct_queries if args.distinct_queries else i
+                    return send(session, server.url, f"{scenario} {run_id} c{concurrency} q{n}")
+
+                result = run_load(request, concurrency,
+                                  concurrency * args.requests_per_client)
+                result.update(scenario=scenario, rss_kib=server.rss_kib())
+                report["results"].append(result)
+                print_result(result)
+        report["meta"]["peak_rss_kib"] = server.peak_rss_kib()
+    finally:
+        server.stop()
+        stub.stop()
+    return report
+
+
+def print_result(result: Dict[str, Any]):
+    """Print one row of the results table."""
+    rss = result.get("rss_kib")
+    print(f"{result['scenario']:<18} {result['concurrency']:>5} {result['throughput']:>8.1f}"
+          f" {result['p50_ms']:>8.0f} {result['p95_ms']:>8.0f} {result['p99_ms']:>8.0f}"
+          f" {result['errors']:>7} {rss / 1024 if rss else 0:>8.1f}")
+
+
+def save_report(report: Dict[str, Any], directory: str) -> str:
+    """Write a report to <timestamp>-<commit>.json in a directory and return its path."""
+    os.makedirs(directory, exist_ok=True)
+    meta = report["meta"]
+    stamp = datetime.fromisoformat(meta["timestamp"]).strftime("%Y%m%dT%H%M%S")
+    commit = (meta["commit"] or "unknown")[:10] + ("-dirty" if meta["dirty"] else "")
+    path = os.path.join(directory, f"{stamp}-{commit}.json")
+    with open(path, "w") as report_file:
+        json.dump(report, report_file, indent=2)
+    return path
+
+
+def latest_report(directory: str, exclude: Optional[str] = None) -> Optional[str]:
+    """Return the most recent report in a directory, other than exclude."""
+    paths = sorted(path for path in glob.glob(os.path.join(directory, "*.json"))
+                   if exclude is None or os.path.abspath(path) != os.path.abspath(exclude))
+    return paths[-1] if paths else None
+
+
+def compare_reports(before: Dict[str, Any], after: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Print throughput and p95 changes between two reports.
+
+    Args:
+        before: The baseline report
+        after: The report to check
+        threshold: Percentage drop in throughput or rise in p95 latency counted as a regression
+
+    Returns:
+        A description of every regression found
+    """
+    baseline = {(r["scenario"], r["concurrency"]): r for r in before["results"]}
+    regressions = []
+
+    print(f"{'scenario':<18} {'conc':>5} {'req/s':>17} {'change':>8} {'p95 ms':>17} {'change':>8}")
+    for result in after["results"]:
+        key = (result["scenario"], result["concurrency"])
+        old = baseline.get(key)
+        if old is None:
+            continue
+        throughput_change = percent_change(old["throughput"], result["throughput"])
+        p95_change = percent_change(old["p95_ms"], result["p95_ms"])
+        flags = []
+        if throughput_change < -threshold:
+            flags.append("throughput")
+        if p95_change > threshold:
+            flags.append("p95")
+        if result["errors"] > old["errors"]:
+            flags.append("errors")
+        print(f"{key[0]:<18} {key[1]:>5} {old['throughput']:>8.1f}{result['throughput']:>9.1f}"
+              f" {throughput_change:>+7.1f}% {old['p95_ms']:>8.0f}{result['p95_ms']:>9.0f}"
+              f" {p95_change:>+7.1f}%{'  REGRESSION: ' + ', '.join(flags) if flags else ''}")
+        if flags:
+            regressions.append(f"{key[0]} at concurrency {key[1]}: {', '.join(flags)}")
+    return regressions
+
+
+def percent_change(old: float, new: float) -> float:
+    """Return the change from old to new in percent."""
+    return (new - old) / old * 100 if old else 0.0
+
+
+def describe(report: Dict[str, Any]) -> str:
+    """Return a one-line description of the commit and setup a report was made with."""
+    meta = report["meta"]
+    commit = (meta.get("commit") or "unknown")[:10] + (" (dirty)" if meta.get("dirty") else "")
+    return (f"{commit} at {meta['timestamp']}: {meta['server']}, {meta['workers']} worker(s), "
+            f"{meta['latency'] * 1000:.0f} ms upstream latency")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run = commands.add_parser("run", help="Run the suite and save its results")
+    run.add_argument("--scenarios", nargs="+", choices=list(SCENARIOS), default=list(SCENARIOS))
+    run.add_argument("--concurrency", type=int, nargs="+", default=[1, 10, 50])
+    run.add_argument("--requests-per-client", type=int, default=10)
+    run.add_argument("--warmup", type=int, default=5,
+                     help="Unmeasured requests per scenario before measuring")
+    run.add_argument("--distinct-queries", type=int, default=0,
+                     help="Cycle through this many queries to exercise the caches; 0 makes every query unique")
+    run.add_argument("--server", choices=["wsgi", "asgi"], default="wsgi")
+    run.add_argument("--workers", type=int, default=1)
+    run.add_argument("--threads", type=int, default=8, help="Threads per WSGI worker")
+    run.add_argument("--latency", type=float, default=0.1,
+                     help="Seconds each stub upstream call takes")
+    run.add_argument("--error-rate", type=float, default=0.0,
+                     help="Fraction of upstream calls answered with a 502")
+    run.add_argument("--rate-limit", type=int, default=10 ** 9,
+                     help="GitHub search quota per minute reported by the stub")
+    run.add_argument("--output", default=RESULTS_DIR, help="Directory the results are saved to")
+
+    compare = commands.add_parser("compare", help="Compare two saved runs")
+    compare.add_argument("before", help="Baseline results file")
+    compare.add_argument("after", nargs="?",
+                         help="Results file to check; defaults to the latest run")
+    compare.add_argument("--threshold", type=float, default=10.0,
+                         help="Percent change counted as a regression")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        report = run_suite(args)
+        print(f"Saved {save_report(report, args.output)}")
+        return
+
+    after_path = args.after or latest_report(os.path.dirname(args.before) or ".", exclude=args.before)
+    if after_path is None:
+        sys.exit("No results to compare against")
+    with open(args.before) as before_file, open(after_path) as after_file:
+        before, after = json.load(before_file), json.load(after_file)
+    print(f"before: {describe(before)}")
+    print(f"after:  {describe(after)}")
+    regressions = compare_reports(before, after, args.threshold)
+    if regressions:
+        sys.exit(f"{len(regressions)} regression(s) above {args.threshold:.0f}%")
+
+
+if __name__ == "__main__":
+    main()
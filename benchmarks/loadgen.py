@@ -0,0 +1,203 @@
+"""
+Load generation helpers
+
+Starts app servers in subprocesses against the stub upstreams and drives
+them with a pool of client threads, collecting per-request latencies.
+"""
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Mapping, Optional, Sequence
+import importlib.util
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import requests
+
+
+def free_port() -> int:
+    """Return a TCP port that is free on localhost."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def percentile(sorted_values: Sequence[float], fraction: float) -> float:
+    """Return the nearest-rank percentile of already sorted values."""
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1,
+                max(0, int(round(fraction * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class AppServer:
+    """An app server running in a subprocess, wired to the stub upstreams."""
+
+    def __init__(self, command: List[str], port: int, env: Optional[Mapping[str, str]] = None):
+        """
+        Initialize the server.
+
+        Args:
+            command: Command line that serves the app on the given port
+            port: Port the command listens on
+            env: Extra environment variables, e.g. upstream URLs and tokens
+        """
+        self.command = command
+        self.port = port
+        self.env = dict(os.environ, **(env or {}))
+        self.process: Optional[subprocess.Popen] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.port}"
+
+    def start(self, timeout: float = 20.0) -> "AppServer":
+        """Start the server and wait until it accepts connections."""
+        self.process = subprocess.Popen(
+            self.command, env=self.env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise RuntimeError(
+                    f"{' '.join(self.command)} exited with {self.process.returncode}")
+            try:
+                with socket.create_connection(("127.0.0.1", self.port), timeout=0.2):
+                    return self
+            except OSError:
+                time.sleep(0.1)
+        self.stop()
+        raise RuntimeError(f"{' '.join(self.command)} did not start listening")
+
+    def rss_kib(self) -> Optional[int]:
+        """Return the resident memory of the server and its worker processes in KiB, if it can be read."""
+        return self._memory("VmRSS")
+
+    def peak_rss_kib(self) -> Optional[int]:
+        """Return the summed peak resident memory of the server and its worker processes in KiB."""
+        return self._memory("VmHWM")
+
+    def _memory(self, field: str) -> Optional[int]:
+        """Sum a /proc/<pid>/status memory field over the server's process tree."""
+        if self.process is None:
+            return None
+        total = None
+        for pid in process_tree(self.process.pid):
+            try:
+                with open(f"/proc/{pid}/status") as status:
+                    for line in status:
+                        if line.startswith(f"{field}:"):
+                            total = (total or 0) + int(line.split()[1])
+            except OSError:
+                pass
+        return total
+
+    def stop(self):
+        """Stop the server."""
+        if self.process is not None and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def process_tree(pid: int) -> List[int]:
+    """Return a process and all of its descendants, read from /proc (Linux only)."""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc") if os.path.isdir("/proc") else []:
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as stat:
+                # The command name may contain spaces; fields resume after its closing parenthesis
+                parent = int(stat.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+
+    tree = [pid]
+    for current in tree:
+        tree.extend(children.get(current, []))
+    return tree
+
+
+def run_load(send: Callable[[requests.Session, int], requests.Response], concurrency: int,
+             total: int) -> Dict[str, Any]:
+    """
+    Send total requests from concurrency client threads and summarize the latencies.
+
+    Args:
+        send: Sends request number i on a client session and returns the response
+        concurrency: Number of client threads
+        total: Number of requests to send
+
+    Returns:
+        A summary with throughput, latency percentiles in milliseconds and error count
+    """
+    local = threading.local()
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+
+    def one(i: int):
+        nonlocal errors
+        session = getattr(local, "session", None)
+        if session is None:
+            session = local.session = requests.Session()
+        started = time.perf_counter()
+        try:
+            ok = send(session, i).status_code < 400
+        except requests.RequestException:
+            ok = False
+        elapsed = time.perf_counter() - started
+        with lock:
+            latencies.append(elapsed)
+            errors += not ok
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "errors": errors,
+        "throughput": total / wall,
+        "p50_ms": percentile(latencies, 0.50) * 1000,
+        "p95_ms": percentile(latencies, 0.95) * 1000,
+        "p99_ms": percentile(latencies, 0.99) * 1000,
+    }
+
+
+def python_module(*args: str) -> List[str]:
+    """Return the command line to run a module with the current interpreter."""
+    return [sys.executable, "-m", *args]
+
+
+def wsgi_command(port: int, workers: int = 1, threads: int = 8) -> List[str]:
+    """Return the command line serving benchmarks.load_app:app with gunicorn."""
+    return python_module("gunicorn", "--workers", str(workers), "--threads", str(threads),
+                         "--bind", f"127.0.0.1:{port}", "benchmarks.load_app:app")
+
+
+def asgi_command(port: int, workers: int = 1) -> List[str]:
+    """Return the command line serving benchmarks.load_app:asgi_app with uvicorn."""
+    return python_module("uvicorn", "--workers", str(workers), "--host", "127.0.0.1", "--port", str(port),
+                         "--log-level", "warning", "--no-access-log", "benchmarks.load_app:asgi_app")
+
+
+# Modules each serving mode needs besides the app's own dependencies
+SERVER_MODULES = {
+    "wsgi": ("gunicorn",),
+    "asgi": ("uvicorn", "httpx"),
+}
+
+
+def missing_modules(server: str) -> List[str]:
+    """Return the modules a serving mode needs that are not installed."""
+    return [module for module in SERVER_MODULES[server] if importlib.util.find_spec(module) is None]
@@ -0,0 +1,260 @@
+"""
+Local stub of the GitHub search and Exa APIs
+
+Serves canned responses for api.github.com/search/* and api.exa.ai
+/search and /findSimilar so benchmarks can run without spending real quota.
+
+Usage:
+    python -m benchmarks.stub_server --port 8765 --latency 0.05
+"""
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+import argparse
+import json
+import random
+import threading
+import time
+
+
+# API link fields GitHub includes on every user and repository object
+USER_LINKS = ("url", "followers_url", "following_url", "gists_url", "starred_url",
+              "subscriptions_url", "organizations_url", "repos_url", "events_url",
+              "received_events_url")
+REPOSITORY_LINKS = ("url", "forks_url", "keys_url", "collaborators_url", "teams_url", "hooks_url",
+                    "issue_events_url", "events_url", "assignees_url", "branches_url", "tags_url",
+                    "blobs_url", "git_tags_url", "git_refs_url", "trees_url", "statuses_url",
+                    "languages_url", "stargazers_url", "contributors_url", "subscribers_url",
+                    "subscription_url", "commits_url", "git_commits_url", "comments_url",
+                    "issue_comment_url", "contents_url", "compare_url", "merges_url", "archive_url",
+                    "downloads_url", "issues_url", "pulls_url", "milestones_url",
+                    "notifications_url", "labels_url", "releases_url", "deployments_url")
+
+
+def github_user(login: str, user_id: int):
+    """Generate a GitHub user object with the full set of API links."""
+    user = {
+        "login": login, "id": user_id, "node_id": f"MDQ6VXNlcj{user_id:08d}",
+        "avatar_url": f"https://avatars.githubusercontent.com/u/{user_id}?v=4", "gravatar_id": "",
+        "html_url": f"https://github.com/{login}", "type": "User", "site_admin": False
+    }
+    for link in USER_LINKS:
+        user[link] = f"https://api.github.com/users/{login}/{link[:-4]}"
+    return user
+
+
+def github_repository(i: int):
+    """Generate a GitHub repository object with the full set of API links."""
+    owner = f"owner{i % 50}"
+    name = f"project-{i}"
+    repository = {
+        "id": i, "node_id": f"MDEwOlJlcG9zaXRvcnk{i:08d}", "name": name,
+        "full_name": f"{owner}/{name}", "private": False, "html_url": f"https://github.com/{owner}/{name}",
+        "description": f"Stub repository number {i}", "fork": False,
+        "owner": github_user(owner, i % 50)
+    }
+    for link in REPOSITORY_LINKS:
+        repository[link] = f"https://api.github.com/repos/{owner}/{name}/{link[:-4]}"
+    return repository
+
+
+def github_items(search_type: str, page: int, per_page: int):
+    """Generate deterministic GitHub search items for a page."""
+    items = []
+    for i in range((page - 1) * per_page, page * per_page):
+        owner = f"owner{i % 50}"
+        name = f"project-{i}"
+        html_url = f"https://github.com/{owner}/{name}"
+        if search_type == "repositories":
+            items.append(dict(github_repository(i), **{
+                "stargazers_count": (i * 37) % 5000, "watchers_count": (i * 37) % 5000,
+                "forks_count": (i * 11) % 800, "open_issues_count": i % 40,
+                "language": ("Python", "Go", "Rust", "JavaScript")[i % 4],
+                "topics": [("ai", "web", "cli", "data")[i % 4]],
+                "license": {"key": "mit", "name": "MIT License"},
+                "created_at": "2020-01-01T00:00:00Z", "updated_at": "2024-06-01T00:00:00Z",
+                "pushed_at": f"2024-0{1 + i % 9}-15T00:00:00Z", "score": 1.0,
+                "homepage": None, "size": i * 13, "default_branch": "main", "visibility": "public"
+            }))
+        elif search_type == "code":
+            items.append({
+                "name": "main.py", "path": f"src/{i}/main.py", "sha": f"{i:040x}",
+                "url": f"https://api.github.com/repos/{owner}/{name}/contents/src/{i}/main.py",
+                "html_url": f"{html_url}/blob/main/src/{i}/main.py",
+                "repository": github_repository(i), "score": 1.0
+            })
+        elif search_type == "issues":
+            items.append({
+                "id": i, "number": i, "title": f"Stub issue {i}", "html_url": f"{html_url}/issues/{i}",
+                "state": "open", "user": github_user(owner, i % 50), "body": "Stub issue body",
+                "repository_url": f"https://api.github.com/repos/{owner}/{name}",
+                "labels": [{"id": i % 5, "name": "bug", "color": "d73a4a", "default": True,
+                            "url": f"https://api.github.com/repos/{owner}/{name}/labels/bug"}],
+                "comments": i % 10, "created_at": "2024-01-01T00:00:00Z"
+            })
+        else:
+            items.append(dict(github_user(f"user{i}", i), score=1.0))
+    return items
+
+
+def exa_results(count: int):
+    """Generate deterministic Exa results that overlap with the GitHub stub items."""
+    return [{
+        "id": str(i),
+        "url": f"https://github.com/owner{i % 50}/project-{i}",
+        "title": f"Stub result {i}",
+        "score": round(1.0 - i / (count + 1), 4),
+        "publishedDate": f"2024-0{1 + i % 9}-01",
+        "author": None,
+        "text": f"Stub content for project {i}"
+    } for i in range(count)]
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Request handler for the GitHub and Exa stubs."""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+    server: "StubServer"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send_json(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_GET(self):
+        parts = urlsplit(self.path)
+        if not parts.path.startswith("/search/"):
+            return self._send_json(404, {"message": "Not Found"})
+
+        self.server.record("github")
+        time.sleep(self.server.latency)
+        if self.server.should_fail():
+            return self._send_json(502, {"message": "Stub failure"})
+
+        query = parse_qs(parts.query)
+        page = int(query.get("page", ["1"])[0])
+        per_page = int(query.get("per_page", ["10"])[0])
+        search_type = parts.path.rsplit("/", 1)[-1]
+        self._send_json(200, {
+            "total_count": self.server.total_count,
+            "incomplete_results": False,
+            "items": github_items(search_type, page, per_page)
+        }, self.server.rate_limit_headers())
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = json.loads(self.rfile.read(length) or b"{}")
+        if self.path not in ("/search", "/findSimilar"):
+            return self._send_json(404, {"error": "Not Found"})
+
+        self.server.record("exa")
+        time.sleep(self.server.latency)
+        if self.server.should_fail():
+            return self._send_json(502, {"error": "Stub failure"})
+
+        self._send_json(200, {"results": exa_results(
+            int(body.get("numResults", 10)))})
+
+
+class StubServer(ThreadingHTTPServer):
+    """Threaded stub server with configurable latency, error rate and rate-limit headers."""
+
+    daemon_threads = True
+    # Load tests open hundreds of connections at once
+    request_queue_size = 256
+
+    def __init__(self, address: Tuple[str, int] = ("127.0.0.1", 0), latency: float = 0.05,
+                 error_rate: float = 0.0, rate_limit: int = 30, total_count: int = 1000):
+        """
+        Initialize the stub server.
+
+        Args:
+            address: Host and port to bind; port 0 picks a free port
+            latency: Seconds to sleep before answering each request
+            error_rate: Fraction of requests answered with a 502
+            rate_limit: Value reported in the X-RateLimit-Limit header
+            total_count: total_count reported by the GitHub search stub
+        """
+        super().__init__(address, StubHandler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.rate_limit = rate_limit
+        self.total_count = total_count
+        self.counts = {"github": 0, "exa": 0}
+        self._window = 0
+        self._window_used = 0
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        """Return the base URL of the running server."""
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def record(self, upstream: str):
+        """Count a request against its upstream and the current rate-limit window."""
+        with self._lock:
+            self.counts[upstream] += 1
+            if upstream == "github":
+                window = int(time.time()) // 60
+                if window != self._window:
+                    self._window, self._window_used = window, 0
+                self._window_used += 1
+
+    def should_fail(self) -> bool:
+        """Return True for roughly error_rate of the requests."""
+        return random.random() < self.error_rate
+
+    def rate_limit_headers(self) -> Dict[str, str]:
+        """Return GitHub-style rate-limit headers for the current one-minute window."""
+        with self._lock:
+            remaining = max(0, self.rate_limit - self._window_used)
+            reset = (self._window + 1) * 60
+        return {
+            "X-RateLimit-Limit": str(self.rate_limit),
+            "X-RateLimit-Remaining": str(remaining),
+            "X-RateLimit-Reset": str(reset)
+        }
+
+    def start(self) -> "StubServer":
+        """Serve requests on a background thread."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop serving and close the socket."""
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.05)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit", type=int, default=30)
+    args = parser.parse_args()
+
+    server = StubServer((args.host, args.port), latency=args.latency,
+                        error_rate=args.error_rate, rate_limit=args.rate_limit)
+    print(f"Stub GitHub/Exa API listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()